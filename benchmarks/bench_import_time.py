@@ -0,0 +1,153 @@
+"""Track import time of every public module under utils/ and services/.
+
+Imports each module in a fresh interpreter with `python -X importtime`,
+parses the report and keeps the module's cumulative import time (the
+median over --repeat runs), along with the dependencies that contributed
+most to it. Compare against a saved run to catch startup regressions.
+
+Usage:
+    python benchmarks/bench_import_time.py --output import_times.json
+    python benchmarks/bench_import_time.py --baseline import_times.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PACKAGES = ("utils", "services")
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def public_modules(root: str = ROOT) -> List[str]:
+    """Dotted names of all non-underscore modules in PACKAGES"""
+    modules = []
+    for package in PACKAGES:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, package)):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(("_", ".")))
+            for filename in sorted(filenames):
+                if filename.endswith(".py") and not filename.startswith("_"):
+                    path = os.path.relpath(os.path.join(dirpath, filename[:-3]), root)
+                    modules.append(path.replace(os.sep, "."))
+    return modules
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, nesting depth) per line of -X importtime output.
+
+    Lines come in completion order, so a module's dependencies are listed
+    right before it, one level deeper.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def direct_dependencies(entries: List[Tuple[str, int, int, int]], module: str) -> Dict[str, int]:
+    """Cumulative us of each module imported directly by `module` (first-time imports only)"""
+    index = next(i for i, entry in enumerate(entries) if entry[0] == module)
+    depth = entries[index][3]
+    children = {}
+    for name, _, cumulative_us, d in reversed(entries[:index]):
+        if d <= depth:
+            break
+        if d == depth + 1:
+            children[name] = cumulative_us
+    return children
+
+
+def measure(module: str, repeat: int = 5, top: int = 5) -> Dict[str, Any]:
+    """Cumulative import time of one module in ms, median of `repeat` fresh interpreters"""
+    runs = []
+    entries: List[Tuple[str, int, int, int]] = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        entries = parse_importtime(proc.stderr)
+        cumulative = [cum for name, _, cum, _ in entries if name == module]
+        if not cumulative:
+            raise RuntimeError(f"{module} missing from -X importtime output")
+        runs.append(cumulative[0] / 1000)
+
+    children = sorted(direct_dependencies(entries, module).items(), key=lambda item: item[1], reverse=True)
+    return {
+        "import_ms": statistics.median(runs),
+        "min_ms": min(runs),
+        "modules_loaded": len(entries),
+        "top_dependencies": {name: cum / 1000 for name, cum in children[:top]},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            min_delta_ms: float) -> List[Dict[str, Any]]:
+    """Modules whose import got slower than the baseline by more than tolerance and min_delta_ms"""
+    regressions = []
+    for module, result in current["modules"].items():
+        base = baseline.get("modules", {}).get(module)
+        if not base or not base.get("import_ms"):
+            continue
+        delta = result["import_ms"] - base["import_ms"]
+        change = delta / base["import_ms"]
+        # Small modules jitter by a millisecond or two; only flag real growth
+        if change > tolerance and delta > min_delta_ms:
+            regressions.append({
+                "module": module,
+                "baseline": base["import_ms"],
+                "current": result["import_ms"],
+                "change": change,
+            })
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", help="Modules to measure (default: all public modules)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against a saved results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=3.0,
+                        help="Ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "modules": {module: measure(module, args.repeat) for module in (args.only or public_modules())},
+    }
+    for module, result in results["modules"].items():
+        top = ", ".join(f"{name} {ms:.1f}" for name, ms in result["top_dependencies"].items())
+        print(f"{module:<32} {result['import_ms']:8.1f} ms  ({top})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for r in regressions:
+            print(f"REGRESSION {r['module']}: {r['baseline']:.1f} -> {r['current']:.1f} ms ({r['change']:+.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
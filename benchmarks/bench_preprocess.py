@@ -0,0 +1,75 @@
+"""Compare FaceDetector preprocessing against the legacy multi-pass pipeline.
+
+Usage: python benchmarks/bench_preprocess.py [--frames N] [--size W H]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.emotion.detection import FaceDetector
+
+
+def legacy_preprocess(frame: np.ndarray, input_size: tuple) -> np.ndarray:
+    """Preprocessing as it was before the fused letterbox path"""
+    img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    img = cv2.resize(img, input_size)
+    img = img.astype(np.float32)
+    img = (img - 127.5) / 128.0
+    img = img.transpose(2, 0, 1)
+    return np.expand_dims(img, axis=0)
+
+
+def measure(fn, frame: np.ndarray, frames: int) -> dict:
+    fn(frame)  # Warm up buffers
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(frame)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ms_per_frame": elapsed / frames * 1000, "peak_alloc_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 640], metavar=("W", "H"))
+    parser.add_argument("--frame-size", type=int, nargs=2, default=[1280, 720], metavar=("W", "H"))
+    args = parser.parse_args()
+
+    with patch("onnxruntime.InferenceSession"):
+        detector = FaceDetector({
+            "model_path": "unused.onnx",
+            "min_confidence": 0.5,
+            "max_faces": 5,
+            "input_size": args.size,
+            "landmark_points": 5
+        })
+
+    frame_w, frame_h = args.frame_size
+    frame = np.random.randint(0, 255, (frame_h, frame_w, 3), dtype=np.uint8)
+
+    results = {
+        "legacy": measure(lambda f: legacy_preprocess(f, tuple(args.size)), frame, args.frames),
+        "fused": measure(detector._preprocess, frame, args.frames),
+    }
+    for name, stats in results.items():
+        print(f"{name:>8}: {stats['ms_per_frame']:.3f} ms/frame, "
+              f"peak allocation {stats['peak_alloc_bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
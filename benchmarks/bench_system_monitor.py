@@ -0,0 +1,53 @@
+"""Measure CPU used by the SystemMonitor thread.
+
+Runs the monitor with its default collectors and reports the monitor
+thread's CPU time as a percentage of wall time, for /proc-backed and
+psutil-backed collectors. The budget is 0.1% at the default 1s interval.
+
+Usage: python benchmarks/bench_system_monitor.py [--seconds N] [--interval S]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.collectors import PROCFS_AVAILABLE
+from utils.system_monitor import SystemMonitor
+
+BUDGET_PERCENT = 0.1
+
+
+def measure(procfs: bool, seconds: float, interval: float) -> dict:
+    monitor = SystemMonitor(interval=interval, procfs=procfs)
+    monitor.start()
+    time.sleep(seconds)
+    monitor.stop()
+    overhead = monitor.get_overhead()
+    overhead["enabled_collectors"] = [c.name for c in monitor.collectors.values() if c.enabled]
+    return overhead
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    modes = [("procfs", True), ("psutil", False)] if PROCFS_AVAILABLE else [("psutil", False)]
+    exit_code = 0
+    for label, procfs in modes:
+        result = measure(procfs, args.seconds, args.interval)
+        within = result["cpu_percent"] <= BUDGET_PERCENT
+        if procfs == PROCFS_AVAILABLE and not within:
+            exit_code = 1  # Only the default configuration has to meet the budget
+        print(f"{label:>7}: {result['cpu_percent']:.4f}% CPU "
+              f"({result['thread_cpu_seconds'] * 1000:.1f} ms over {result['run_seconds']:.1f} s, "
+              f"collectors: {', '.join(result['enabled_collectors'])}) "
+              f"{'OK' if within else 'OVER BUDGET'}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
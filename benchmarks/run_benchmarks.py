@@ -0,0 +1,344 @@
+"""Offline benchmark suite for the emotion and async processing components.
+
+Builds stand-in ONNX models locally (see stand_in_models.py), runs each
+component on synthetic inputs and reports throughput, p50/p95/p99 latency
+and peak RSS. Needs no network and no GPU: sessions are pinned to the CPU
+provider. Each benchmark runs in its own spawned process so peak RSS is
+attributable to that component alone.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.1
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stand_in_models import build_detector, build_recognizer
+from utils.config_loader import ConfigLoader
+
+EMOTION_CONFIG = ConfigLoader(os.path.join(ROOT, "configs")).get_config("emotion")
+LABELS = EMOTION_CONFIG["model"]["output_classes"]
+
+# Metrics where a larger value is a regression; throughput is the reverse
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+
+def runtime_options(threads: int) -> Dict[str, Any]:
+    return {
+        "intra_op_threads": threads,
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization": "all",
+        "providers": ["CPUExecutionProvider"],
+    }
+
+
+def summarize(latencies: List[float], items: int, elapsed: float, unit: str) -> Dict[str, Any]:
+    lat_ms = np.asarray(latencies, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99])
+    return {
+        "unit": unit,
+        "iterations": len(latencies),
+        "throughput": items / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": float(lat_ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def timed_loop(fn: Callable[[int], Any], iterations: int, warmup: int, items_per_call: int,
+               unit: str) -> Dict[str, Any]:
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, iterations * items_per_call, elapsed, unit)
+
+
+def bench_detector(params: Dict[str, Any]) -> Dict[str, Any]:
+    """FaceDetector.detect_arrays on 1280x720 noise frames with the emotion.yaml settings"""
+    from services.emotion.detection import FaceDetector
+
+    detector = FaceDetector({
+        "model_path": params["detector_path"],
+        "min_confidence": EMOTION_CONFIG["detection"]["min_confidence"],
+        "max_faces": EMOTION_CONFIG["detection"]["max_faces"],
+        "input_size": EMOTION_CONFIG["model"]["input_size"],
+        "landmark_points": EMOTION_CONFIG["detection"]["landmark_points"],
+        "runtime": runtime_options(params["threads"]),
+    })
+    rng = np.random.default_rng(params["seed"])
+    frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(4)]
+    return timed_loop(lambda i: detector.detect_arrays(frames[i % len(frames)]),
+                      params["iterations"], params["warmup"], 1, "frames")
+
+
+def bench_recognizer(params: Dict[str, Any]) -> Dict[str, Any]:
+    """EmotionRecognizer.recognize_batch on five 112x112 face crops"""
+    from services.emotion.recognition import EmotionRecognizer
+
+    recognizer = EmotionRecognizer({
+        "model_path": params["recognizer_path"],
+        "labels": LABELS,
+        "input_size": EMOTION_CONFIG["model"]["recog_input_size"],
+        "threshold": EMOTION_CONFIG["model"]["threshold"],
+        "runtime": runtime_options(params["threads"]),
+    })
+    rng = np.random.default_rng(params["seed"])
+    crops = [rng.integers(0, 255, (112, 112, 3), dtype=np.uint8) for _ in range(5)]
+    return timed_loop(lambda i: recognizer.recognize_batch(crops),
+                      params["iterations"], params["warmup"], len(crops), "faces")
+
+
+def _emotion_samples(seed: int, count: int) -> List[Dict[str, float]]:
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(count):
+        present = rng.choice(len(LABELS), size=3, replace=False)
+        samples.append({LABELS[j]: float(rng.random()) for j in present})
+    return samples
+
+
+def bench_tracker(params: Dict[str, Any]) -> Dict[str, Any]:
+    """EmotionTracker.update followed by get_dominant, as the pipeline calls it"""
+    from services.emotion.tracker import EmotionTracker
+
+    tracker = EmotionTracker(EMOTION_CONFIG["tracking"])
+    samples = _emotion_samples(params["seed"], 256)
+
+    def step(i: int):
+        tracker.update(samples[i % len(samples)])
+        tracker.get_dominant()
+
+    return timed_loop(step, params["iterations"] * 10, params["warmup"], 1, "updates")
+
+
+def bench_tracker_bank(params: Dict[str, Any]) -> Dict[str, Any]:
+    """EmotionTrackerBank.update_many across 64 sessions per call"""
+    from services.emotion.tracker import EmotionTrackerBank
+
+    sessions = list(range(64))
+    bank = EmotionTrackerBank(dict(EMOTION_CONFIG["tracking"], labels=LABELS))
+    for session_id in sessions:
+        bank.add_session(session_id)
+    rng = np.random.default_rng(params["seed"])
+    scores = rng.random((16, len(sessions), len(LABELS)))
+    scores[scores < 0.6] = np.nan
+
+    def step(i: int):
+        bank.update_many(sessions, scores[i % len(scores)], time.time())
+        bank.get_engagement_many(sessions)
+
+    return timed_loop(step, params["iterations"] * 10, params["warmup"], len(sessions), "session_updates")
+
+
+def _submit_and_wait(submit: Callable[[], List[concurrent.futures.Future]], calls: int,
+                     unit: str) -> Dict[str, Any]:
+    """Submission-to-completion latency for every task, throughput over the whole run"""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    futures = []
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        submitted = time.perf_counter()
+        for future in submit():
+            def record(_, submitted=submitted):
+                with lock:
+                    latencies.append(time.perf_counter() - submitted)
+            future.add_done_callback(record)
+            futures.append(future)
+        # Stay under the queue bound so no task is rejected
+        if len(futures) % 50 == 0:
+            concurrent.futures.wait(futures[-50:])
+    concurrent.futures.wait(futures)
+    elapsed = time.perf_counter() - start
+    return summarize(latencies, len(futures), elapsed, unit)
+
+
+def _work(n: int) -> int:
+    return sum(range(n))
+
+
+def bench_async_processor(params: Dict[str, Any]) -> Dict[str, Any]:
+    """AsyncProcessor.submit round trips with small CPU-bound tasks"""
+    from utils.async_processor import AsyncProcessor
+
+    processor = AsyncProcessor(max_workers=4, queue_size=100)
+    try:
+        _submit_and_wait(lambda: [processor.submit(_work, 200)], params["warmup"], "tasks")
+        return _submit_and_wait(lambda: [processor.submit(_work, 200)], params["iterations"] * 10, "tasks")
+    finally:
+        processor.shutdown()
+
+
+def _batch_work(items: List[int]) -> List[int]:
+    return [_work(n) for n in items]
+
+
+def bench_async_batch_processor(params: Dict[str, Any]) -> Dict[str, Any]:
+    """AsyncBatchProcessor grouping single submissions into batched calls"""
+    from utils.async_processor import AsyncBatchProcessor
+
+    processor = AsyncBatchProcessor(batch_size=8, max_workers=2, max_queue_size=100,
+                                    max_batch_latency_ms=2.0)
+    try:
+        _submit_and_wait(lambda: processor.submit_batch(_batch_work, [200]), params["warmup"], "items")
+        return _submit_and_wait(lambda: processor.submit_batch(_batch_work, [200]),
+                                params["iterations"] * 10, "items")
+    finally:
+        processor.shutdown()
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "detector": bench_detector,
+    "recognizer": bench_recognizer,
+    "tracker": bench_tracker,
+    "tracker_bank": bench_tracker_bank,
+    "async_processor": bench_async_processor,
+    "async_batch_processor": bench_async_batch_processor,
+}
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_one(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    result = BENCHMARKS[name](params)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_suite(names: List[str], params: Dict[str, Any], isolate: bool = True) -> Dict[str, Any]:
+    """Run the named benchmarks and return the results document"""
+    results = {}
+    for name in names:
+        if isolate:
+            context = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results[name] = pool.submit(run_one, name, params).result()
+        else:
+            results[name] = run_one(name, params)
+        r = results[name]
+        print(f"{name:>22}: {r['throughput']:10.1f} {r['unit']}/s  p50 {r['p50_ms']:8.3f} ms  "
+              f"p95 {r['p95_ms']:8.3f} ms  p99 {r['p99_ms']:8.3f} ms  rss {r['peak_rss_mb']:7.1f} MiB")
+
+    import onnxruntime as ort
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "onnxruntime": ort.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {k: v for k, v in params.items() if not k.endswith("_path")},
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """List metrics that got worse than the baseline by more than tolerance (a fraction)"""
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        checks = [("throughput", False)] + [(metric, True) for metric in LOWER_IS_BETTER]
+        for metric, lower_is_better in checks:
+            if metric not in base or not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            if (change > tolerance) if lower_is_better else (change < -tolerance):
+                regressions.append({
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": result[metric],
+                    "change": change,
+                })
+    return regressions
+
+
+def build_models(models_dir: Path) -> Dict[str, str]:
+    return {
+        "detector_path": str(build_detector(models_dir / "det_10g_stand_in.onnx")),
+        "recognizer_path": str(build_recognizer(
+            models_dir / "emotion_stand_in.onnx",
+            input_size=tuple(EMOTION_CONFIG["model"]["recog_input_size"]),
+            num_classes=len(LABELS),
+        )),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against a saved results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Allowed relative slowdown before flagging a regression")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="Run in this process (peak RSS then covers all benchmarks so far)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench_models_") as models_dir:
+        params = {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "threads": args.threads,
+            "seed": args.seed,
+            **build_models(Path(models_dir)),
+        }
+        report = run_suite(args.only or list(BENCHMARKS), params, isolate=not args.no_isolate)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['benchmark']}.{r['metric']}: {r['baseline']:.3f} -> "
+                  f"{r['current']:.3f} ({r['change']:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
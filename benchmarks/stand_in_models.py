@@ -0,0 +1,136 @@
+"""Generate small ONNX models with the same I/O signatures as the production models.
+
+The detector stand-in mirrors det_10g as FaceDetector consumes it: input
+"data" [1, 3, H, W] with dynamic H/W, outputs bboxes [N, 4] (normalized
+xyxy), landmarks [N, 10] and scores [N, 1], with two anchors per stride-8
+cell like the real model's densest head. The emotion stand-in takes
+[B, 1, H, W] grayscale crops and returns [B, num_classes] logits.
+
+Weights come from a fixed seed, so the same arguments always produce the
+same model file.
+"""
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+OPSET = 17
+ANCHORS_PER_CELL = 2
+LANDMARK_VALUES = 10
+
+
+def _conv(nodes: list, inits: list, rng: np.random.Generator, name: str, x: str,
+          in_ch: int, out_ch: int, kernel: int, stride: int, relu: bool = True,
+          bias: float = 0.0) -> str:
+    weight = rng.normal(0, np.sqrt(2.0 / (in_ch * kernel * kernel)),
+                        (out_ch, in_ch, kernel, kernel)).astype(np.float32)
+    inits.append(numpy_helper.from_array(weight, f"{name}_w"))
+    inits.append(numpy_helper.from_array(np.full(out_ch, bias, dtype=np.float32), f"{name}_b"))
+    pad = kernel // 2
+    nodes.append(helper.make_node(
+        "Conv", [x, f"{name}_w", f"{name}_b"], [f"{name}_out"],
+        strides=[stride, stride], pads=[pad] * 4, kernel_shape=[kernel, kernel]
+    ))
+    if not relu:
+        return f"{name}_out"
+    nodes.append(helper.make_node("Relu", [f"{name}_out"], [f"{name}_relu"]))
+    return f"{name}_relu"
+
+
+def _const(inits: list, name: str, value) -> str:
+    inits.append(numpy_helper.from_array(np.asarray(value), name))
+    return name
+
+
+def _save(graph: onnx.GraphProto, path: Path) -> Path:
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", OPSET)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, str(path))
+    return path
+
+
+def build_detector(path: Path, seed: int = 0, score_gain: float = 4.0, score_bias: float = -3.0) -> Path:
+    """Write a det_10g stand-in.
+
+    score_gain and score_bias shape the score logits. The defaults put a few
+    percent of anchors above a 0.7 threshold on uniform-noise frames, which
+    is enough to exercise top-k and NMS.
+    """
+    rng = np.random.default_rng(seed)
+    nodes, inits = [], []
+    channels = ANCHORS_PER_CELL * (4 + LANDMARK_VALUES + 1)
+
+    x = _conv(nodes, inits, rng, "stem", "data", 3, 8, 3, 2)
+    x = _conv(nodes, inits, rng, "stage1", x, 8, 16, 3, 2)
+    x = _conv(nodes, inits, rng, "stage2", x, 16, 16, 3, 2)
+    x = _conv(nodes, inits, rng, "head", x, 16, channels, 1, 1, relu=False)
+
+    # [1, A*15, H/8, W/8] -> [N, 15] with one row per anchor
+    nodes.append(helper.make_node("Transpose", [x], ["head_nhwc"], perm=[0, 2, 3, 1]))
+    nodes.append(helper.make_node("Reshape", ["head_nhwc", _const(inits, "rows_shape", np.array([-1, 15], dtype=np.int64))],
+                                  ["rows"]))
+    nodes.append(helper.make_node(
+        "Split", ["rows", _const(inits, "split_sizes", np.array([4, LANDMARK_VALUES, 1], dtype=np.int64))],
+        ["box_raw", "kps_raw", "score_raw"], axis=1
+    ))
+
+    # Boxes: sigmoid corner in [0, 0.8] plus a size in [0.02, 0.22], so x2 > x1
+    nodes.append(helper.make_node("Sigmoid", ["box_raw"], ["box_sig"]))
+    nodes.append(helper.make_node(
+        "Split", ["box_sig", _const(inits, "xy_wh", np.array([2, 2], dtype=np.int64))], ["xy_sig", "wh_sig"], axis=1
+    ))
+    nodes.append(helper.make_node("Mul", ["xy_sig", _const(inits, "xy_scale", np.float32(0.8))], ["xy1"]))
+    nodes.append(helper.make_node("Mul", ["wh_sig", _const(inits, "wh_scale", np.float32(0.2))], ["wh_scaled"]))
+    nodes.append(helper.make_node("Add", ["wh_scaled", _const(inits, "wh_min", np.float32(0.02))], ["wh"]))
+    nodes.append(helper.make_node("Add", ["xy1", "wh"], ["xy2"]))
+    nodes.append(helper.make_node("Concat", ["xy1", "xy2"], ["bboxes"], axis=1))
+
+    nodes.append(helper.make_node("Sigmoid", ["kps_raw"], ["landmarks"]))
+    nodes.append(helper.make_node("Mul", ["score_raw", _const(inits, "score_gain", np.float32(score_gain))],
+                                  ["score_scaled"]))
+    nodes.append(helper.make_node("Add", ["score_scaled", _const(inits, "score_bias", np.float32(score_bias))],
+                                  ["score_logit"]))
+    nodes.append(helper.make_node("Sigmoid", ["score_logit"], ["scores"]))
+
+    graph = helper.make_graph(
+        nodes, "det_10g_stand_in",
+        [helper.make_tensor_value_info("data", TensorProto.FLOAT, [1, 3, "height", "width"])],
+        [
+            helper.make_tensor_value_info("bboxes", TensorProto.FLOAT, ["anchors", 4]),
+            helper.make_tensor_value_info("landmarks", TensorProto.FLOAT, ["anchors", LANDMARK_VALUES]),
+            helper.make_tensor_value_info("scores", TensorProto.FLOAT, ["anchors", 1]),
+        ],
+        inits,
+    )
+    return _save(graph, Path(path))
+
+
+def build_recognizer(path: Path, input_size: Tuple[int, int] = (64, 64), num_classes: int = 8,
+                     seed: int = 0, batch_size: Optional[int] = None) -> Path:
+    """Write an emotion-model stand-in; the batch dimension is dynamic unless batch_size is given"""
+    rng = np.random.default_rng(seed)
+    nodes, inits = [], []
+    width, height = input_size
+
+    x = _conv(nodes, inits, rng, "conv1", "input", 1, 16, 3, 2)
+    x = _conv(nodes, inits, rng, "conv2", x, 16, 32, 3, 2)
+    x = _conv(nodes, inits, rng, "conv3", x, 32, 64, 3, 2)
+    nodes.append(helper.make_node("GlobalAveragePool", [x], ["pooled"]))
+    nodes.append(helper.make_node("Flatten", ["pooled"], ["features"]))
+    fc = rng.normal(0, 0.5, (64, num_classes)).astype(np.float32)
+    nodes.append(helper.make_node(
+        "Gemm", ["features", _const(inits, "fc_w", fc), _const(inits, "fc_b", np.zeros(num_classes, np.float32))],
+        ["logits"]
+    ))
+
+    graph = helper.make_graph(
+        nodes, "emotion_stand_in",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [batch_size or "batch", 1, height, width])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, [batch_size or "batch", num_classes])],
+        inits,
+    )
+    return _save(graph, Path(path))
@@ -1,167 +1,368 @@
 import os
 import requests
 import argparse
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from tqdm import tqdm
 import hashlib
 import zipfile
 import sys
 
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from utils.model_store import CHUNK_SIZE, ModelStore, file_sha256
+
+# "preprocessing" holds the input normalization each model expects,
+# (pixel - mean) / std per channel, recorded in the model store manifest.
+# Zip packs key it by member file name.
 MODELS = {
     "buffalo_l": {
         "url": "https://github.com/deepinsight/insightface/releases/download/v0.7/buffalo_l.zip",
+        # Only the members we use are extracted; the pack also holds
+        # w600k_r50.onnx, genderage.onnx and 2d106det.onnx
         "files": [
             "det_10g.onnx",
-            "w600k_r50.onnx",
-            "genderage.onnx",
-            "2d106det.onnx"
-        ]
+        ],
+        "preprocessing": {
+            "det_10g.onnx": {"color": "rgb", "layout": "nchw", "mean": 127.5, "std": 128.0},
+        }
     },
     "affectnet_emotion": {
         "url": "https://github.com/onnx/models/raw/main/validated/vision/body_analysis/emotion_ferplus/model/emotion-ferplus-8.onnx",
-        "sha256": "a2a2ba6a335a3b29c21acb6272f962bd3d47f84952aaffa03b60986e04efa61c"
+        "sha256": "a2a2ba6a335a3b29c21acb6272f962bd3d47f84952aaffa03b60986e04efa61c",
+        "preprocessing": {"color": "gray", "layout": "nchw", "mean": 127.5, "std": 127.5}
     }
 }
 
-def download_file(url: str, dest: Path, chunk_size=1024):
-    """Download a file with progress bar"""
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status() 
-        
-        total_size = int(response.headers.get('content-length', 0))
-        
-        with open(dest, 'wb') as f, tqdm(
-            desc=f"Downloading {dest.name}",
-            total=total_size,
-            unit='iB',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for data in response.iter_content(chunk_size=chunk_size):
-                size = f.write(data)
-                bar.update(size)
-        return True
-    except Exception as e:
-        print(f"Download failed: {e}")
-        return False
+MANIFEST_NAME = "manifest.json"
+
+
+class DownloadError(Exception):
+    """A download failed after all retries, or its checksum did not match"""
+
+
+class Manifest:
+    """Verified hashes of files under the models directory.
+
+    An entry records the sha256 along with the size and mtime the file had
+    when it was hashed, so a later run can trust the hash without reading
+    the file again as long as neither has changed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        if path.exists():
+            try:
+                self.entries = json.loads(path.read_text()).get("files", {})
+            except (ValueError, OSError) as e:
+                print(f"Ignoring unreadable manifest {path}: {e}")
+
+    def _key(self, file_path: Path) -> str:
+        return os.path.relpath(file_path, self.path.parent)
+
+    def record(self, file_path: Path, sha256: str):
+        st = file_path.stat()
+        with self._lock:
+            self.entries[self._key(file_path)] = {
+                "sha256": sha256, "size": st.st_size, "mtime_ns": st.st_mtime_ns
+            }
+
+    def lookup(self, file_path: Path) -> Optional[str]:
+        """The recorded sha256 if the file is unchanged since it was hashed"""
+        with self._lock:
+            entry = self.entries.get(self._key(file_path))
+        if entry is None or not file_path.exists():
+            return None
+        st = file_path.stat()
+        if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+            return None
+        return entry["sha256"]
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"files": self.entries}, indent=2, sort_keys=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(data)
+        os.replace(tmp, self.path)
+
+
+def download_file(url: str, dest: Path, expected_sha: Optional[str] = None, chunk_size: int = CHUNK_SIZE,
+                  retries: int = 3, session: Optional[requests.Session] = None, position: int = 0,
+                  keep_invalid: bool = False) -> str:
+    """Download url to dest and return its sha256.
+
+    Data goes to dest.part and is hashed as it arrives. An interrupted
+    transfer (this run or an earlier one) resumes from the end of the
+    .part file with an HTTP Range request. dest only appears once the
+    download is complete and, if expected_sha is given, verified.
+    """
+    session = session or requests.Session()
+    part = dest.with_name(dest.name + ".part")
 
-def verify_checksum(file_path: Path, expected_sha: str) -> bool:
-    """Verify file SHA256 checksum"""
+    for attempt in range(retries + 1):
+        sha256 = hashlib.sha256()
+        offset = part.stat().st_size if part.exists() else 0
+        if offset:
+            # Hash the bytes we already have; only the new ones cross the network
+            with open(part, 'rb') as f:
+                for data in iter(lambda: f.read(chunk_size), b''):
+                    sha256.update(data)
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, stream=True, headers=headers, timeout=30) as response:
+                if response.status_code == 416:
+                    # Range starts at the end: the .part file is already complete
+                    total = offset
+                else:
+                    response.raise_for_status()
+                    if offset and response.status_code != 206:
+                        print(f"Server ignored the range request for {dest.name}; starting over")
+                        offset = 0
+                        sha256 = hashlib.sha256()
+                    length = response.headers.get('content-length')
+                    total = offset + int(length) if length is not None else None
+
+                    with open(part, 'ab' if offset else 'wb') as f, tqdm(
+                        desc=f"Downloading {dest.name}",
+                        total=total,
+                        initial=offset,
+                        unit='iB',
+                        unit_scale=True,
+                        unit_divisor=1024,
+                        position=position,
+                        leave=False,
+                    ) as bar:
+                        for data in response.iter_content(chunk_size=chunk_size):
+                            f.write(data)
+                            sha256.update(data)
+                            bar.update(len(data))
+
+            size = part.stat().st_size
+            if total is not None and size != total:
+                raise requests.exceptions.ConnectionError(f"got {size} of {total} bytes")
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            if attempt == retries:
+                raise DownloadError(f"{dest.name}: {e} (partial data kept in {part.name})") from e
+            print(f"{dest.name}: {e}; resuming (attempt {attempt + 2}/{retries + 1})")
+            continue
+        except requests.exceptions.HTTPError as e:
+            raise DownloadError(f"{dest.name}: {e}") from e
+
+        actual_sha = sha256.hexdigest()
+        if expected_sha and actual_sha != expected_sha:
+            if keep_invalid:
+                os.replace(part, dest.with_name(dest.name + ".invalid"))
+            else:
+                part.unlink()
+            raise DownloadError(
+                f"Checksum mismatch for {dest.name}\nExpected: {expected_sha}\nActual:   {actual_sha}"
+            )
+        os.replace(part, dest)
+        return actual_sha
+
+    raise DownloadError(f"{dest.name}: download did not complete")
+
+
+def verify_checksum(file_path: Path, expected_sha: str, manifest: Optional[Manifest] = None) -> bool:
+    """Verify file SHA256 checksum, trusting the manifest when the file is unchanged"""
     if not expected_sha:
         print(f"Skipping checksum for {file_path.name}")
         return True
-        
-    print(f"Verifying checksum for {file_path.name}...")
-    sha256 = hashlib.sha256()
-    with open(file_path, 'rb') as f:
-        while True:
-            data = f.read(65536)
-            if not data:
-                break
-            sha256.update(data)
-    
-    actual_sha = sha256.hexdigest()
+
+    actual_sha = manifest.lookup(file_path) if manifest else None
+    if actual_sha is None:
+        print(f"Verifying checksum for {file_path.name}...")
+        actual_sha = file_sha256(file_path)
+        if manifest and actual_sha == expected_sha:
+            manifest.record(file_path, actual_sha)
+
     if actual_sha == expected_sha:
-        print("Checksum verified")
         return True
-        
+
     print(f"Checksum mismatch!\nExpected: {expected_sha}\nActual:   {actual_sha}")
     return False
 
-def unzip_file(zip_path: Path, extract_to: Path):
-    """Unzip a file"""
+
+def unzip_file(zip_path: Path, extract_to: Path, members: Optional[list] = None,
+               manifest: Optional[Manifest] = None) -> bool:
+    """Extract the named members (matched by file name) from a zip, hashing them as they are written.
+
+    Members are written flat into extract_to, so archive paths cannot
+    escape it. Each goes to <name>.part first and is moved into place once
+    fully written and hashed, so an interrupted extraction never leaves a
+    truncated model behind. Extracts everything when members is None.
+    """
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to)
+            wanted = set(members) if members is not None else None
+            found = set()
+            for info in zip_ref.infolist():
+                name = Path(info.filename).name
+                if info.is_dir() or (wanted is not None and name not in wanted):
+                    continue
+                target = extract_to / name
+                part = target.with_name(target.name + ".part")
+                sha256 = hashlib.sha256()
+                try:
+                    with zip_ref.open(info) as src, open(part, 'wb') as dst:
+                        for data in iter(lambda: src.read(CHUNK_SIZE), b''):
+                            dst.write(data)
+                            sha256.update(data)
+                except BaseException:
+                    part.unlink(missing_ok=True)
+                    raise
+                os.replace(part, target)
+                if manifest:
+                    manifest.record(target, sha256.hexdigest())
+                found.add(name)
+        if wanted is not None and wanted - found:
+            print(f"Missing from {zip_path.name}: {', '.join(sorted(wanted - found))}")
+            return False
         zip_path.unlink()
         return True
     except Exception as e:
         print(f"Failed to unzip {zip_path.name}: {e}")
         return False
 
-def main(models_dir: str, models: list):
-    base_dir = Path(models_dir)
-    base_dir.mkdir(parents=True, exist_ok=True)
-    
+
+def fetch_model(model_name: str, model_info: dict, base_dir: Path, manifest: Manifest,
+                position: int = 0, keep_invalid: bool = False) -> bool:
+    """Download, verify and unpack one model; returns True when it is ready to use"""
+    expected_sha = model_info.get("sha256")
+
+    if model_info["url"].endswith(".zip"):
+        zip_path = base_dir / f"{model_name}.zip"
+        extracted_dir = base_dir / model_name
+        extracted_dir.mkdir(exist_ok=True)
+        files = model_info.get("files")
+
+        # Only members the manifest recorded after a complete extraction (and
+        # that are unchanged since) count; a bare file may be a leftover
+        if files and all(manifest.lookup(extracted_dir / file) is not None for file in files):
+            print(f"{model_name} already exists")
+            return True
+
+        if not zip_path.exists():
+            print(f"Downloading {model_name} model pack...")
+            try:
+                download_file(model_info["url"], zip_path, expected_sha, position=position,
+                              keep_invalid=keep_invalid)
+            except DownloadError as e:
+                print(f"Failed to download {model_name}: {e}")
+                return False
+
+        print(f"Extracting {', '.join(files) if files else 'all files'} from {zip_path.name}...")
+        if not unzip_file(zip_path, extracted_dir, files, manifest):
+            print(f"Failed to extract {model_name}")
+            return False
+        print(f"Successfully extracted {model_name}")
+        return True
+
+    dest_path = base_dir / f"{model_name}.onnx"
+    if dest_path.exists():
+        if not expected_sha:
+            print(f"{model_name} already exists (no checksum verification)")
+            return True
+        if verify_checksum(dest_path, expected_sha, manifest):
+            print(f"{model_name} already exists and valid")
+            return True
+        print(f"Invalid checksum for {model_name}, re-downloading")
+        dest_path.unlink()
+
+    print(f"Downloading {model_name}...")
+    try:
+        sha = download_file(model_info["url"], dest_path, expected_sha, position=position,
+                            keep_invalid=keep_invalid)
+    except DownloadError as e:
+        print(f"Failed to download {model_name}: {e}")
+        return False
+    manifest.record(dest_path, sha)
+    if not expected_sha:
+        print(f"No checksum provided for {model_name}")
+    return True
+
+
+def model_files(model_name: str, model_info: dict, base_dir: Path) -> Dict[str, Tuple[Path, dict]]:
+    """Store name -> (fetched file, preprocessing) for each ONNX file a model provides"""
+    preprocessing = model_info.get("preprocessing", {})
+    if model_info["url"].endswith(".zip"):
+        return {
+            f"{model_name}/{Path(file).stem}": (base_dir / model_name / file, preprocessing.get(file, {}))
+            for file in model_info.get("files") or []
+        }
+    return {model_name: (base_dir / f"{model_name}.onnx", preprocessing)}
+
+
+def store_models(store_dir: str, base_dir: Path, models: List[str], registry: dict) -> int:
+    """Add fetched models to the content-addressed store; returns the number that failed"""
+    store = ModelStore(store_dir)
+    failed = 0
     for model_name in models:
-        if model_name not in MODELS:
-            print(f"Unknown model: {model_name}")
-            continue
-            
-        model_info = MODELS[model_name]
-        
-        if model_name == "buffalo_l":
-            zip_path = base_dir / "buffalo_l.zip"
-            extracted_dir = base_dir / "buffalo_l"
-            
-            extracted_dir.mkdir(exist_ok=True)
-            
-            all_files_exist = all(
-                (extracted_dir / file).exists() for file in model_info["files"]
-            )
-            
-            if all_files_exist:
-                print(f"InsightFace Buffalo_L model pack already exists")
+        for name, (path, preprocessing) in model_files(model_name, registry[model_name], base_dir).items():
+            try:
+                record = store.add(path, name, preprocessing)
+            except Exception as e:
+                print(f"Failed to store {name}: {e}")
+                failed += 1
                 continue
-                
-            if not zip_path.exists():
-                print(f"Downloading InsightFace Buffalo_L model pack...")
-                if not download_file(model_info["url"], zip_path):
-                    print("Failed to download Buffalo_L model pack")
-                    continue
-            
-            print("Extracting InsightFace Buffalo_L model pack...")
-            if unzip_file(zip_path, extracted_dir):
-                print("Successfully extracted InsightFace Buffalo_L model pack")
-            else:
-                print("Failed to extract model pack")
-                continue
-                
-            missing_files = [
-                file for file in model_info["files"] 
-                if not (extracted_dir / file).exists()
-            ]
-            
-            if missing_files:
-                print(f"Missing files after extraction: {', '.join(missing_files)}")
-            else:
-                print("All files extracted successfully")
-            continue
-        
-        dest_path = base_dir / f"{model_name}.onnx"
-        
-        if dest_path.exists():
-            if "sha256" in model_info:
-                if verify_checksum(dest_path, model_info["sha256"]):
-                    print(f"{model_name} already exists and valid")
-                    continue
-                else:
-                    print(f"Invalid checksum for {model_name}, re-downloading")
-                    dest_path.unlink()
-            else:
-                print(f"{model_name} already exists (no checksum verification)")
-                continue
-        
-        print(f"Downloading {model_name}...")
-        if not download_file(model_info["url"], dest_path):
-            print(f"Failed to download {model_name}")
-            continue
-        
-        if "sha256" in model_info:
-            if not verify_checksum(dest_path, model_info["sha256"]):
-                print(f"Checksum verification failed for {model_name}")
-                if input("Delete invalid file? (y/n): ").lower() == 'y':
-                    dest_path.unlink()
-        else:
-            print(f"No checksum provided for {model_name}")
+            print(f"Stored {name} as sha256:{record.sha256} (use \"store:{name}\" in configs)")
+    return failed
+
+
+def main(models_dir: str, models: list, jobs: int = 4, keep_invalid: bool = False,
+         registry: Optional[dict] = None, store_dir: Optional[str] = None) -> int:
+    """Fetch models concurrently, adding them to the model store if store_dir is set;
+    returns the number of models that failed"""
+    registry = registry if registry is not None else MODELS
+    base_dir = Path(models_dir)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    manifest = Manifest(base_dir / MANIFEST_NAME)
+
+    unknown = [name for name in models if name not in registry]
+    for model_name in unknown:
+        print(f"Unknown model: {model_name}")
+    selected = [name for name in models if name in registry]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(selected) or 1))) as pool:
+        futures = {
+            name: pool.submit(fetch_model, name, registry[name], base_dir, manifest, position, keep_invalid)
+            for position, name in enumerate(selected)
+        }
+        failed = [name for name, future in futures.items() if not future.result()]
+
+    manifest.save()
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    stored_failures = 0
+    if store_dir:
+        stored_failures = store_models(store_dir, base_dir, [name for name in selected if name not in failed],
+                                       registry)
+    return len(failed) + len(unknown) + stored_failures
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Download emotion AI models")
     parser.add_argument("--models-dir", default="data/models", help="Models directory")
-    parser.add_argument("--models", nargs="+", 
+    parser.add_argument("--models", nargs="+",
                         default=["buffalo_l", "affectnet_emotion"],
                         help="Models to download")
+    parser.add_argument("--jobs", type=int, default=4, help="Concurrent downloads")
+    parser.add_argument("--keep-invalid", action="store_true",
+                        help="Keep downloads that fail verification as <name>.invalid instead of deleting them")
+    parser.add_argument("--store", nargs="?", const="", default=None, metavar="DIR",
+                        help="Also add the models to the content-addressed model store "
+                             "(default DIR: MODEL_STORE_DIR or <models-dir>/store)")
     args = parser.parse_args()
-    
-    main(args.models_dir, args.models)
\ No newline at end of file
+
+    store_dir = args.store
+    if store_dir == "":
+        store_dir = os.getenv("MODEL_STORE_DIR") or os.path.join(args.models_dir, "store")
+    sys.exit(1 if main(args.models_dir, args.models, args.jobs, args.keep_invalid, store_dir=store_dir) else 0)
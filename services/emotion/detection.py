@@ -1,70 +1,215 @@
-import cv2
+import time
 import numpy as np
-import onnxruntime as ort
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, Optional, Sequence, Tuple, Union
+from utils.config_snapshot import DetectorConfig
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics
+from utils.session_registry import session_registry
+
+cv2 = lazy_import("cv2")
+ort = lazy_import("onnxruntime")
+
+# InsightFace normalization: (pixel - 127.5) / 128
+_PIXEL_MEAN = np.float32(127.5)
+_PIXEL_SCALE = np.float32(1.0 / 128.0)
+
+_preprocess_time = metrics.histogram("detector.preprocess")
+_inference_time = metrics.histogram("detector.inference")
+_postprocess_time = metrics.histogram("detector.postprocess")
+_faces_detected = metrics.counter("detector.faces")
+
+
+class Letterbox(NamedTuple):
+    """Aspect-preserving resize geometry from frame to model input"""
+    scale: float
+    pad_x: int
+    pad_y: int
+    frame_w: int
+    frame_h: int
+
+
+class Detections(NamedTuple):
+    """Array-form detection results, ordered by descending confidence"""
+    boxes: np.ndarray      # [K x 4] float32 (x1, y1, x2, y2) in frame pixels
+    scores: np.ndarray     # [K] float32
+    landmarks: np.ndarray  # [K x landmark_points x 2] float32 in frame pixels
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert to the list-of-dicts shape returned by FaceDetector.detect"""
+        boxes = self.boxes.astype(np.int32)
+        boxes[:, 2:] -= boxes[:, :2]
+        landmarks = self.landmarks.astype(np.int32)
+
+        return [
+            {
+                "box": tuple(box),
+                "confidence": score,
+                "landmarks": [tuple(point) for point in points]
+            }
+            for box, score, points in zip(
+                boxes.tolist(), self.scores.tolist(), landmarks.tolist()
+            )
+        ]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores in descending order, without a full sort"""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if scores.size > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.size)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def nms(boxes: np.ndarray, order: np.ndarray, iou_threshold: float, max_keep: int) -> np.ndarray:
+    """Greedy non-maximum suppression over boxes visited in `order`.
+
+    Returns the kept indices in visiting order, stopping after `max_keep`.
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+
+    keep = []
+    while order.size > 0 and len(keep) < max_keep:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.intp)
+
 
 class FaceDetector:
-    def __init__(self, config: dict):
+    def __init__(self, config: Union[DetectorConfig, dict]):
+        if not isinstance(config, DetectorConfig):
+            config = DetectorConfig.from_dict(config)
         self.config = config
-        self.model = self._load_model(config['model_path'])
-        self.min_confidence = config['min_confidence']
-        self.max_faces = config['max_faces']
-        self.input_size = tuple(config['input_size'])
-        self.landmark_points = config['landmark_points']
-        
-    def _load_model(self, model_path: str) -> ort.InferenceSession:
-        available_providers = ort.get_available_providers()
-        providers = ['CUDAExecutionProvider'] if 'CUDAExecutionProvider' in available_providers else ['CPUExecutionProvider']
-        return ort.InferenceSession(
-            model_path,
-            providers=providers
-        )
-    
-    def _preprocess(self, frame: np.ndarray) -> np.ndarray:
-        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = cv2.resize(img, self.input_size)
-        img = img.astype(np.float32)
-        img = (img - 127.5) / 128.0  # InsightFace normalization
-        img = img.transpose(2, 0, 1)  # HWC to CHW
-        return np.expand_dims(img, axis=0)
-    
-    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        self.model = self._load_model(config.model_path)
+        self.min_confidence = config.min_confidence
+        self.max_faces = config.max_faces
+        self.input_size = config.input_size
+        self.landmark_points = config.landmark_points
+        self.nms_threshold = config.nms_threshold
+        self.pre_nms_top_k = config.pre_nms_top_k
+
+        in_w, in_h = self.input_size
+        self._input_buffer = np.empty((1, 3, in_h, in_w), dtype=np.float32)
+        self._frame_shape: Optional[Tuple[int, int]] = None
+
+    def _load_model(self, model_path: str) -> "ort.InferenceSession":
+        return session_registry.get_session(model_path, self.config.runtime)
+
+    def set_input_size(self, input_size) -> None:
+        """Change the model input size; buffers are rebuilt on the next frame"""
+        self.input_size = tuple(input_size)
+        in_w, in_h = self.input_size
+        self._input_buffer = np.empty((1, 3, in_h, in_w), dtype=np.float32)
+        self._frame_shape = None
+
+    def _update_letterbox(self, orig_w: int, orig_h: int) -> Letterbox:
+        """Recompute letterbox geometry and buffers when the frame size changes"""
+        in_w, in_h = self.input_size
+        scale = min(in_w / orig_w, in_h / orig_h)
+        new_w = min(in_w, max(1, int(round(orig_w * scale))))
+        new_h = min(in_h, max(1, int(round(orig_h * scale))))
+        pad_x = (in_w - new_w) // 2
+        pad_y = (in_h - new_h) // 2
+
+        self._frame_shape = (orig_h, orig_w)
+        self._letterbox = Letterbox(scale, pad_x, pad_y, orig_w, orig_h)
+        self._resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        self._input_region = self._input_buffer[0, :, pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+        self._input_buffer.fill(-_PIXEL_MEAN * _PIXEL_SCALE)  # Black padding after normalization
+        return self._letterbox
+
+    def _preprocess(self, frame: np.ndarray) -> Tuple[np.ndarray, Letterbox]:
+        """Letterbox, normalize and transpose a BGR frame into the reusable input buffer"""
         orig_h, orig_w = frame.shape[:2]
-        input_data = self._preprocess(frame)
-        
+        if self._frame_shape != (orig_h, orig_w):
+            self._update_letterbox(orig_w, orig_h)
+
+        resized = self._resized
+        if resized.shape == frame.shape:
+            resized = frame
+        else:
+            cv2.resize(frame, resized.shape[1::-1], dst=resized)
+
+        # BGR to RGB, HWC to CHW and InsightFace normalization in one pass per channel
+        for channel in range(3):
+            out = self._input_region[channel]
+            np.subtract(resized[:, :, 2 - channel], _PIXEL_MEAN, out=out, dtype=np.float32)
+            np.multiply(out, _PIXEL_SCALE, out=out)
+
+        return self._input_buffer, self._letterbox
+
+    def _postprocess(self, outputs: List[np.ndarray], letterbox: Letterbox) -> Detections:
+        """Filter, scale, suppress and rank raw model outputs"""
+        bboxes = np.asarray(outputs[0], dtype=np.float32).reshape(-1, 4)
+        landmarks = np.asarray(outputs[1], dtype=np.float32)
+        scores = np.asarray(outputs[2], dtype=np.float32).reshape(-1)
+
+        candidates = np.flatnonzero(scores >= self.min_confidence)
+        order = candidates[top_k_indices(scores[candidates], self.pre_nms_top_k)]
+
+        # Model outputs are normalized to the letterboxed input; map back to the frame
+        in_scale = np.array(self.input_size, dtype=np.float32) / letterbox.scale
+        offset = np.array([letterbox.pad_x, letterbox.pad_y], dtype=np.float32) / letterbox.scale
+        limits = np.array([letterbox.frame_w, letterbox.frame_h], dtype=np.float32)
+
+        boxes = bboxes * np.tile(in_scale, 2) - np.tile(offset, 2)
+        keep = nms(boxes, order, self.nms_threshold, self.max_faces)
+        boxes = np.clip(boxes[keep], 0, np.tile(limits, 2))
+
+        if self.landmark_points > 0:
+            points = landmarks.reshape(len(bboxes), -1, 2)[keep, :self.landmark_points] * in_scale - offset
+        else:
+            points = np.empty((len(keep), 0, 2), dtype=np.float32)
+
+        return Detections(boxes, scores[keep], points)
+
+    def detect_arrays(self, frame: np.ndarray) -> Detections:
+        """Detect faces and return results as arrays"""
+        start = time.perf_counter()
+        input_data, letterbox = self._preprocess(frame)
+        start = _preprocess_time.observe_since(start)
+
         outputs = self.model.run(
             None,
             {"data": input_data}
         )
-        
-        bboxes = outputs[0]
-        landmarks = outputs[1]
-        scores = outputs[2]
-        
-        faces = []
-        for i in range(min(bboxes.shape[1], self.max_faces)):
-            confidence = float(scores[0, i])
-            if confidence < self.min_confidence:
-                continue
-                
-            box = bboxes[0, i]
-            x1 = int(box[0] * orig_w)
-            y1 = int(box[1] * orig_h)
-            x2 = int(box[2] * orig_w)
-            y2 = int(box[3] * orig_h)
-            width, height = x2 - x1, y2 - y1
-            
-            face_landmarks = []
-            if self.landmark_points > 0:
-                for j in range(self.landmark_points):
-                    lx = landmarks[0, i, 2*j] * orig_w
-                    ly = landmarks[0, i, 2*j+1] * orig_h
-                    face_landmarks.append((int(lx), int(ly)))
-            
-            faces.append({
-                "box": (x1, y1, width, height),
-                "confidence": confidence,
-                "landmarks": face_landmarks
-            })
-        
-        return sorted(faces, key=lambda x: x['confidence'], reverse=True)
\ No newline at end of file
+        start = _inference_time.observe_since(start)
+
+        detections = self._postprocess(outputs, letterbox)
+        _postprocess_time.observe_since(start)
+        _faces_detected.inc(len(detections))
+        return detections
+
+    def detect(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+        return self.detect_arrays(frame).to_dicts()
+
+    def warmup(self, input_sizes: Optional[Sequence[Sequence[int]]] = None,
+               runs: int = 1) -> Dict[Tuple[int, int], float]:
+        """Run the model on blank inputs at each (width, height) so ONNX Runtime
+        allocates and plans for every shape before real frames arrive.
+
+        Defaults to the current input size. Metrics are not recorded.
+        Returns the seconds spent per size.
+        """
+        timings = {}
+        for in_w, in_h in dict.fromkeys(tuple(size) for size in (input_sizes or [self.input_size])):
+            blank = np.full((1, 3, in_h, in_w), -_PIXEL_MEAN * _PIXEL_SCALE, dtype=np.float32)
+            start = time.perf_counter()
+            for _ in range(runs):
+                self.model.run(None, {"data": blank})
+            timings[(in_w, in_h)] = time.perf_counter() - start
+        return timings
@@ -0,0 +1,180 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+from services.emotion.detection import Detections
+from services.emotion.tracker import EmotionTracker
+from utils.config_snapshot import FaceTrackingConfig, TrackingConfig
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between [N x 4] and [M x 4] xyxy boxes"""
+    a = a[:, None, :]
+    b = b[None, :, :]
+    w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+@dataclass
+class FaceTrack:
+    """A face followed across frames, with its own emotion history"""
+    track_id: int
+    box: np.ndarray                      # (x1, y1, x2, y2) in frame pixels
+    score: float                         # Detector confidence at last detection
+    landmarks: np.ndarray
+    emotions: EmotionTracker
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(4, dtype=np.float32))
+    hits: int = 1
+    missed: int = 0
+    frames_since_detection: int = 0
+    confidence: float = 0.0              # Score decayed by frames since detection
+
+    def to_dict(self) -> Dict:
+        x1, y1, x2, y2 = self.box.astype(np.int32).tolist()
+        return {
+            "track_id": self.track_id,
+            "box": (x1, y1, x2 - x1, y2 - y1),
+            "confidence": self.confidence,
+            "landmarks": [tuple(p) for p in self.landmarks.astype(np.int32).tolist()],
+            "emotion": self.emotions.get_dominant()
+        }
+
+
+class FaceTracker:
+    """Runs the face detector every N frames and carries tracks in between.
+
+    Between detections, boxes are moved with a constant-velocity motion model
+    and their confidence decays. Detection also runs early when any track's
+    confidence falls below `min_track_confidence` or when there are no tracks.
+    Detections are associated with tracks by greedy IoU matching.
+    """
+
+    def __init__(self, detector, config: Union[FaceTrackingConfig, dict],
+                 emotion_config: Union[TrackingConfig, dict]):
+        if not isinstance(config, FaceTrackingConfig):
+            config = FaceTrackingConfig.from_dict(config)
+        if not isinstance(emotion_config, TrackingConfig):
+            emotion_config = TrackingConfig.from_dict(emotion_config)
+        self.detector = detector
+        self.emotion_config = emotion_config  # Shared by every track's EmotionTracker
+        self.detection_interval = config.detection_interval
+        self.iou_threshold = config.iou_threshold
+        self.max_missed = config.max_missed
+        self.confidence_decay = config.confidence_decay
+        self.min_track_confidence = config.min_track_confidence
+        self.velocity_smoothing = config.velocity_smoothing
+
+        self.tracks: Dict[int, FaceTrack] = {}
+        self.frame_index = 0
+        self.detector_calls = 0
+        self._next_id = 0
+        self._frames_since_detection = 0
+
+    def _needs_detection(self) -> bool:
+        if not self.tracks or self._frames_since_detection >= self.detection_interval:
+            return True
+        return any(t.confidence < self.min_track_confidence for t in self.tracks.values())
+
+    def _predict(self):
+        """Advance all tracks by one frame using their estimated velocity"""
+        for track in self.tracks.values():
+            track.box = track.box + track.velocity
+            track.frames_since_detection += 1
+            track.confidence = track.score * self.confidence_decay ** track.frames_since_detection
+
+    def _associate(self, detections: Detections) -> Dict[int, int]:
+        """Greedily match detection indices to track ids by descending IoU"""
+        if not self.tracks or not len(detections):
+            return {}
+
+        track_ids = list(self.tracks)
+        track_boxes = np.stack([self.tracks[t].box for t in track_ids])
+        ious = iou_matrix(detections.boxes, track_boxes)
+
+        matches = {}
+        while True:
+            det_idx, trk_idx = np.unravel_index(np.argmax(ious), ious.shape)
+            if ious[det_idx, trk_idx] < self.iou_threshold:
+                break
+            matches[int(det_idx)] = track_ids[trk_idx]
+            ious[det_idx, :] = -1.0
+            ious[:, trk_idx] = -1.0
+        return matches
+
+    def _apply_detections(self, detections: Detections):
+        matches = self._associate(detections)
+        matched_tracks = set(matches.values())
+
+        for det_idx in range(len(detections)):
+            box = detections.boxes[det_idx].astype(np.float32)
+            score = float(detections.scores[det_idx])
+            landmarks = detections.landmarks[det_idx]
+
+            track_id = matches.get(det_idx)
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+                self.tracks[track_id] = FaceTrack(
+                    track_id=track_id,
+                    box=box,
+                    score=score,
+                    landmarks=landmarks,
+                    emotions=EmotionTracker(self.emotion_config),
+                    confidence=score
+                )
+                continue
+
+            track = self.tracks[track_id]
+            steps = max(track.frames_since_detection, 1)
+            # Box was already predicted forward, so correct the velocity by the residual
+            observed = track.velocity + (box - track.box) / steps
+            alpha = self.velocity_smoothing
+            track.velocity = alpha * observed + (1 - alpha) * track.velocity
+            track.box = box
+            track.score = score
+            track.confidence = score
+            track.landmarks = landmarks
+            track.hits += 1
+            track.missed = 0
+            track.frames_since_detection = 0
+
+        for track_id in list(self.tracks):
+            if track_id in matched_tracks:
+                continue
+            track = self.tracks[track_id]
+            if track.frames_since_detection == 0:
+                continue  # Created this frame
+            track.missed += 1
+            if track.missed > self.max_missed:
+                del self.tracks[track_id]
+
+    def update(self, frame: np.ndarray) -> List[FaceTrack]:
+        """Process a frame and return the active tracks"""
+        self.frame_index += 1
+        self._frames_since_detection += 1
+        self._predict()
+
+        if self._needs_detection():
+            self.detector_calls += 1
+            self._frames_since_detection = 0
+            self._apply_detections(self.detector.detect_arrays(frame))
+
+        return list(self.tracks.values())
+
+    def update_emotions(self, emotions: Dict[int, Dict[str, float]]):
+        """Feed recognizer output into each track's EmotionTracker"""
+        for track_id, scores in emotions.items():
+            track = self.tracks.get(track_id)
+            if track is not None:
+                track.emotions.update(scores)
+
+    def get_track(self, track_id: int) -> Optional[FaceTrack]:
+        return self.tracks.get(track_id)
+
+    def reset(self):
+        """Drop all tracks"""
+        self.tracks.clear()
+        self._frames_since_detection = 0
@@ -1,53 +1,133 @@
+import time
 import numpy as np
-import onnxruntime as ort
-import cv2
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Union
+from utils.config_snapshot import RecognizerConfig
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics
+from utils.session_registry import session_registry
+
+cv2 = lazy_import("cv2")
+ort = lazy_import("onnxruntime")
+
+_preprocess_time = metrics.histogram("recognizer.preprocess")
+_inference_time = metrics.histogram("recognizer.inference")
+_postprocess_time = metrics.histogram("recognizer.postprocess")
+_faces_recognized = metrics.counter("recognizer.faces")
 
 class EmotionRecognizer:
-    def __init__(self, config: dict):
+    def __init__(self, config: Union[RecognizerConfig, dict]):
+        if not isinstance(config, RecognizerConfig):
+            config = RecognizerConfig.from_dict(config)
         self.config = config
-        self.model = self._load_model(config['model_path'])
-        self.labels = config['labels']
-        self.input_size = tuple(config['input_size'])
-        self.threshold = config['threshold']
-        
-    def _load_model(self, model_path: str) -> ort.InferenceSession:
-        available_providers = ort.get_available_providers()
-        providers = ['CUDAExecutionProvider'] if 'CUDAExecutionProvider' in available_providers else ['CPUExecutionProvider']
-        return ort.InferenceSession(
-            model_path,
-            providers=providers
-        )
-    
+        self.model = self._load_model(config.model_path)
+        self.labels = config.labels
+        self.input_size = config.input_size
+        self.threshold = config.threshold
+        self.input_name = self.model.get_inputs()[0].name
+        self.max_batch_size = self._get_max_batch_size()
+
+    def _load_model(self, model_path: str) -> "ort.InferenceSession":
+        return session_registry.get_session(model_path, self.config.runtime)
+
+    def _get_max_batch_size(self) -> int:
+        """Return the fixed batch dimension of the model, or 0 if it is dynamic"""
+        batch_dim = self.model.get_inputs()[0].shape[0]
+        if isinstance(batch_dim, int) and batch_dim > 0:
+            return batch_dim
+        return 0
+
     def _preprocess_face(self, face_img: np.ndarray) -> np.ndarray:
-        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-        
-        img = cv2.resize(gray, self.input_size)
-        
-        img = img.astype(np.float32)
-        img = img / 255.0
-        img = img - 0.5
-        img = img * 2.0
-        
-        img = np.expand_dims(img, axis=0)  
-        return np.expand_dims(img, axis=0) 
-    
+        return self._preprocess_batch([face_img])
+
+    def _preprocess_batch(self, face_imgs: Sequence[np.ndarray]) -> np.ndarray:
+        """Stack face crops into a single normalized NCHW tensor"""
+        width, height = self.input_size
+        batch = np.empty((len(face_imgs), 1, height, width), dtype=np.float32)
+
+        for i, face_img in enumerate(face_imgs):
+            gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+            batch[i, 0] = cv2.resize(gray, self.input_size)
+
+        # (x / 255 - 0.5) * 2, applied in place over the whole batch
+        batch *= 2.0 / 255.0
+        batch -= 1.0
+        return batch
+
+    def _run(self, input_data: np.ndarray) -> np.ndarray:
+        """Run the model, splitting the batch if the model has a fixed batch size.
+
+        A fixed-batch model only accepts exactly max_batch_size rows, so a
+        short final chunk is zero-padded and the padding rows dropped again.
+        """
+        if not self.max_batch_size or len(input_data) == self.max_batch_size:
+            return self.model.run(None, {self.input_name: input_data})[0]
+
+        chunks = []
+        for start in range(0, len(input_data), self.max_batch_size):
+            chunk = input_data[start:start + self.max_batch_size]
+            rows = len(chunk)
+            if rows < self.max_batch_size:
+                padded = np.zeros((self.max_batch_size,) + chunk.shape[1:], dtype=chunk.dtype)
+                padded[:rows] = chunk
+                chunk = padded
+            chunks.append(np.asarray(self.model.run(None, {self.input_name: chunk})[0])[:rows])
+        return np.concatenate(chunks, axis=0)
+
+    def _postprocess(self, logits: np.ndarray) -> List[Dict[str, float]]:
+        """Softmax and threshold a [N x outputs] logit matrix.
+
+        The softmax runs over every model output; outputs past the last
+        label still take their share of probability but are never reported.
+        """
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = (exp / exp.sum(axis=1, keepdims=True))[:, :len(self.labels)]
+
+        mask = probs >= self.threshold
+        empty = ~mask.any(axis=1)
+        if empty.any():
+            rows = np.flatnonzero(empty)
+            mask[rows, probs[rows].argmax(axis=1)] = True
+
+        results = []
+        for row_probs, row_mask in zip(probs.tolist(), mask):
+            results.append({
+                self.labels[i]: row_probs[i] for i in np.flatnonzero(row_mask)
+            })
+        return results
+
     def recognize(self, face_img: np.ndarray) -> Dict[str, float]:
-        input_data = self._preprocess_face(face_img)
-        
-        input_name = self.model.get_inputs()[0].name
-        outputs = self.model.run(None, {input_name: input_data})[0][0]
-        
-        exp = np.exp(outputs - np.max(outputs))
-        probs = exp / exp.sum()
-        
-        results = {}
-        for i, label in enumerate(self.labels):
-            if probs[i] >= self.threshold:
-                results[label] = float(probs[i])
-        
-        if not results:
-            max_idx = np.argmax(probs)
-            results[self.labels[max_idx]] = float(probs[max_idx])
-            
-        return results
\ No newline at end of file
+        return self.recognize_batch([face_img])[0]
+
+    def recognize_batch(self, face_imgs: Sequence[np.ndarray]) -> List[Dict[str, float]]:
+        """Recognize emotions for several face crops with a single model run"""
+        if len(face_imgs) == 0:
+            return []
+
+        start = time.perf_counter()
+        input_data = self._preprocess_batch(face_imgs)
+        start = _preprocess_time.observe_since(start)
+        logits = np.asarray(self._run(input_data), dtype=np.float32)
+        start = _inference_time.observe_since(start)
+        results = self._postprocess(logits.reshape(len(face_imgs), -1))
+        _postprocess_time.observe_since(start)
+        _faces_recognized.inc(len(face_imgs))
+        return results
+
+    def warmup(self, batch_sizes: Optional[Sequence[int]] = None, runs: int = 1) -> Dict[int, float]:
+        """Run the model on blank batches of each size so ONNX Runtime
+        allocates and plans for them before real faces arrive.
+
+        A model with a fixed batch size only ever sees that size. Metrics
+        are not recorded. Returns the seconds spent per batch size.
+        """
+        if self.max_batch_size:
+            batch_sizes = [self.max_batch_size]
+        width, height = self.input_size
+        timings = {}
+        for batch_size in dict.fromkeys(batch_sizes or [1]):
+            blank = np.zeros((batch_size, 1, height, width), dtype=np.float32)
+            start = time.perf_counter()
+            for _ in range(runs):
+                self._run(blank)
+            timings[batch_size] = time.perf_counter() - start
+        return timings
@@ -1,84 +1,360 @@
+import math
 import numpy as np
-from collections import deque
-from typing import Dict, List, Deque
+from typing import Any, Dict, List, Optional, Sequence, Union
 import time
+from utils.config_snapshot import ConfigError, TrackingConfig
+from utils.metrics import metrics
+
+# Rebase the decay reference time once weights grow past e**_REBASE_EXPONENT
+_REBASE_EXPONENT = 10.0
 
 class EmotionTracker:
-    def __init__(self, config: dict):
-        self.window_size = config['buffer_size']
-        self.decay_rate = config['decay_rate']
-        self.transition_threshold = config['transition_threshold']
-        self.engagement_threshold = config['engagement_threshold']
-        self.history: Dict[str, Deque[float]] = {}
+    """Smoothed emotion state over a window of recent scores.
+
+    History is a [labels x buffer_size] ring buffer of raw scores and their
+    timestamps. Decay is applied lazily: a sample taken at t counts as
+    score * decay_rate ** (last_update - t). Running sums are kept in a frame
+    relative to a reference time so each update is O(labels).
+    """
+
+    def __init__(self, config: Union[TrackingConfig, dict]):
+        if not isinstance(config, TrackingConfig):
+            config = TrackingConfig.from_dict(config)
+        self.window_size = config.buffer_size
+        self.decay_rate = config.decay_rate
+        self.transition_threshold = config.transition_threshold
+        self.engagement_threshold = config.engagement_threshold
         self.current_emotion = "neutral"
         self.current_confidence = 0.0
         self.stable_count = 0
         self.last_update = time.time()
-        
+
+        self._log_decay = config.log_decay
+        self._ref_time = self.last_update
+        self.labels: List[str] = []
+        self._label_index: Dict[str, int] = {}
+        self._scores = np.zeros((0, self.window_size))
+        self._times = np.zeros((0, self.window_size))
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._heads = np.zeros(0, dtype=np.int64)
+        self._sums = np.zeros(0)
+
+        self._means = np.zeros(0)
+        self._score_cache: Dict[str, float] = {}
+        self._engagement = 1.0
+        self._intensity = 0.0
+
+    def _add_label(self, emotion: str) -> int:
+        index = len(self.labels)
+        self.labels.append(emotion)
+        self._label_index[emotion] = index
+        self._scores = np.vstack([self._scores, np.zeros((1, self.window_size))])
+        self._times = np.vstack([self._times, np.zeros((1, self.window_size))])
+        self._counts = np.append(self._counts, 0)
+        self._heads = np.append(self._heads, 0)
+        self._sums = np.append(self._sums, 0.0)
+        return index
+
+    def _weight(self, timestamp: float) -> float:
+        return math.exp(-self._log_decay * (timestamp - self._ref_time))
+
+    def _rebase(self, ref_time: float):
+        """Move the reference time forward and recompute the running sums exactly"""
+        self._ref_time = ref_time
+        valid = np.arange(self.window_size) < self._counts[:, None]
+        weights = np.exp(-self._log_decay * (self._times - ref_time))
+        self._sums = (self._scores * weights * valid).sum(axis=1)
+
+    @metrics.timed("tracker.update")
     def update(self, emotions: Dict[str, float]):
         current_time = time.time()
-        time_diff = current_time - self.last_update
         self.last_update = current_time
-        
-        for emotion in self.history:
-            decay_factor = self.decay_rate ** time_diff
-            self.history[emotion] = deque(
-                [score * decay_factor for score in self.history[emotion]],
-                maxlen=self.window_size
-            )
-        
+
+        if not self.labels or (current_time - self._ref_time) * -self._log_decay > _REBASE_EXPONENT:
+            self._rebase(current_time)
+
+        weight = self._weight(current_time)
         for emotion, score in emotions.items():
-            if emotion not in self.history:
-                self.history[emotion] = deque(maxlen=self.window_size)
-            self.history[emotion].append(score)
-            
+            index = self._label_index.get(emotion)
+            if index is None:
+                index = self._add_label(emotion)
+
+            head = self._heads[index]
+            if self._counts[index] == self.window_size:
+                self._sums[index] -= self._scores[index, head] * self._weight(self._times[index, head])
+            else:
+                self._counts[index] += 1
+
+            self._scores[index, head] = score
+            self._times[index, head] = current_time
+            self._sums[index] += score * weight
+            self._heads[index] = (head + 1) % self.window_size
+
+        self._refresh_aggregates()
         dominant, confidence = self._get_dominant()
-        
+
         if self.current_emotion == dominant:
             self.stable_count += 1
         else:
             self.stable_count = max(0, self.stable_count - 1)
-            
-        if (confidence > self.current_confidence + self.transition_threshold or 
+
+        if (confidence > self.current_confidence + self.transition_threshold or
             (dominant != self.current_emotion and self.stable_count >= 3)):
             self.current_emotion = dominant
             self.current_confidence = confidence
             self.stable_count = 0
-            
+
+    def _refresh_aggregates(self):
+        """Recompute decayed window means and derived scores once per update"""
+        factor = math.exp(self._log_decay * (self.last_update - self._ref_time))
+        self._means = factor * self._sums / np.maximum(self._counts, 1)
+        self._score_cache = dict(zip(self.labels, self._means.tolist()))
+
+        self._engagement = 1.0 - self._score_cache.get("neutral", 0.0)
+        non_neutral = [s for e, s in self._score_cache.items() if e != "neutral" and s > 0]
+        self._intensity = max(non_neutral) if non_neutral else 0.0
+
     def _get_dominant(self) -> tuple:
-        if not self.history:
+        if not self.labels:
             return ("neutral", 0.0)
-            
-        avg_scores = {}
-        for emotion, scores in self.history.items():
-            if scores:
-                avg_scores[emotion] = np.mean(list(scores))
-        
-        dominant = max(avg_scores, key=avg_scores.get)
-        return (dominant, avg_scores[dominant])
-    
+
+        index = int(np.argmax(self._means))
+        return (self.labels[index], float(self._means[index]))
+
+    @property
+    def history(self) -> Dict[str, List[float]]:
+        """Decayed scores per emotion, oldest first"""
+        factor = np.exp(self._log_decay * (self.last_update - self._times))
+        decayed = self._scores * factor
+        history = {}
+        for index, emotion in enumerate(self.labels):
+            count, head = self._counts[index], self._heads[index]
+            order = (np.arange(head - count, head)) % self.window_size
+            history[emotion] = decayed[index, order].tolist()
+        return history
+
     def get_dominant(self) -> str:
         return self.current_emotion
-    
+
     def get_scores(self) -> Dict[str, float]:
-        return {
-            e: np.mean(list(scores)) if scores else 0.0
-            for e, scores in self.history.items()
-        }
-    
+        return dict(self._score_cache)
+
     def get_engagement(self) -> float:
         """Calculate engagement score (1 - neutral confidence)"""
-        scores = self.get_scores()
-        neutral_score = scores.get("neutral", 0.0)
-        return 1.0 - neutral_score
-    
+        return self._engagement
+
     def is_engaged(self) -> bool:
         """Check if user is emotionally engaged"""
-        return self.get_engagement() > self.engagement_threshold
-    
+        return self._engagement > self.engagement_threshold
+
     def get_emotional_intensity(self) -> float:
         """Get overall emotional intensity (max of non-neutral emotions)"""
-        scores = self.get_scores()
-        non_neutral = {e: s for e, s in scores.items() 
-                       if e != "neutral" and s > 0}
-        return max(non_neutral.values()) if non_neutral else 0.0
\ No newline at end of file
+        return self._intensity
+
+
+class EmotionTrackerBank:
+    """EmotionTracker state for many sessions, stored as struct-of-arrays.
+
+    Each session gets a slot in [sessions x labels x buffer_size] score and
+    timestamp buffers plus per-slot transition state. update_many() applies
+    the EmotionTracker.update logic to a batch of sessions in one vectorized
+    step. Labels are fixed up front (config.labels); NaN entries in a
+    score row mean the label was not reported, like a missing dict key.
+    Ties between labels resolve in label order rather than first-seen order.
+    """
+
+    def __init__(self, config: Union[TrackingConfig, dict], capacity: int = 64):
+        if not isinstance(config, TrackingConfig):
+            config = TrackingConfig.from_dict(config)
+        if not config.labels:
+            raise ConfigError("EmotionTrackerBank needs tracking labels")
+        self.labels: List[str] = list(config.labels)
+        self.window_size = config.buffer_size
+        self.decay_rate = config.decay_rate
+        self.transition_threshold = config.transition_threshold
+        self.engagement_threshold = config.engagement_threshold
+        self._log_decay = config.log_decay
+        self._label_index = config.label_index
+        self._neutral = self._label_index.get("neutral", -1)
+
+        self._slots: Dict[Any, int] = {}
+        self._free: List[int] = []
+        self._capacity = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        """Grow all per-slot buffers to hold `capacity` sessions"""
+        n_labels, window = len(self.labels), self.window_size
+        old = self._capacity
+
+        def grow(array: Optional[np.ndarray], shape: tuple, dtype, fill=0) -> np.ndarray:
+            new = np.full((capacity,) + shape, fill, dtype=dtype)
+            if array is not None:
+                new[:old] = array
+            return new
+
+        self._scores = grow(getattr(self, "_scores", None), (n_labels, window), np.float64)
+        self._times = grow(getattr(self, "_times", None), (n_labels, window), np.float64)
+        self._counts = grow(getattr(self, "_counts", None), (n_labels,), np.int64)
+        self._heads = grow(getattr(self, "_heads", None), (n_labels,), np.int64)
+        self._sums = grow(getattr(self, "_sums", None), (n_labels,), np.float64)
+        self._means = grow(getattr(self, "_means", None), (n_labels,), np.float64)
+        self._ref_time = grow(getattr(self, "_ref_time", None), (), np.float64)
+        self.last_update = grow(getattr(self, "last_update", None), (), np.float64)
+        self.current_emotion = grow(getattr(self, "current_emotion", None), (), np.int64, self._neutral)
+        self.current_confidence = grow(getattr(self, "current_confidence", None), (), np.float64)
+        self.stable_count = grow(getattr(self, "stable_count", None), (), np.int64)
+
+        self._free.extend(range(capacity - 1, old - 1, -1))
+        self._capacity = capacity
+
+    def _reset_slot(self, slot: int, now: float):
+        self._counts[slot] = 0
+        self._heads[slot] = 0
+        self._sums[slot] = 0.0
+        self._means[slot] = 0.0
+        self._ref_time[slot] = now
+        self.last_update[slot] = now
+        self.current_emotion[slot] = self._neutral
+        self.current_confidence[slot] = 0.0
+        self.stable_count[slot] = 0
+
+    def add_session(self, session_id: Any) -> int:
+        """Register a session and return its slot, reusing freed slots first"""
+        if session_id in self._slots:
+            return self._slots[session_id]
+        if not self._free:
+            self._allocate(max(2 * self._capacity, 1))
+
+        slot = self._free.pop()
+        self._reset_slot(slot, time.time())
+        self._slots[session_id] = slot
+        return slot
+
+    def remove_session(self, session_id: Any) -> bool:
+        """Release a session's slot for reuse"""
+        slot = self._slots.pop(session_id, None)
+        if slot is None:
+            return False
+        self._free.append(slot)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, session_id: Any) -> bool:
+        return session_id in self._slots
+
+    def _rebase(self, slots: np.ndarray, ref_time: np.ndarray):
+        """Move reference times forward and recompute the running sums exactly"""
+        self._ref_time[slots] = ref_time
+        valid = np.arange(self.window_size) < self._counts[slots][..., None]
+        weights = np.exp(-self._log_decay * (self._times[slots] - ref_time[:, None, None]))
+        self._sums[slots] = (self._scores[slots] * weights * valid).sum(axis=2)
+
+    @metrics.timed("tracker_bank.update")
+    def update_many(self, session_ids: Sequence[Any], score_matrix: np.ndarray,
+                    timestamps: Optional[np.ndarray] = None):
+        """Apply one update to each session.
+
+        score_matrix is [sessions x labels] in self.labels order; NaN marks
+        labels that were not reported. timestamps defaults to one shared
+        time.time() reading.
+        """
+        # Validate before add_session so a rejected call allocates no slots
+        if len(set(session_ids)) != len(session_ids):
+            raise ValueError("Duplicate session ids in update_many")
+        scores = np.asarray(score_matrix, dtype=np.float64).reshape(len(session_ids), len(self.labels))
+        slots = np.fromiter((self.add_session(s) for s in session_ids), dtype=np.int64, count=len(session_ids))
+        if timestamps is None:
+            now = np.full(len(slots), time.time())
+        else:
+            now = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (len(slots),))
+
+        self.last_update[slots] = now
+        empty = self._counts[slots].sum(axis=1) == 0
+        stale = (now - self._ref_time[slots]) * -self._log_decay > _REBASE_EXPONENT
+        rebase = empty | stale
+        if rebase.any():
+            self._rebase(slots[rebase], now[rebase])
+
+        # Write every reported (session, label) sample into its ring buffer
+        rows, labels = np.nonzero(~np.isnan(scores))
+        cells = (slots[rows], labels)
+        heads = self._heads[cells]
+        ref = self._ref_time[slots[rows]]
+        full = self._counts[cells] == self.window_size
+
+        old_scores = self._scores[cells + (heads,)]
+        old_weights = np.exp(-self._log_decay * (self._times[cells + (heads,)] - ref))
+        self._sums[cells] -= np.where(full, old_scores * old_weights, 0.0)
+        self._counts[cells] += ~full
+
+        self._scores[cells + (heads,)] = scores[rows, labels]
+        self._times[cells + (heads,)] = now[rows]
+        self._sums[cells] += scores[rows, labels] * np.exp(-self._log_decay * (now[rows] - ref))
+        self._heads[cells] = (heads + 1) % self.window_size
+
+        # Decayed window means and dominant label per session
+        factor = np.exp(self._log_decay * (now - self._ref_time[slots]))
+        counts = self._counts[slots]
+        means = factor[:, None] * self._sums[slots] / np.maximum(counts, 1)
+        self._means[slots] = means
+
+        seen = counts > 0
+        ranked = np.where(seen, means, -np.inf)
+        dominant = ranked.argmax(axis=1)
+        confidence = means[np.arange(len(slots)), dominant]
+        has_any = seen.any(axis=1)
+        dominant = np.where(has_any, dominant, self._neutral)
+        confidence = np.where(has_any, confidence, 0.0)
+
+        # Hysteresis, as in EmotionTracker.update
+        current = self.current_emotion[slots]
+        current_confidence = self.current_confidence[slots]
+        same = current == dominant
+        stable = np.where(same, self.stable_count[slots] + 1, np.maximum(self.stable_count[slots] - 1, 0))
+        switch = (confidence > current_confidence + self.transition_threshold) | (~same & (stable >= 3))
+
+        self.current_emotion[slots] = np.where(switch, dominant, current)
+        self.current_confidence[slots] = np.where(switch, confidence, current_confidence)
+        self.stable_count[slots] = np.where(switch, 0, stable)
+
+    def update(self, session_id: Any, emotions: Dict[str, float], timestamp: Optional[float] = None):
+        """Dict-based single-session update"""
+        row = np.full((1, len(self.labels)), np.nan)
+        for emotion, score in emotions.items():
+            row[0, self._label_index[emotion]] = score
+        self.update_many([session_id], row, None if timestamp is None else [timestamp])
+
+    def _label(self, index: int) -> str:
+        return self.labels[index] if index >= 0 else "neutral"
+
+    def get_dominant(self, session_id: Any) -> str:
+        return self._label(int(self.current_emotion[self._slots[session_id]]))
+
+    def get_scores(self, session_id: Any) -> Dict[str, float]:
+        slot = self._slots[session_id]
+        seen = np.flatnonzero(self._counts[slot] > 0)
+        return {self.labels[i]: float(self._means[slot, i]) for i in seen}
+
+    def get_engagement_many(self, session_ids: Sequence[Any]) -> np.ndarray:
+        """Engagement (1 - neutral score) for several sessions"""
+        slots = [self._slots[s] for s in session_ids]
+        if self._neutral < 0:
+            return np.ones(len(slots))
+        return 1.0 - self._means[slots, self._neutral]
+
+    def get_engagement(self, session_id: Any) -> float:
+        """Calculate engagement score (1 - neutral confidence)"""
+        return float(self.get_engagement_many([session_id])[0])
+
+    def is_engaged(self, session_id: Any) -> bool:
+        """Check if user is emotionally engaged"""
+        return self.get_engagement(session_id) > self.engagement_threshold
+
+    def get_emotional_intensity(self, session_id: Any) -> float:
+        """Get overall emotional intensity (max of non-neutral emotions)"""
+        scores = self.get_scores(session_id)
+        non_neutral = [s for e, s in scores.items() if e != "neutral" and s > 0]
+        return max(non_neutral) if non_neutral else 0.0
@@ -0,0 +1,522 @@
+import queue
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from services.emotion.face_tracker import FaceTracker
+from services.pipeline.quality import QualityController, default_quality_levels
+from utils.config_snapshot import PIPELINE_MODES, ConfigError, EmotionConfig, PipelineConfig, StageConfig
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics
+from utils.time_utils import Synchronizer
+
+cv2 = lazy_import("cv2")
+
+logger = logging.getLogger(__name__)
+
+MODES = PIPELINE_MODES
+
+DEFAULT_STAGES = {
+    "detect": StageConfig(workers=1, queue_size=2),
+    "crop": StageConfig(workers=1, queue_size=4),
+    "recognize": StageConfig(workers=2, queue_size=4),
+    "track": StageConfig(workers=1, queue_size=8),
+}
+# Stages whose state (detector buffers, tracks, recognition and emission order) is not thread-safe
+SERIAL_STAGES = ("detect", "crop", "track")
+
+_end_to_end_time = metrics.histogram("pipeline.end_to_end")
+
+
+def prepare_frame(frame: np.ndarray, resize: Optional[Sequence[int]], crop_strategy: str = "none") -> np.ndarray:
+    """Apply frame_processing.resize, center-cropping to the target aspect first if asked"""
+    if not resize:
+        return frame
+    target_w, target_h = resize
+    h, w = frame.shape[:2]
+
+    if crop_strategy == "center":
+        target_aspect = target_w / target_h
+        if w / h > target_aspect:
+            crop_w = int(round(h * target_aspect))
+            x0 = (w - crop_w) // 2
+            frame = frame[:, x0:x0 + crop_w]
+        else:
+            crop_h = int(round(w / target_aspect))
+            y0 = (h - crop_h) // 2
+            frame = frame[y0:y0 + crop_h]
+
+    if frame.shape[1] == target_w and frame.shape[0] == target_h:
+        return frame
+    return cv2.resize(frame, (target_w, target_h))
+
+
+@dataclass
+class FrameTask:
+    """A frame and everything the stages attach to it"""
+    seq: int
+    frame: np.ndarray
+    submitted: float
+    tracks: List[Dict[str, Any]] = field(default_factory=list)
+    crops: List[np.ndarray] = field(default_factory=list)
+    crop_ids: List[int] = field(default_factory=list)
+    emotions: List[Dict[str, float]] = field(default_factory=list)
+    stage_times: Dict[str, float] = field(default_factory=dict)
+
+
+class Stage:
+    """Worker threads pulling from a bounded queue and pushing to the next stage"""
+
+    def __init__(self, name: str, fn: Callable[[FrameTask], Optional[FrameTask]],
+                 workers: int, queue_size: int, drop_stale: bool):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.drop_stale = drop_stale
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+        self.sink: Optional[Callable[[FrameTask], None]] = None
+        self.processed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads: Dict[int, threading.Thread] = {}
+        self._latency = metrics.histogram(f"pipeline.{name}")
+
+    def put(self, task: FrameTask) -> bool:
+        """Queue a task; in drop_stale mode the oldest queued task makes room"""
+        if not self.drop_stale:
+            while self._running:
+                try:
+                    self.queue.put(task, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        with self._lock:
+            while True:
+                try:
+                    self.queue.put_nowait(task)
+                    return True
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.queue.task_done()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def drop(self, task: FrameTask) -> None:
+        """Count a task this stage's fn discarded instead of passing on"""
+        with self._lock:
+            self.dropped += 1
+
+    def _work(self, index: int):
+        while self._running and index < self.workers:
+            try:
+                task = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                start = time.perf_counter()
+                result = self.fn(task)
+                if result is not None:
+                    result.stage_times[self.name] = self._latency.observe_since(start) - start
+                    with self._lock:
+                        self.processed += 1
+                    if self.next is not None:
+                        self.next.put(result)
+                    elif self.sink is not None:
+                        self.sink(result)
+            except Exception as e:
+                logger.exception(f"Stage {self.name} failed on frame {task.seq}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _spawn(self, index: int):
+        existing = self._threads.get(index)
+        if existing is not None and existing.is_alive():
+            return  # A worker that was told to exit sees the new count and stays
+        thread = threading.Thread(target=self._work, args=(index,), name=f"{self.name}-{index}", daemon=True)
+        self._threads[index] = thread
+        thread.start()
+
+    def start(self):
+        self._running = True
+        for i in range(self.workers):
+            self._spawn(i)
+
+    def set_workers(self, workers: int):
+        """Change the worker count; surplus workers exit after their current task"""
+        workers = max(1, workers)
+        with self._lock:
+            self.workers = workers
+            if self._running:
+                for i in range(workers):
+                    self._spawn(i)
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads.values():
+            thread.join(timeout=2.0)
+
+
+class PipelineEngine:
+    """Streaming detect -> crop -> recognize -> track pipeline built from config.
+
+    pipeline_config is configs/pipeline.yaml and emotion_config is
+    configs/emotion.yaml, either as loaded dicts or as PipelineConfig and
+    EmotionConfig snapshots (ConfigLoader.get_snapshot). Modes:
+        realtime:  paced at max_fps; full stage queues drop their oldest frame
+        debug:     paced at max_fps; nothing is dropped; per-frame stage times logged
+        benchmark: unpaced and lossless
+    The detector and recognizer are built from emotion_config unless given.
+
+    With pipeline.warmup enabled, start() first runs the models on blank
+    inputs at every detector input size the quality ladder can switch to
+    and every face batch size up to max_faces. `ready` is set once that is
+    done (straight away when warmup is off); run() waits for it.
+    """
+
+    def __init__(self, pipeline_config: Union[PipelineConfig, Dict[str, Any]],
+                 emotion_config: Union[EmotionConfig, Dict[str, Any]],
+                 detector=None, recognizer=None,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        if not isinstance(pipeline_config, PipelineConfig):
+            pipeline_config = PipelineConfig.from_dict(pipeline_config)
+        if not isinstance(emotion_config, EmotionConfig):
+            emotion_config = EmotionConfig.from_dict(emotion_config)
+        self.config = pipeline_config
+        self.emotion_config = emotion_config
+        self.mode = pipeline_config.mode
+        self.max_fps = pipeline_config.max_fps
+        self.fps_factor = 1.0
+        self.resize = pipeline_config.resize
+        self.crop_strategy = pipeline_config.crop_strategy
+
+        if detector is None:
+            from services.emotion.detection import FaceDetector
+            detector = FaceDetector(emotion_config.detector)
+        if recognizer is None:
+            from services.emotion.recognition import EmotionRecognizer
+            recognizer = EmotionRecognizer(emotion_config.recognizer)
+        self.detector = detector
+        self.recognizer = recognizer
+        self.face_tracker = FaceTracker(detector, emotion_config.face_tracking, emotion_config.tracking)
+
+        self.recognition_interval = 1
+        self._last_recognized: Dict[int, int] = {}
+        self._pending_quality: Optional[Dict[str, Any]] = None
+        self.quality: Optional[QualityController] = None
+        performance = pipeline_config.performance
+        if performance.dynamic_quality:
+            levels = [dict(level) for level in performance.quality_levels] or default_quality_levels(
+                emotion_config.detector.input_size,
+                self.face_tracker.detection_interval,
+                emotion_config.detector.max_faces
+            )
+            self.quality = QualityController(
+                performance.target_latency_ms, levels, on_change=self._queue_quality
+            )
+
+        self.on_result = on_result
+        self.results: queue.Queue = queue.Queue(maxsize=pipeline_config.result_queue_size)
+        self.frames_submitted = 0
+        self.frames_shed = 0
+        self.paused = False
+        self._seq = 0
+        self._synchronizer: Optional[Synchronizer] = None
+        self._last_track_seq = -1
+        self._config_subscriptions: List[Callable[[], None]] = []
+        self.ready = threading.Event()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self.warmup_timings: Dict[str, Dict[Any, float]] = {}
+
+        stage_config = {**DEFAULT_STAGES, **pipeline_config.stages}
+        for name in SERIAL_STAGES:
+            if stage_config[name].workers != 1:
+                raise ConfigError(
+                    f"pipeline.pipeline.stages.{name}.workers must be 1, got {stage_config[name].workers}"
+                )
+        drop_stale = self.mode == "realtime"
+        self.stages = [
+            Stage(name, fn, stage_config[name].workers, stage_config[name].queue_size, drop_stale)
+            for name, fn in (
+                ("detect", self._detect),
+                ("crop", self._crop),
+                ("recognize", self._recognize),
+                ("track", self._track),
+            )
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next = next_stage
+        self.stages[-1].sink = self._emit
+
+    def _queue_quality(self, level: int, settings: Dict[str, Any]):
+        # Applied by the detect worker so settings never change mid-frame
+        self._pending_quality = settings
+
+    def apply_quality(self, settings: Dict[str, Any]):
+        """Apply quality knobs: input_size, detection_interval, max_faces, recognition_interval"""
+        if "input_size" in settings and hasattr(self.detector, "set_input_size"):
+            self.detector.set_input_size(settings["input_size"])
+        if "max_faces" in settings:
+            self.detector.max_faces = settings["max_faces"]
+        if "detection_interval" in settings:
+            self.face_tracker.detection_interval = settings["detection_interval"]
+        if "recognition_interval" in settings:
+            self.recognition_interval = settings["recognition_interval"]
+
+    def _detect(self, task: FrameTask) -> FrameTask:
+        if self._pending_quality is not None:
+            settings, self._pending_quality = self._pending_quality, None
+            self.apply_quality(settings)
+        tracks = self.face_tracker.update(task.frame)
+        task.tracks = [{"track_id": t.track_id, "box": t.box.copy(), "confidence": t.confidence} for t in tracks]
+        return task
+
+    def _crop(self, task: FrameTask) -> FrameTask:
+        h, w = task.frame.shape[:2]
+        for track in task.tracks:
+            x1, y1, x2, y2 = np.clip(track["box"], 0, [w, h, w, h]).astype(np.int32)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            track_id = track["track_id"]
+            last = self._last_recognized.get(track_id)
+            if last is not None and task.seq - last < self.recognition_interval:
+                continue
+            self._last_recognized[track_id] = task.seq
+            task.crops.append(task.frame[y1:y2, x1:x2])
+            task.crop_ids.append(track_id)
+        if len(self._last_recognized) > 4 * len(task.tracks) + 16:
+            live = {t["track_id"] for t in task.tracks}
+            self._last_recognized = {k: v for k, v in self._last_recognized.items() if k in live}
+        return task
+
+    def _recognize(self, task: FrameTask) -> FrameTask:
+        if task.crops:
+            task.emotions = self.recognizer.recognize_batch(task.crops)
+        return task
+
+    def _track(self, task: FrameTask) -> Optional[FrameTask]:
+        if self.mode == "realtime" and task.seq < self._last_track_seq:
+            self.stages[-1].drop(task)
+            return None  # A newer frame already overtook this one
+        self._last_track_seq = task.seq
+        self.face_tracker.update_emotions(dict(zip(task.crop_ids, task.emotions)))
+        return task
+
+    def _emit(self, task: FrameTask):
+        latency = _end_to_end_time.observe_since(task.submitted) - task.submitted
+        faces = []
+        for track in task.tracks:
+            face_track = self.face_tracker.get_track(track["track_id"])
+            x1, y1, x2, y2 = track["box"].astype(np.int32).tolist()
+            faces.append({
+                "track_id": track["track_id"],
+                "box": (x1, y1, x2 - x1, y2 - y1),
+                "confidence": track["confidence"],
+                "emotion": face_track.emotions.get_dominant() if face_track else None,
+                "scores": face_track.emotions.get_scores() if face_track else {},
+            })
+        result = {
+            "seq": task.seq,
+            "faces": faces,
+            "latency": latency,
+            "stage_times": dict(task.stage_times),
+        }
+        if self.quality is not None:
+            self.quality.observe(latency)
+        if self.mode == "debug":
+            logger.debug(f"Frame {task.seq}: {latency * 1000:.1f} ms {result['stage_times']}")
+
+        if self.on_result is not None:
+            self.on_result(result)
+        try:
+            self.results.put_nowait(result)
+        except queue.Full:
+            try:
+                self.results.get_nowait()
+            except queue.Empty:
+                pass
+            self.results.put_nowait(result)
+
+    def warmup_sizes(self) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """Detector input sizes and recognizer batch sizes the pipeline can run with"""
+        levels = self.quality.levels if self.quality is not None else []
+        input_sizes = [self.emotion_config.detector.input_size]
+        input_sizes += [tuple(level["input_size"]) for level in levels if "input_size" in level]
+        max_faces = max([self.emotion_config.detector.max_faces]
+                        + [level["max_faces"] for level in levels if "max_faces" in level])
+        # Tracks coast for up to max_missed detections alongside new ones, so a frame can carry
+        # more faces than a single detection returns
+        max_crops = max_faces * (self.face_tracker.max_missed + 1)
+        return list(dict.fromkeys(input_sizes)), list(range(1, max_crops + 1))
+
+    def warmup(self, runs: Optional[int] = None) -> Dict[str, Dict[Any, float]]:
+        """Run the detector and recognizer on blank inputs at every size from warmup_sizes()"""
+        runs = runs or self.config.warmup.runs
+        input_sizes, batch_sizes = self.warmup_sizes()
+        start = time.perf_counter()
+        self.warmup_timings = {
+            "detector": self.detector.warmup(input_sizes, runs),
+            "recognizer": self.recognizer.warmup(batch_sizes, runs),
+        }
+        logger.info(
+            f"Warmup: {len(input_sizes)} detector sizes, {len(batch_sizes)} batch sizes "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return self.warmup_timings
+
+    def _warmup_and_signal(self):
+        if self.config.warmup.enabled:
+            self.warmup()
+        self.ready.set()
+
+    def _background_warmup(self):
+        try:
+            self._warmup_and_signal()
+        except Exception:
+            # `ready` stays unset: the models could not run
+            logger.exception("Pipeline warmup failed")
+
+    def start(self, wait: bool = True):
+        """Start the stage workers and warm up; with wait=False warmup runs in the background"""
+        self.ready.clear()
+        for stage in self.stages:
+            stage.start()
+        if self.mode != "benchmark":
+            self._synchronizer = Synchronizer(self.effective_fps)
+        if wait:
+            self._warmup_and_signal()
+        else:
+            self._warmup_thread = threading.Thread(
+                target=self._background_warmup, name="pipeline-warmup", daemon=True
+            )
+            self._warmup_thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warmup has finished; False on timeout"""
+        return self.ready.wait(timeout)
+
+    def stop(self):
+        self.ready.clear()
+        for stage in self.stages:
+            stage.stop()
+
+    @property
+    def effective_fps(self) -> float:
+        """Pacing rate of run(): the configured max_fps scaled by the throttle factor"""
+        return self.max_fps * self.fps_factor
+
+    def _update_pacing(self):
+        if self._synchronizer is not None:
+            self._synchronizer.target_interval = 1.0 / self.effective_fps
+
+    def set_max_fps(self, fps: float):
+        """Change the configured frame rate; any throttle factor still applies on top"""
+        self.max_fps = fps
+        self._update_pacing()
+
+    def set_fps_factor(self, factor: float):
+        """Scale the configured frame rate (set by a ResourceGovernor; 1.0 is unthrottled)"""
+        self.fps_factor = factor
+        self._update_pacing()
+
+    def watch_config(self, loader) -> None:
+        """Follow live config changes from a ConfigLoader: frame rate and detection/recognition thresholds.
+
+        Each change is validated by rebuilding the file's snapshot; a file
+        that no longer validates is ignored (and logged) until it is fixed.
+        """
+        self.unwatch_config()
+        setters = {
+            "pipeline.pipeline.max_fps": lambda pipeline: self.set_max_fps(pipeline.max_fps),
+            "emotion.detection.min_confidence":
+                lambda emotion: setattr(self.detector, "min_confidence", emotion.detector.min_confidence),
+            "emotion.detection.max_faces":
+                lambda emotion: setattr(self.detector, "max_faces", emotion.detector.max_faces),
+            "emotion.model.threshold":
+                lambda emotion: setattr(self.recognizer, "threshold", emotion.recognizer.threshold),
+        }
+
+        def handler(setter):
+            def on_change(path, old, new):
+                if new is None:
+                    logger.warning(f"{path} removed from config; keeping {old}")
+                    return
+                try:
+                    snapshot = loader.get_snapshot(path.split(".", 1)[0])
+                except ConfigError as e:
+                    logger.warning(f"Ignoring invalid config change {path}: {old!r} -> {new!r} ({e})")
+                    return
+                logger.info(f"Config {path}: {old} -> {new}")
+                setter(snapshot)
+            return on_change
+
+        self._config_subscriptions = [loader.subscribe(path, handler(setter)) for path, setter in setters.items()]
+
+    def unwatch_config(self) -> None:
+        for unsubscribe in self._config_subscriptions:
+            unsubscribe()
+        self._config_subscriptions = []
+
+    def pause(self):
+        """Stop accepting frames (used to shed this stream under load)"""
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def submit(self, frame: np.ndarray) -> bool:
+        """Feed one frame into the pipeline without pacing"""
+        if self.paused:
+            self.frames_shed += 1
+            return False
+        task = FrameTask(self._seq, prepare_frame(frame, self.resize, self.crop_strategy), time.perf_counter())
+        self._seq += 1
+        self.frames_submitted += 1
+        return self.stages[0].put(task)
+
+    def run(self, source: Iterable[np.ndarray], max_frames: Optional[int] = None) -> int:
+        """Feed frames from source, paced at max_fps unless in benchmark mode; waits for warmup"""
+        if self._warmup_thread is not None:
+            self._warmup_thread.join()
+        if not self.ready.is_set():
+            raise RuntimeError("Pipeline is not ready: start() was not called or warmup failed")
+        count = 0
+        for frame in source:
+            if max_frames is not None and count >= max_frames:
+                break
+            if self._synchronizer is not None:
+                self._synchronizer.wait_next()
+            self.submit(frame)
+            count += 1
+        return count
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued frame has left the pipeline"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if all(s.queue.unfinished_tasks == 0 for s in self.stages):
+                return True
+            time.sleep(0.005)
+        return False
+
+    def get_result(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            s.name: {"processed": s.processed, "dropped": s.dropped, "queued": s.queue.qsize()}
+            for s in self.stages
+        }
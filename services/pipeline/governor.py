@@ -0,0 +1,175 @@
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from utils.config_snapshot import PipelineConfig, ResourceConfig
+
+logger = logging.getLogger(__name__)
+
+# pipeline.yaml resource_management key -> SystemMonitor sample key
+LIMIT_KEYS = {
+    "max_cpu_usage": "cpu",
+    "max_gpu_usage": "gpu",
+    "max_memory_usage": "memory",
+}
+
+
+class ResourceGovernor:
+    """Throttles pipeline engines when SystemMonitor samples exceed resource limits.
+
+    Throttle levels are applied one step at a time:
+        1: frame rate reduced to fps_factors[0] of each engine's configured max_fps
+        2: frame rate reduced to fps_factors[1], non-detect stages cut to one worker
+        3+: shed one stream (the last active engine) per level, keeping the first
+    A level is added after trigger_after consecutive samples over any limit and
+    removed after release_after consecutive samples below every limit minus
+    release_margin percentage points.
+
+    Throttle events and time spent throttled are kept in metrics so load
+    shedding can be told apart from slow models.
+    """
+
+    def __init__(self, engines: List[Any], resource_config: Dict[str, float],
+                 trigger_after: int = 3, release_after: int = 10, release_margin: float = 10.0,
+                 fps_factors=(0.75, 0.5)):
+        self.engines = list(engines)
+        self.limits = {
+            metric: float(resource_config[key])
+            for key, metric in LIMIT_KEYS.items() if key in resource_config
+        }
+        self.trigger_after = trigger_after
+        self.release_after = release_after
+        self.release_margin = release_margin
+        self.fps_factors = fps_factors
+
+        self.level = 0
+        self.max_level = 2 + max(0, len(self.engines) - 1)
+        self._base_workers = [{s.name: s.workers for s in e.stages} for e in self.engines]
+        self._over = 0
+        self._under = 0
+        self._throttled_since: Optional[float] = None
+        self._lock = threading.Lock()
+        self._monitor = None
+
+        self.metrics: Dict[str, Any] = {
+            "throttle_level": 0,
+            "throttle_events": 0,
+            "release_events": 0,
+            "throttled_seconds": 0.0,
+            "limit_breaches": {metric: 0 for metric in self.limits},
+            "shed_streams": 0,
+        }
+        self.events: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_config(cls, engines: List[Any], pipeline_config: Union[PipelineConfig, Dict[str, Any]]) -> "ResourceGovernor":
+        """Build from pipeline.yaml's resource_management section"""
+        if isinstance(pipeline_config, PipelineConfig):
+            resources = pipeline_config.resources
+        else:
+            resources = ResourceConfig.from_dict(pipeline_config["resource_management"])
+        return cls(
+            engines, dict(resources.limits),
+            trigger_after=resources.throttle_after_samples,
+            release_after=resources.release_after_samples,
+            release_margin=resources.release_margin,
+        )
+
+    def attach(self, monitor):
+        """Subscribe to a SystemMonitor's samples"""
+        self._monitor = monitor
+        monitor.subscribe(self.on_sample)
+
+    def detach(self):
+        if self._monitor is not None:
+            self._monitor.unsubscribe(self.on_sample)
+            self._monitor = None
+
+    def on_sample(self, sample: Dict[str, Any]):
+        """Feed one monitor sample through the throttle state machine"""
+        with self._lock:
+            breached = [m for m, limit in self.limits.items() if sample.get(m, 0) > limit]
+            relaxed = all(
+                sample.get(m, 0) < limit - self.release_margin for m, limit in self.limits.items()
+            )
+
+            for metric in breached:
+                self.metrics["limit_breaches"][metric] += 1
+
+            if breached:
+                self._over += 1
+                self._under = 0
+            elif relaxed:
+                self._under += 1
+                self._over = 0
+            else:
+                self._over = self._under = 0
+
+            if self._over >= self.trigger_after and self.level < self.max_level:
+                self._over = 0
+                self._set_level(self.level + 1, breached, sample)
+            elif self._under >= self.release_after and self.level > 0:
+                self._under = 0
+                self._set_level(self.level - 1, [], sample)
+
+    def _set_level(self, level: int, breached: List[str], sample: Dict[str, Any]):
+        now = time.time()
+        if level > self.level:
+            self.metrics["throttle_events"] += 1
+            if self._throttled_since is None:
+                self._throttled_since = now
+        else:
+            self.metrics["release_events"] += 1
+            if level == 0 and self._throttled_since is not None:
+                self.metrics["throttled_seconds"] += now - self._throttled_since
+                self._throttled_since = None
+
+        event = {
+            "timestamp": now,
+            "from_level": self.level,
+            "to_level": level,
+            "breached": list(breached),
+            "sample": {m: sample.get(m) for m in self.limits},
+        }
+        self.events.append(event)
+        logger.warning(f"Resource governor level {self.level} -> {level} (breached: {breached or 'none'})")
+
+        self.level = level
+        self.metrics["throttle_level"] = level
+        self._apply()
+
+    def _apply(self):
+        """Bring every engine in line with the current throttle level"""
+        fps_factor = 1.0
+        if self.level >= 1:
+            fps_factor = self.fps_factors[min(self.level, len(self.fps_factors)) - 1]
+
+        for engine, base_workers in zip(self.engines, self._base_workers):
+            # A factor, not a rate: the configured max_fps stays the engine's (and hot reload's) to set
+            engine.set_fps_factor(fps_factor)
+            for stage in engine.stages:
+                workers = base_workers[stage.name]
+                if self.level >= 2 and stage.name != "detect":
+                    workers = 1
+                if stage.workers != workers:
+                    stage.set_workers(workers)
+
+        shed = max(0, self.level - 2)
+        for i, engine in enumerate(self.engines):
+            should_pause = i >= len(self.engines) - shed
+            if should_pause and not engine.paused:
+                engine.pause()
+            elif not should_pause and engine.paused:
+                engine.resume()
+        self.metrics["shed_streams"] = shed
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Snapshot of throttle metrics, including time throttled so far"""
+        with self._lock:
+            metrics = dict(self.metrics)
+            metrics["limit_breaches"] = dict(self.metrics["limit_breaches"])
+            if self._throttled_since is not None:
+                metrics["throttled_seconds"] += time.time() - self._throttled_since
+            metrics["frames_shed"] = sum(getattr(e, "frames_shed", 0) for e in self.engines)
+            return metrics
@@ -0,0 +1,130 @@
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from utils.time_utils import FPSCounter, Timer
+
+logger = logging.getLogger(__name__)
+
+
+def default_quality_levels(input_size: Union[int, Sequence[int]] = 640, detection_interval: int = 5,
+                           max_faces: int = 5) -> List[Dict[str, Any]]:
+    """Quality ladder from full quality (level 0) down to the cheapest setting.
+
+    Level 0 is input_size ([width, height], or one side of a square) as
+    configured; lower levels step its long side down through 512, 416 and
+    320 and keep its aspect ratio, so no level is larger than level 0.
+    """
+    width, height = (input_size, input_size) if isinstance(input_size, int) else input_size
+    long_side = max(width, height)
+    sizes = [[width, height]]
+    for side in (512, 416, 320):
+        if side < long_side:
+            scale = side / long_side
+            sizes.append([max(1, int(round(width * scale))), max(1, int(round(height * scale)))])
+    levels = []
+    for i, size in enumerate(sizes):
+        levels.append({
+            "input_size": size,
+            "detection_interval": detection_interval + 2 * i,
+            "max_faces": max(1, max_faces - i),
+            "recognition_interval": 1 + i,
+        })
+    return levels
+
+
+class QualityController:
+    """Closed-loop controller holding end-to-end latency at a target.
+
+    Each observed frame latency goes into a sliding window. Once the window
+    is full, its p90 is compared against the target:
+        p90 > target * degrade_ratio for degrade_after frames -> one level down
+        p90 < target * upgrade_ratio for upgrade_after frames -> one level up
+    After every change the window is cleared and the next cooldown frames
+    are ignored so the new setting can take effect. The gap between the two
+    ratios and the longer upgrade delay keep it from oscillating.
+    """
+
+    def __init__(self, target_latency_ms: float, levels: Optional[List[Dict[str, Any]]] = None,
+                 window: int = 30, degrade_ratio: float = 1.1, upgrade_ratio: float = 0.7,
+                 degrade_after: int = 5, upgrade_after: int = 60, cooldown: int = 15,
+                 on_change: Optional[Callable[[int, Dict[str, Any]], None]] = None):
+        self.target = target_latency_ms / 1000.0
+        self.levels = levels or default_quality_levels()
+        self.degrade_ratio = degrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.degrade_after = degrade_after
+        self.upgrade_after = upgrade_after
+        self.cooldown = cooldown
+        self.on_change = on_change
+
+        self.level = 0
+        self.changes = 0
+        self.fps = FPSCounter(window_size=window)
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._over = 0
+        self._under = 0
+        self._cooldown_left = 0
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return self.levels[self.level]
+
+    def observe_timer(self, timer: Timer) -> Optional[Dict[str, Any]]:
+        """Observe a frame timed with a Timer started when the frame arrived"""
+        return self.observe(timer.total())
+
+    def observe(self, latency: float) -> Optional[Dict[str, Any]]:
+        """Record one frame's end-to-end latency in seconds.
+
+        Returns the new settings when the quality level changes, else None.
+        """
+        self.fps.update()
+        if self._cooldown_left > 0:
+            self._cooldown_left -= 1
+            return None
+
+        self._latencies.append(latency)
+        if len(self._latencies) < self._latencies.maxlen:
+            return None
+
+        p90 = float(np.percentile(self._latencies, 90))
+        if p90 > self.target * self.degrade_ratio:
+            self._over += 1
+            self._under = 0
+        elif p90 < self.target * self.upgrade_ratio:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.degrade_after and self.level < len(self.levels) - 1:
+            return self._set_level(self.level + 1, p90)
+        if self._under >= self.upgrade_after and self.level > 0:
+            return self._set_level(self.level - 1, p90)
+        return None
+
+    def _set_level(self, level: int, p90: float) -> Dict[str, Any]:
+        direction = "down" if level > self.level else "up"
+        logger.info(f"Quality {direction} to level {level} (p90 latency {p90 * 1000:.1f} ms, "
+                    f"target {self.target * 1000:.0f} ms)")
+        self.level = level
+        self.changes += 1
+        self._latencies.clear()
+        self._over = self._under = 0
+        self._cooldown_left = self.cooldown
+        if self.on_change is not None:
+            self.on_change(level, self.settings)
+        return self.settings
+
+    def status(self) -> Dict[str, Any]:
+        latencies = list(self._latencies)
+        return {
+            "level": self.level,
+            "settings": dict(self.settings),
+            "p90_latency_ms": float(np.percentile(latencies, 90)) * 1000 if latencies else 0.0,
+            "fps": self.fps.current_fps,
+            "changes": self.changes,
+        }
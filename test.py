@@ -1,14 +1,12 @@
+from dataclasses import replace
 from services.emotion.detection import FaceDetector
+from utils.config_loader import get_config_loader
 import cv2
 
-config = {
-  "model_path": "data/models/buffalo_l/det_10g.onnx",
-  "min_confidence": 0.5,
-  "max_faces": 5,
-  "input_size": [320, 240],
-  "landmark_points": 5
-}
+# Model location (a path or a "store:" reference) comes from configs/emotion.yaml
+config = replace(get_config_loader().get_snapshot("emotion").detector, min_confidence=0.5, input_size=(320, 240))
 detector = FaceDetector(config)
+detector.warmup()
 
 img = cv2.imread("test_face.jpg")
 faces = detector.detect(img)
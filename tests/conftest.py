@@ -8,4 +8,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 def setup_env():
     os.environ["DATA_DIR"] = "/test/data"
     os.environ["MODELS_DIR"] = "/test/models"
-    os.environ["CONFIGS_DIR"] = "/test/configs"
\ No newline at end of file
+    os.environ["CONFIGS_DIR"] = "/test/configs"
+
+@pytest.fixture(autouse=True)
+def clear_session_registry():
+    from utils.session_registry import session_registry
+    session_registry.clear()
+    yield
+    session_registry.clear()
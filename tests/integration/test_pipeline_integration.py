@@ -0,0 +1,31 @@
+import numpy as np
+from unittest.mock import MagicMock
+from services.emotion.detection import Detections
+from services.pipeline.engine import PipelineEngine
+from utils.config_loader import ConfigLoader
+
+def test_pipeline_from_repo_configs():
+    loader = ConfigLoader()
+    pipeline_config = loader.get_config("pipeline")
+    emotion_config = loader.get_config("emotion")
+
+    detector = MagicMock()
+    detector.detect_arrays.return_value = Detections(
+        np.array([[20, 20, 120, 140]], dtype=np.float32),
+        np.array([0.95], dtype=np.float32),
+        np.zeros((1, 5, 2), dtype=np.float32)
+    )
+    recognizer = MagicMock()
+    recognizer.recognize_batch.side_effect = lambda crops: [{"happy": 0.8}] * len(crops)
+
+    engine = PipelineEngine(pipeline_config, emotion_config, detector, recognizer)
+    assert engine.mode == "realtime"
+    assert engine.resize == (640, 480)
+    assert [s.workers for s in engine.stages] == [1, 1, 2, 1]
+
+    engine.start()
+    engine.run([np.zeros((720, 1280, 3), dtype=np.uint8)] * 3)
+    assert engine.drain()
+    engine.stop()
+    result = engine.get_result(timeout=1.0)
+    assert result["faces"][0]["emotion"] == "happy"
@@ -0,0 +1,30 @@
+from benchmarks.bench_import_time import compare, direct_dependencies, parse_importtime, public_modules
+
+REPORT = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   certifi
+import time:       200 |        300 | site
+import time:      1000 |       1000 |     numpy.core
+import time:       500 |       1500 |   numpy
+import time:        50 |         50 |   logging
+import time:       300 |       1850 | utils.metrics
+"""
+
+def test_parse_importtime():
+    entries = parse_importtime(REPORT)
+    assert entries[0] == ("certifi", 100, 100, 1)
+    assert entries[-1] == ("utils.metrics", 300, 1850, 0)
+    # Only lines after the previous top-level import belong to utils.metrics
+    assert direct_dependencies(entries, "utils.metrics") == {"logging": 50, "numpy": 1500}
+
+def test_public_modules_cover_packages():
+    modules = public_modules()
+    assert "utils.config_loader" in modules
+    assert "services.pipeline.engine" in modules
+    assert not any(m.rsplit(".", 1)[-1].startswith("_") for m in modules)
+
+def test_compare_ignores_small_jitter():
+    baseline = {"modules": {"a": {"import_ms": 2.0}, "b": {"import_ms": 40.0}}}
+    current = {"modules": {"a": {"import_ms": 4.0}, "b": {"import_ms": 60.0}}}
+    regressions = compare(current, baseline, tolerance=0.25, min_delta_ms=3.0)
+    assert [r["module"] for r in regressions] == ["b"]
@@ -0,0 +1,57 @@
+import numpy as np
+from benchmarks.run_benchmarks import build_models, compare, run_suite
+from services.emotion.detection import FaceDetector
+from services.emotion.recognition import EmotionRecognizer
+
+CPU = {"providers": ["CPUExecutionProvider"]}
+
+def test_stand_in_models_match_component_signatures(tmp_path):
+    models = build_models(tmp_path)
+
+    detector = FaceDetector({
+        "model_path": models["detector_path"],
+        "min_confidence": 0.7,
+        "max_faces": 5,
+        "input_size": [320, 320],
+        "landmark_points": 5,
+        "runtime": CPU
+    })
+    frame = np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    faces = detector.detect_arrays(frame)
+    assert 0 < len(faces) <= 5
+    assert faces.landmarks.shape == (len(faces), 5, 2)
+    assert np.all(faces.boxes[:, 2:] >= faces.boxes[:, :2])
+    assert list(detector.warmup([[320, 320], [416, 416]])) == [(320, 320), (416, 416)]
+
+    recognizer = EmotionRecognizer({
+        "model_path": models["recognizer_path"],
+        "labels": ["neutral", "happy", "surprise", "sad", "anger", "disgust", "fear", "contempt"],
+        "input_size": [64, 64],
+        "threshold": 0.2,
+        "runtime": CPU
+    })
+    results = recognizer.recognize_batch([frame[:100, :100]] * 3)
+    assert len(results) == 3 and all(results)
+    assert list(recognizer.warmup([1, 5])) == [1, 5]
+
+def test_run_suite_reports_latency_percentiles():
+    report = run_suite(["tracker"], {"iterations": 5, "warmup": 1, "threads": 1, "seed": 0}, isolate=False)
+    result = report["benchmarks"]["tracker"]
+    assert result["iterations"] == 50
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert result["throughput"] > 0 and result["peak_rss_mb"] > 0
+    assert report["meta"]["params"]["seed"] == 0
+
+def test_compare_flags_regressions():
+    baseline = {"benchmarks": {"detector": {
+        "throughput": 100.0, "p50_ms": 10.0, "p95_ms": 12.0, "p99_ms": 15.0, "peak_rss_mb": 100.0
+    }}}
+    current = {"benchmarks": {
+        "detector": {"throughput": 80.0, "p50_ms": 10.5, "p95_ms": 12.0, "p99_ms": 20.0, "peak_rss_mb": 100.0},
+        "tracker": {"throughput": 1.0, "p50_ms": 1.0, "p95_ms": 1.0, "p99_ms": 1.0, "peak_rss_mb": 1.0},
+    }}
+    regressions = compare(current, baseline, tolerance=0.1)
+    assert [(r["benchmark"], r["metric"]) for r in regressions] == [
+        ("detector", "throughput"), ("detector", "p99_ms")
+    ]
+    assert compare(current, baseline, tolerance=0.5) == []
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import json
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from scripts.download_models import DownloadError, Manifest, download_file, main, unzip_file
+from utils.model_store import ModelStore
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+PAYLOAD_SHA = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def make_zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("det_10g.onnx", b"detector")
+        zf.writestr("w600k_r50.onnx", b"unused" * 1000)
+        zf.writestr("../escape.onnx", b"nope")
+    return buffer.getvalue()
+
+
+class StandInServer:
+    """Local http.server with Range support that can cut a response short"""
+
+    def __init__(self):
+        self.files = {"/model.onnx": PAYLOAD, "/pack.zip": make_zip()}
+        self.drop_after = None  # Close the next response after this many bytes
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                data = server.files.get(self.path)
+                server.requests.append((self.path, self.headers.get("Range")))
+                if data is None:
+                    self.send_error(404)
+                    return
+                start = 0
+                if self.headers.get("Range"):
+                    start = int(self.headers["Range"].split("=")[1].split("-")[0])
+                    if start >= len(data):
+                        self.send_response(416)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                else:
+                    self.send_response(200)
+                body = data[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.drop_after is not None:
+                    body, server.drop_after = body[:server.drop_after], None
+                    self.wfile.write(body)
+                    self.wfile.flush()
+                    self.connection.close()
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+def test_download_hashes_while_streaming(server, tmp_path):
+    dest = tmp_path / "model.onnx"
+    assert download_file(f"{server.url}/model.onnx", dest, PAYLOAD_SHA, chunk_size=65536) == PAYLOAD_SHA
+    assert dest.read_bytes() == PAYLOAD
+    assert not (tmp_path / "model.onnx.part").exists()
+
+
+def test_dropped_connection_resumes_with_range(server, tmp_path):
+    server.drop_after = 300_000
+    dest = tmp_path / "model.onnx"
+    assert download_file(f"{server.url}/model.onnx", dest, PAYLOAD_SHA, chunk_size=65536) == PAYLOAD_SHA
+    assert dest.read_bytes() == PAYLOAD
+    # Resumes from the last chunk written before the drop, not from zero
+    resumed_at = int(server.requests[1][1].split("=")[1].rstrip("-"))
+    assert 0 < resumed_at <= 300_000
+
+
+def test_resumes_part_file_from_earlier_run(server, tmp_path):
+    (tmp_path / "model.onnx.part").write_bytes(PAYLOAD[:1000])
+    download_file(f"{server.url}/model.onnx", tmp_path / "model.onnx", PAYLOAD_SHA)
+    assert server.requests == [("/model.onnx", "bytes=1000-")]
+
+    (tmp_path / "again.onnx.part").write_bytes(PAYLOAD)  # Complete .part: server answers 416
+    assert download_file(f"{server.url}/model.onnx", tmp_path / "again.onnx", PAYLOAD_SHA) == PAYLOAD_SHA
+
+
+def test_checksum_mismatch_never_lands(server, tmp_path):
+    dest = tmp_path / "model.onnx"
+    with pytest.raises(DownloadError, match="Checksum mismatch"):
+        download_file(f"{server.url}/model.onnx", dest, "0" * 64)
+    assert not dest.exists() and not (tmp_path / "model.onnx.part").exists()
+
+    with pytest.raises(DownloadError):
+        download_file(f"{server.url}/model.onnx", dest, "0" * 64, keep_invalid=True)
+    assert (tmp_path / "model.onnx.invalid").exists()
+
+
+def test_main_downloads_in_parallel_and_writes_manifest(server, tmp_path, monkeypatch):
+    registry = {
+        "emotion": {"url": f"{server.url}/model.onnx", "sha256": PAYLOAD_SHA},
+        "pack": {"url": f"{server.url}/pack.zip", "files": ["det_10g.onnx"]},
+        "missing": {"url": f"{server.url}/missing.onnx"},
+    }
+    assert main(str(tmp_path), ["emotion", "pack", "missing"], jobs=3, registry=registry) == 1
+
+    assert sorted(p.name for p in (tmp_path / "pack").iterdir()) == ["det_10g.onnx"]
+    assert not (tmp_path / "pack.zip").exists() and not (tmp_path.parent / "escape.onnx").exists()
+    manifest = json.loads((tmp_path / "manifest.json").read_text())["files"]
+    assert manifest["emotion.onnx"]["sha256"] == PAYLOAD_SHA
+    assert manifest["pack/det_10g.onnx"]["sha256"] == hashlib.sha256(b"detector").hexdigest()
+
+    # Second run trusts the manifest instead of re-hashing
+    monkeypatch.setattr("scripts.download_models.file_sha256", lambda path: pytest.fail("re-hashed"))
+    server.requests.clear()
+    assert main(str(tmp_path), ["emotion", "pack"], registry=registry) == 0
+    assert server.requests == []
+
+
+def test_truncated_member_is_extracted_again(server, tmp_path):
+    registry = {"pack": {"url": f"{server.url}/pack.zip", "files": ["det_10g.onnx"]}}
+    (tmp_path / "pack").mkdir()
+    (tmp_path / "pack" / "det_10g.onnx").write_bytes(b"det")  # Left by an interrupted run
+
+    assert main(str(tmp_path), ["pack"], registry=registry) == 0
+    assert (tmp_path / "pack" / "det_10g.onnx").read_bytes() == b"detector"
+
+def test_failed_extraction_leaves_no_member(tmp_path, monkeypatch):
+    zip_path = tmp_path / "pack.zip"
+    zip_path.write_bytes(make_zip())
+    reads = []
+
+    def failing_read(self, n=-1):
+        reads.append(n)
+        if len(reads) > 1:
+            raise OSError("disk full")
+        return b"det"
+    monkeypatch.setattr(zipfile.ZipExtFile, "read", failing_read)
+
+    assert not unzip_file(zip_path, tmp_path, ["det_10g.onnx"])
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["pack.zip"]
+
+def test_manifest_ignores_changed_files(tmp_path):
+    model = tmp_path / "model.onnx"
+    model.write_bytes(b"abc")
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(model, "hash")
+    assert manifest.lookup(model) == "hash"
+    model.write_bytes(b"abcd")
+    assert manifest.lookup(model) is None
+
+
+def test_main_adds_models_to_store(server, tmp_path):
+    from benchmarks.stand_in_models import build_recognizer
+    server.files["/real.onnx"] = build_recognizer(tmp_path / "src" / "real.onnx").read_bytes()
+    registry = {
+        "emotion": {"url": f"{server.url}/real.onnx", "preprocessing": {"mean": 127.5, "std": 127.5}},
+        "pack": {"url": f"{server.url}/pack.zip", "files": ["det_10g.onnx"]},
+    }
+    # The pack's det_10g.onnx is not a real model, so it cannot be stored
+    assert main(str(tmp_path / "models"), ["emotion", "pack"], registry=registry,
+                store_dir=str(tmp_path / "store")) == 1
+
+    store = ModelStore(tmp_path / "store")
+    record = store.record("emotion")
+    assert record.preprocessing["std"] == 127.5 and record.inputs[0].shape[1] == 1
+    assert "pack/det_10g" not in store
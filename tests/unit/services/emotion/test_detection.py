@@ -54,4 +54,125 @@ def test_landmark_extraction(detector_config, mock_session):
         frame = np.zeros((480, 640, 3), dtype=np.uint8)
         faces = detector.detect(frame)
         assert len(faces) > 0
-        assert len(faces[0]['landmarks']) == 5
\ No newline at end of file
+        assert len(faces[0]['landmarks']) == 5
+
+def test_detect_sorted_by_confidence(detector_config, mock_session):
+    mock_session.run.return_value[2] = np.array([[0.75, 0.95, 0.85]])
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector({**detector_config, "nms_threshold": 0.9})
+        faces = detector.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+        assert [f["confidence"] for f in faces] == pytest.approx([0.95, 0.85, 0.75])
+
+def test_detect_max_faces(detector_config, mock_session):
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector({**detector_config, "max_faces": 1})
+        faces = detector.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+        assert len(faces) == 1
+        assert faces[0]["confidence"] == pytest.approx(0.9)
+
+def test_nms_suppresses_overlaps(detector_config, mock_session):
+    mock_session.run.return_value = [
+        np.array([[[0.1, 0.1, 0.5, 0.5], [0.11, 0.11, 0.5, 0.5], [0.6, 0.6, 0.9, 0.9]]]),
+        np.zeros((1, 3, 10)),
+        np.array([[0.8, 0.9, 0.75]])
+    ]
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector(detector_config)
+        detections = detector.detect_arrays(np.zeros((100, 100, 3), dtype=np.uint8))
+        assert len(detections) == 2
+        assert detections.scores.tolist() == pytest.approx([0.9, 0.75])
+        np.testing.assert_allclose(detections.boxes[0], [11, 11, 50, 50], atol=1e-4)
+
+def test_detect_arrays_box_and_landmark_scaling(detector_config, mock_session):
+    mock_session.run.return_value[1] = np.tile(
+        np.array([0.25, 0.5], dtype=np.float32), (1, 3, 5)
+    )
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector(detector_config)
+        detections = detector.detect_arrays(np.zeros((480, 640, 3), dtype=np.uint8))
+        assert detections.boxes.shape == (2, 4)
+        assert detections.landmarks.shape == (2, 5, 2)
+        # 640x480 frame is letterboxed into 640x640 with 80px top/bottom padding
+        np.testing.assert_allclose(detections.landmarks[0, 0], [160, 240])
+
+        faces = detections.to_dicts()
+        assert faces[0]["box"] == (64, 0, 256, 240)
+        assert faces[0]["landmarks"][0] == (160, 240)
+
+def test_letterbox_maps_boxes_to_frame(detector_config, mock_session):
+    mock_session.run.return_value = [
+        np.array([[[0.25, 0.5, 0.75, 0.75]]]),
+        np.tile(np.array([0.5, 0.5], dtype=np.float32), (1, 1, 5)),
+        np.array([[0.9]])
+    ]
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector(detector_config)
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        detections = detector.detect_arrays(frame)
+        # scale 0.5, 140px vertical padding
+        np.testing.assert_allclose(detections.boxes[0], [320, 360, 960, 680])
+        np.testing.assert_allclose(detections.landmarks[0, 0], [640, 360])
+
+def test_preprocess_matches_reference(detector_config):
+    with patch("onnxruntime.InferenceSession"):
+        detector = FaceDetector({**detector_config, "input_size": [320, 320]})
+        frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        input_data, letterbox = detector._preprocess(frame)
+
+        assert input_data.shape == (1, 3, 320, 320)
+        assert letterbox.scale == 0.5
+        assert (letterbox.pad_x, letterbox.pad_y) == (0, 40)
+
+        resized = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (320, 240))
+        expected = ((resized.astype(np.float32) - 127.5) / 128.0).transpose(2, 0, 1)
+        np.testing.assert_allclose(input_data[0, :, 40:280], expected, atol=1e-6)
+        np.testing.assert_allclose(input_data[0, :, :40], -127.5 / 128.0)
+
+def test_preprocess_reuses_buffers(detector_config):
+    import tracemalloc
+    with patch("onnxruntime.InferenceSession"):
+        detector = FaceDetector(detector_config)
+        frame = np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+        first, _ = detector._preprocess(frame)
+
+        tracemalloc.start()
+        second, _ = detector._preprocess(frame)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert second is first
+        assert peak < first.nbytes // 10  # No full-size temporaries
+
+def test_set_input_size(detector_config, mock_session):
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector(detector_config)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        detector.detect_arrays(frame)
+        detector.set_input_size([320, 320])
+        input_data, letterbox = detector._preprocess(frame)
+        assert input_data.shape == (1, 3, 320, 320)
+        assert letterbox.scale == 0.5
+
+def test_detect_records_stage_metrics(detector_config, mock_session):
+    from utils.metrics import metrics
+    before = metrics.snapshot()
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector(detector_config)
+        detector.detect_arrays(np.zeros((480, 640, 3), dtype=np.uint8))
+
+    after = metrics.snapshot()
+    for stage in ("detector.preprocess", "detector.inference", "detector.postprocess"):
+        assert after["stages"][stage]["count"] == before["stages"][stage]["count"] + 1
+    assert after["counters"]["detector.faces"] == before["counters"]["detector.faces"] + 2
+
+def test_warmup_runs_each_input_size_without_metrics(detector_config, mock_session):
+    from utils.metrics import metrics
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        detector = FaceDetector(detector_config)
+        before = metrics.snapshot()
+        timings = detector.warmup([[640, 640], [320, 240], [640, 640]], runs=2)
+
+    assert list(timings) == [(640, 640), (320, 240)]
+    shapes = [call.args[1]["data"].shape for call in mock_session.run.call_args_list]
+    assert shapes == [(1, 3, 640, 640)] * 2 + [(1, 3, 240, 320)] * 2
+    assert metrics.snapshot()["stages"]["detector.inference"]["count"] == before["stages"]["detector.inference"]["count"]
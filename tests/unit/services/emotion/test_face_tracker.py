@@ -0,0 +1,98 @@
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+from services.emotion.detection import Detections
+from services.emotion.face_tracker import FaceTracker, iou_matrix
+
+@pytest.fixture
+def tracker_config():
+    return {
+        "detection_interval": 5,
+        "iou_threshold": 0.3,
+        "max_missed": 1,
+        "confidence_decay": 0.95,
+        "min_track_confidence": 0.5
+    }
+
+@pytest.fixture
+def emotion_config():
+    return {
+        "buffer_size": 5,
+        "decay_rate": 0.95,
+        "transition_threshold": 0.2,
+        "engagement_threshold": 0.4
+    }
+
+def make_detections(boxes, scores):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return Detections(boxes, np.asarray(scores, dtype=np.float32), np.zeros((len(boxes), 5, 2), dtype=np.float32))
+
+@pytest.fixture
+def detector():
+    detector = MagicMock()
+    detector.detect_arrays.return_value = make_detections(
+        [[10, 10, 50, 50], [100, 100, 150, 150]], [0.9, 0.8]
+    )
+    return detector
+
+FRAME = np.zeros((240, 320, 3), dtype=np.uint8)
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]])
+
+def test_detects_every_n_frames(detector, tracker_config, emotion_config):
+    tracker = FaceTracker(detector, tracker_config, emotion_config)
+    for _ in range(20):
+        tracker.update(FRAME)
+    assert tracker.detector_calls == 4
+    assert len(tracker.tracks) == 2
+
+def test_track_ids_are_stable(detector, tracker_config, emotion_config):
+    tracker = FaceTracker(detector, tracker_config, emotion_config)
+    first = {t.track_id for t in tracker.update(FRAME)}
+
+    detector.detect_arrays.return_value = make_detections(
+        [[102, 102, 152, 152], [12, 12, 52, 52]], [0.85, 0.9]
+    )
+    for _ in range(5):
+        tracks = tracker.update(FRAME)
+    assert {t.track_id for t in tracks} == first
+    np.testing.assert_allclose(tracker.get_track(0).box, [12, 12, 52, 52])
+
+def test_motion_prediction_between_detections(detector, tracker_config, emotion_config):
+    tracker = FaceTracker(detector, {**tracker_config, "velocity_smoothing": 1.0}, emotion_config)
+    tracker.update(FRAME)
+    detector.detect_arrays.return_value = make_detections(
+        [[20, 10, 60, 50], [100, 100, 150, 150]], [0.9, 0.8]
+    )
+    for _ in range(5):
+        tracker.update(FRAME)
+    tracker.update(FRAME)
+    # Moved 10px over 5 frames, so it should be carried 2px per frame
+    np.testing.assert_allclose(tracker.get_track(0).box, [22, 10, 62, 50])
+
+def test_low_confidence_triggers_detection(detector, tracker_config, emotion_config):
+    tracker = FaceTracker(detector, {**tracker_config, "min_track_confidence": 0.85}, emotion_config)
+    tracker.update(FRAME)
+    tracker.update(FRAME)
+    # Second track starts at 0.8 < 0.85, so detection runs again immediately
+    assert tracker.detector_calls == 2
+
+def test_lost_tracks_are_removed(detector, tracker_config, emotion_config):
+    tracker = FaceTracker(detector, {**tracker_config, "detection_interval": 1}, emotion_config)
+    tracker.update(FRAME)
+    detector.detect_arrays.return_value = make_detections([[10, 10, 50, 50]], [0.9])
+    tracker.update(FRAME)
+    assert len(tracker.tracks) == 2
+    tracker.update(FRAME)
+    assert list(tracker.tracks) == [0]
+
+def test_per_track_emotions(detector, tracker_config, emotion_config):
+    tracker = FaceTracker(detector, tracker_config, emotion_config)
+    tracker.update(FRAME)
+    tracker.update_emotions({0: {"happy": 0.9}, 1: {"sad": 0.8}, 7: {"anger": 1.0}})
+    assert tracker.get_track(0).emotions.get_dominant() == "happy"
+    assert tracker.get_track(1).emotions.get_dominant() == "sad"
+    assert tracker.get_track(0).to_dict()["box"] == (10, 10, 40, 40)
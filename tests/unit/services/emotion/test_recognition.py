@@ -42,4 +42,102 @@ def test_preprocessing(recognizer_config, mock_session):
     with patch("onnxruntime.InferenceSession", return_value=mock_session):
         recognizer = EmotionRecognizer(recognizer_config)
         face_img = np.ones((100, 100, 3), dtype=np.uint8) * 255
-        recognizer.recognize(face_img)
\ No newline at end of file
+        recognizer.recognize(face_img)
+
+def test_recognize_batch_single_run(recognizer_config, mock_session):
+    mock_session.run.return_value = [np.array([
+        [0.1, 0.6, 0.05, 0.05, 0.1, 0.05, 0.05, 0.0],
+        [3.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    ])]
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        recognizer = EmotionRecognizer(recognizer_config)
+        faces = [np.zeros((100, 100, 3), dtype=np.uint8) for _ in range(3)]
+        results = recognizer.recognize_batch(faces)
+
+        assert mock_session.run.call_count == 1
+        input_data = next(iter(mock_session.run.call_args[0][1].values()))
+        assert input_data.shape == (3, 1, 64, 64)
+
+        assert len(results) == 3
+        assert max(results[0], key=results[0].get) == "happy"
+        assert list(results[1]) == ["neutral"]
+        # Uniform output falls below threshold and keeps only the argmax
+        assert len(results[2]) == 1
+
+
+def per_image_reference(outputs, labels, threshold):
+    # The original single-image recognize(): softmax over every output, then threshold the labels
+    exp = np.exp(outputs - np.max(outputs))
+    probs = exp / exp.sum()
+    results = {label: float(probs[i]) for i, label in enumerate(labels) if probs[i] >= threshold}
+    if not results:
+        i = int(np.argmax(probs[:len(labels)]))
+        results[labels[i]] = float(probs[i])
+    return results
+
+
+def test_recognize_batch_matches_per_image_softmax(recognizer_config, mock_session):
+    # Two more outputs than labels, which the softmax must still normalize over
+    logits = np.random.default_rng(0).normal(0, 2, (4, 10)).astype(np.float32)
+    logits[3, 8:] = 6.0  # Mostly unlabelled mass: falls back to the best label
+    mock_session.run.return_value = [logits]
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        recognizer = EmotionRecognizer(recognizer_config)
+        faces = [np.zeros((80, 60, 3), dtype=np.uint8)] * 4
+        batched = recognizer.recognize_batch(faces)
+
+    for row, result in zip(logits, batched):
+        expected = per_image_reference(row, recognizer_config["labels"], recognizer_config["threshold"])
+        assert result.keys() == expected.keys()
+        for label in expected:
+            assert result[label] == pytest.approx(expected[label])
+
+
+def test_recognize_batch_fixed_batch_model(recognizer_config, mock_session):
+    mock_session.get_inputs.return_value = [MagicMock(shape=[1, 1, 64, 64])]
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        recognizer = EmotionRecognizer(recognizer_config)
+        faces = [np.zeros((100, 100, 3), dtype=np.uint8) for _ in range(2)]
+        results = recognizer.recognize_batch(faces)
+        assert mock_session.run.call_count == 2
+        assert len(results) == 2
+
+
+def test_fixed_batch_model_pads_short_chunks(recognizer_config, tmp_path):
+    from benchmarks.stand_in_models import build_recognizer
+    rng = np.random.default_rng(0)
+    faces = [rng.integers(0, 255, (80, 80, 3), dtype=np.uint8) for _ in range(6)]
+
+    results = {}
+    for batch_size in (None, 4):
+        path = build_recognizer(tmp_path / f"emotion_{batch_size}.onnx", batch_size=batch_size)
+        recognizer = EmotionRecognizer({**recognizer_config, "model_path": str(path), "threshold": 0.0,
+                                        "runtime": {"providers": ["CPUExecutionProvider"]}})
+        assert recognizer.max_batch_size == (batch_size or 0)
+        results[batch_size] = recognizer.recognize_batch(faces) + recognizer.recognize_batch(faces[:1])
+
+    assert len(results[4]) == 7
+    for fixed, dynamic in zip(results[4], results[None]):
+        assert fixed == pytest.approx(dynamic, abs=1e-5)
+
+
+def test_recognize_batch_empty(recognizer_config, mock_session):
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        recognizer = EmotionRecognizer(recognizer_config)
+        assert recognizer.recognize_batch([]) == []
+        mock_session.run.assert_not_called()
+
+
+def test_warmup_runs_each_batch_size(recognizer_config, mock_session):
+    with patch("onnxruntime.InferenceSession", return_value=mock_session):
+        recognizer = EmotionRecognizer(recognizer_config)
+        assert list(recognizer.warmup([1, 2, 3])) == [1, 2, 3]
+        shapes = [call.args[1][recognizer.input_name].shape for call in mock_session.run.call_args_list]
+        assert shapes == [(1, 1, 64, 64), (2, 1, 64, 64), (3, 1, 64, 64)]
+
+        # A fixed-batch model only ever sees its own batch size
+        mock_session.run.reset_mock()
+        recognizer.max_batch_size = 4
+        assert list(recognizer.warmup([1, 2, 3])) == [4]
+        assert mock_session.run.call_count == 1
@@ -1,7 +1,7 @@
 import pytest
 import time
 import numpy as np
-from services.emotion.tracker import EmotionTracker
+from services.emotion.tracker import EmotionTracker, EmotionTrackerBank
 
 @pytest.fixture
 def tracker_config():
@@ -62,4 +62,152 @@ def test_time_based_decay(tracker_config):
 def test_emotional_intensity_without_neutral(tracker_config):
     tracker = EmotionTracker(tracker_config)
     tracker.update({"happy": 0.8, "excited": 0.7})
-    assert tracker.get_emotional_intensity() == 0.8
\ No newline at end of file
+    assert tracker.get_emotional_intensity() == 0.8
+
+class LegacyEmotionTracker:
+    """Deque-based tracker kept as the reference for regression checks"""
+
+    def __init__(self, config):
+        from collections import deque
+        self._deque = deque
+        self.window_size = config['buffer_size']
+        self.decay_rate = config['decay_rate']
+        self.transition_threshold = config['transition_threshold']
+        self.history = {}
+        self.current_emotion = "neutral"
+        self.current_confidence = 0.0
+        self.stable_count = 0
+        self.last_update = time.time()
+
+    def update(self, emotions):
+        current_time = time.time()
+        time_diff = current_time - self.last_update
+        self.last_update = current_time
+        for emotion in self.history:
+            decay_factor = self.decay_rate ** time_diff
+            self.history[emotion] = self._deque(
+                [score * decay_factor for score in self.history[emotion]],
+                maxlen=self.window_size
+            )
+        for emotion, score in emotions.items():
+            if emotion not in self.history:
+                self.history[emotion] = self._deque(maxlen=self.window_size)
+            self.history[emotion].append(score)
+        dominant, confidence = self._get_dominant()
+        if self.current_emotion == dominant:
+            self.stable_count += 1
+        else:
+            self.stable_count = max(0, self.stable_count - 1)
+        if (confidence > self.current_confidence + self.transition_threshold or
+            (dominant != self.current_emotion and self.stable_count >= 3)):
+            self.current_emotion = dominant
+            self.current_confidence = confidence
+            self.stable_count = 0
+
+    def _get_dominant(self):
+        if not self.history:
+            return ("neutral", 0.0)
+        avg_scores = {e: np.mean(list(s)) for e, s in self.history.items() if s}
+        dominant = max(avg_scores, key=avg_scores.get)
+        return (dominant, avg_scores[dominant])
+
+    def get_scores(self):
+        return {e: np.mean(list(s)) if s else 0.0 for e, s in self.history.items()}
+
+
+def test_matches_legacy_tracker(tracker_config, monkeypatch):
+    rng = np.random.default_rng(0)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+
+    labels = ["neutral", "happy", "sad", "anger", "surprise"]
+    legacy = LegacyEmotionTracker(tracker_config)
+    tracker = EmotionTracker(tracker_config)
+
+    for step in range(500):
+        # Mostly frame-rate updates with occasional long gaps to force rebasing
+        clock[0] += rng.exponential(0.05) if step % 50 else 400.0
+        chosen = rng.choice(labels, size=rng.integers(1, len(labels) + 1), replace=False)
+        emotions = {str(label): float(rng.random()) for label in chosen}
+        legacy.update(emotions)
+        tracker.update(emotions)
+
+        expected = legacy.get_scores()
+        actual = tracker.get_scores()
+        assert list(actual) == list(expected)
+        for label in expected:
+            assert actual[label] == pytest.approx(expected[label], rel=1e-9, abs=1e-12)
+        for label, scores in tracker.history.items():
+            assert scores == pytest.approx(list(legacy.history[label]), rel=1e-9, abs=1e-12)
+        assert tracker.get_dominant() == legacy.current_emotion
+        assert tracker.stable_count == legacy.stable_count
+        assert tracker.current_confidence == pytest.approx(legacy.current_confidence, rel=1e-9, abs=1e-12)
+
+def test_getters_before_update(tracker_config):
+    tracker = EmotionTracker(tracker_config)
+    assert tracker.get_scores() == {}
+    assert tracker.get_engagement() == 1.0
+    assert tracker.get_emotional_intensity() == 0.0
+    assert tracker.get_dominant() == "neutral"
+
+@pytest.fixture
+def bank_config(tracker_config):
+    return {**tracker_config, "labels": ["neutral", "happy", "sad", "anger", "surprise"]}
+
+def test_bank_matches_individual_trackers(bank_config, monkeypatch):
+    rng = np.random.default_rng(1)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+
+    labels = bank_config["labels"]
+    sessions = [f"user-{i}" for i in range(20)]
+    trackers = {s: EmotionTracker(bank_config) for s in sessions}
+    bank = EmotionTrackerBank(bank_config, capacity=4)
+    for s in sessions:
+        bank.add_session(s)
+
+    for step in range(200):
+        clock[0] += rng.exponential(0.05) if step % 40 else 400.0
+        active = [s for s in sessions if rng.random() < 0.7]
+        matrix = rng.random((len(active), len(labels)))
+        matrix[rng.random(matrix.shape) < 0.3] = np.nan
+
+        for session, row in zip(active, matrix):
+            trackers[session].update({l: v for l, v in zip(labels, row) if not np.isnan(v)})
+        bank.update_many(active, matrix)
+
+        for session in sessions:
+            tracker = trackers[session]
+            expected = tracker.get_scores()
+            actual = bank.get_scores(session)
+            assert actual.keys() == expected.keys()
+            for label in expected:
+                assert actual[label] == pytest.approx(expected[label], rel=1e-9, abs=1e-12)
+            assert bank.get_dominant(session) == tracker.get_dominant()
+            assert bank.get_engagement(session) == pytest.approx(tracker.get_engagement())
+            assert bank.get_emotional_intensity(session) == pytest.approx(tracker.get_emotional_intensity())
+
+def test_bank_slot_reuse(bank_config):
+    bank = EmotionTrackerBank(bank_config, capacity=2)
+    a = bank.add_session("a")
+    bank.add_session("b")
+    bank.update("a", {"happy": 0.9})
+    assert bank.get_dominant("a") == "happy"
+
+    assert bank.remove_session("a")
+    assert "a" not in bank
+    c = bank.add_session("c")
+    assert c == a
+    assert bank.get_scores("c") == {}
+    assert bank.get_dominant("c") == "neutral"
+
+    bank.add_session("d")
+    assert len(bank) == 3
+    assert not bank.remove_session("missing")
+
+def test_bank_rejects_duplicate_sessions(bank_config):
+    bank = EmotionTrackerBank(bank_config)
+    with pytest.raises(ValueError):
+        bank.update_many(["a", "b", "a"], np.ones((3, 5)))
+    # The rejected call must not leave slots behind for the new ids
+    assert len(bank) == 0 and "b" not in bank
@@ -0,0 +1,283 @@
+import time
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+from services.emotion.detection import Detections
+from services.pipeline.engine import PipelineEngine, prepare_frame
+from utils.config_snapshot import ConfigError, EmotionConfig, PipelineConfig
+
+@pytest.fixture
+def emotion_config():
+    return {
+        "model": {
+            "detection_path": "det.onnx",
+            "recognition_path": "rec.onnx",
+            "input_size": [640, 640],
+            "recog_input_size": [64, 64],
+            "output_classes": ["neutral", "happy"],
+            "threshold": 0.2
+        },
+        "detection": {"min_confidence": 0.7, "max_faces": 5, "landmark_points": 5},
+        "face_tracking": {"detection_interval": 3},
+        "tracking": {
+            "decay_rate": 0.95,
+            "buffer_size": 5,
+            "transition_threshold": 0.2,
+            "engagement_threshold": 0.4
+        }
+    }
+
+def pipeline_config(mode="benchmark", **overrides):
+    return {"pipeline": {
+        "mode": mode,
+        "max_fps": 50,
+        "frame_processing": {"enabled": True, "resize": [320, 240], "crop_strategy": "center"},
+        **overrides
+    }}
+
+@pytest.fixture
+def detector():
+    detector = MagicMock()
+    detector.detect_arrays.return_value = Detections(
+        np.array([[10, 10, 60, 60], [100, 100, 150, 160]], dtype=np.float32),
+        np.array([0.9, 0.8], dtype=np.float32),
+        np.zeros((2, 5, 2), dtype=np.float32)
+    )
+    return detector
+
+@pytest.fixture
+def recognizer():
+    recognizer = MagicMock()
+    recognizer.recognize_batch.side_effect = lambda crops: [{"happy": 0.9}] * len(crops)
+    return recognizer
+
+FRAME = np.zeros((480, 800, 3), dtype=np.uint8)
+
+def test_engine_accepts_snapshots(emotion_config, detector, recognizer):
+    emotion = EmotionConfig.from_dict(emotion_config)
+    assert emotion.detector.model_path.endswith("det.onnx") and emotion.detector.max_faces == 5
+    assert emotion.recognizer.labels == ("neutral", "happy") and emotion.recognizer.input_size == (64, 64)
+
+    engine = PipelineEngine(PipelineConfig.from_dict(pipeline_config()), emotion, detector, recognizer)
+    assert engine.resize == (320, 240)
+    assert engine.face_tracker.emotion_config is emotion.tracking
+
+@pytest.mark.parametrize("stage", ["detect", "crop", "track"])
+def test_stateful_stages_reject_extra_workers(emotion_config, detector, recognizer, stage):
+    config = pipeline_config(stages={stage: {"workers": 2}})
+    with pytest.raises(ConfigError, match=f"stages.{stage}.workers"):
+        PipelineEngine(config, emotion_config, detector, recognizer)
+
+    engine = PipelineEngine(pipeline_config(stages={"recognize": {"workers": 3}}), emotion_config,
+                            detector, recognizer)
+    assert engine.stages[2].workers == 3
+
+def test_prepare_frame_center_crop():
+    frame = np.zeros((480, 800, 3), dtype=np.uint8)
+    frame[:, 400] = 255
+    out = prepare_frame(frame, [320, 240], "center")
+    assert out.shape == (240, 320, 3)
+    assert out[:, 160].mean() > 100  # Centre column stays centred
+    assert prepare_frame(frame, None) is frame
+
+def test_benchmark_mode_processes_every_frame(emotion_config, detector, recognizer):
+    engine = PipelineEngine(pipeline_config("benchmark"), emotion_config, detector, recognizer)
+    engine.start()
+    start = time.perf_counter()
+    assert engine.run([FRAME] * 12) == 12
+    assert engine.drain()
+    engine.stop()
+
+    assert time.perf_counter() - start < 1.0  # Not paced at max_fps
+    results = [engine.get_result(timeout=0.1) for _ in range(12)]
+    assert sorted(r["seq"] for r in results) == list(range(12))
+    assert detector.detect_arrays.call_count == 4  # Detection every 3rd frame
+    assert recognizer.recognize_batch.call_count == 12
+    face = results[-1]["faces"][0]
+    assert face["emotion"] == "happy"
+    assert set(results[-1]["stage_times"]) == {"detect", "crop", "recognize", "track"}
+
+def test_realtime_mode_paces_and_drops(emotion_config, detector, recognizer):
+    def slow_batch(crops):
+        time.sleep(0.05)
+        return [{"happy": 0.9}] * len(crops)
+    recognizer.recognize_batch.side_effect = slow_batch
+
+    config = pipeline_config("realtime", max_fps=100, stages={
+        "recognize": {"workers": 1, "queue_size": 1},
+        "crop": {"workers": 1, "queue_size": 1},
+    })
+    engine = PipelineEngine(config, emotion_config, detector, recognizer)
+    engine.start()
+    start = time.perf_counter()
+    engine.run([FRAME] * 20)
+    elapsed = time.perf_counter() - start
+    engine.drain()
+    engine.stop()
+
+    assert elapsed >= 0.15  # 20 frames at 100 fps
+    stats = engine.stats
+    assert sum(s["dropped"] for s in stats.values()) > 0
+    assert stats["track"]["processed"] < 20
+
+def test_on_result_callback(emotion_config, detector, recognizer):
+    seen = []
+    engine = PipelineEngine(pipeline_config("debug", max_fps=200), emotion_config, detector, recognizer,
+                            on_result=seen.append)
+    engine.start()
+    engine.run([FRAME] * 3)
+    engine.drain()
+    engine.stop()
+    assert sorted(r["seq"] for r in seen) == [0, 1, 2]
+
+def test_track_counts_overtaken_frames_as_drops(emotion_config, detector, recognizer):
+    from services.pipeline.engine import FrameTask
+    engine = PipelineEngine(pipeline_config("realtime"), emotion_config, detector, recognizer)
+    assert engine._track(FrameTask(5, FRAME, 0.0)) is not None
+    assert engine._track(FrameTask(3, FRAME, 0.0)) is None
+    assert engine.stats["track"]["dropped"] == 1
+
+def test_invalid_mode(emotion_config, detector, recognizer):
+    with pytest.raises(ValueError):
+        PipelineEngine(pipeline_config("turbo"), emotion_config, detector, recognizer)
+
+def test_dynamic_quality_applies_settings(emotion_config, detector, recognizer):
+    config = pipeline_config("benchmark", performance={"target_latency_ms": 100, "dynamic_quality": True})
+    engine = PipelineEngine(config, emotion_config, detector, recognizer)
+    assert engine.quality is not None
+
+    engine.quality.on_change(3, {"input_size": [320, 320], "detection_interval": 11,
+                                 "max_faces": 2, "recognition_interval": 3})
+    engine.start()
+    engine.run([FRAME] * 6)
+    engine.drain()
+    engine.stop()
+
+    detector.set_input_size.assert_called_once_with([320, 320])
+    assert detector.max_faces == 2
+    assert engine.face_tracker.detection_interval == 11
+    # Each track is recognized on frames 0 and 3 only
+    assert recognizer.recognize_batch.call_count == 2
+
+def test_engine_throttle_controls(emotion_config, detector, recognizer):
+    engine = PipelineEngine(pipeline_config("realtime"), emotion_config, detector, recognizer)
+    engine.start()
+    engine.set_max_fps(25)
+    assert engine._synchronizer.target_interval == pytest.approx(0.04)
+
+    recognize = engine.stages[2]
+    recognize.set_workers(1)
+    time.sleep(0.3)
+    assert sum(t.is_alive() for t in recognize._threads.values()) == 1
+    recognize.set_workers(3)
+    assert sum(t.is_alive() for t in recognize._threads.values()) == 3
+
+    engine.pause()
+    assert not engine.submit(FRAME)
+    assert engine.frames_shed == 1
+    engine.resume()
+    assert engine.submit(FRAME)
+    engine.drain()
+    engine.stop()
+
+def test_watch_config_retunes_running_engine(emotion_config, detector, recognizer, tmp_path):
+    import yaml
+    from utils.config_loader import ConfigLoader
+    (tmp_path / "pipeline.yaml").write_text(yaml.safe_dump(pipeline_config("realtime")))
+    (tmp_path / "emotion.yaml").write_text(yaml.safe_dump(emotion_config))
+    loader = ConfigLoader(config_dir=str(tmp_path))
+    loader.get_config("pipeline")
+    loader.get_config("emotion")
+
+    engine = PipelineEngine(pipeline_config("realtime"), emotion_config, detector=detector, recognizer=recognizer)
+    engine.start()
+    try:
+        engine.watch_config(loader)
+        emotion_config["detection"]["min_confidence"] = 0.5
+        (tmp_path / "emotion.yaml").write_text(yaml.safe_dump(emotion_config))
+        (tmp_path / "pipeline.yaml").write_text(yaml.safe_dump(pipeline_config("realtime", max_fps=10)))
+        loader.reload_config("emotion")
+        loader.reload_config("pipeline")
+    finally:
+        engine.stop()
+
+    assert detector.min_confidence == 0.5
+    assert engine.max_fps == 10
+    assert engine._synchronizer.target_interval == pytest.approx(0.1)
+
+    engine.unwatch_config()
+    (tmp_path / "pipeline.yaml").write_text(yaml.safe_dump(pipeline_config("realtime", max_fps=20)))
+    loader.reload_config("pipeline")
+    assert engine.max_fps == 10
+
+def test_warmup_covers_quality_ladder_before_ready(emotion_config, detector, recognizer):
+    config = pipeline_config("benchmark", warmup={"runs": 2},
+                             performance={"target_latency_ms": 100, "dynamic_quality": True})
+    engine = PipelineEngine(config, emotion_config, detector, recognizer)
+    detector.warmup.side_effect = lambda sizes, runs: {"ready": engine.ready.is_set()}
+
+    engine.start()
+    engine.stop()
+
+    sizes, runs = detector.warmup.call_args.args
+    assert sizes[0] == (640, 640) and (320, 320) in sizes and len(set(sizes)) == len(sizes)
+    assert runs == 2
+    # max_faces 5 with tracks coasting for max_missed=2 detections
+    recognizer.warmup.assert_called_once_with(list(range(1, 16)), 2)
+    assert engine.warmup_timings["detector"] == {"ready": False}
+
+def test_background_warmup_signals_ready(emotion_config, detector, recognizer):
+    engine = PipelineEngine(pipeline_config("benchmark", warmup={"enabled": True}), emotion_config,
+                            detector, recognizer)
+    detector.warmup.side_effect = lambda sizes, runs: time.sleep(0.2)
+    engine.start(wait=False)
+    assert not engine.ready.is_set()
+    assert engine.wait_ready(timeout=2.0)
+    assert engine.run([FRAME] * 2) == 2
+    engine.drain()
+    engine.stop()
+    assert not engine.ready.is_set()
+
+def test_failed_warmup_never_signals_ready(emotion_config, detector, recognizer):
+    engine = PipelineEngine(pipeline_config("benchmark", warmup={"enabled": True}), emotion_config,
+                            detector, recognizer)
+    with pytest.raises(RuntimeError, match="not ready"):
+        engine.run([FRAME])
+
+    detector.warmup.side_effect = RuntimeError("bad model")
+    engine.start(wait=False)
+    assert not engine.wait_ready(timeout=0.5)
+    with pytest.raises(RuntimeError, match="not ready"):
+        engine.run([FRAME])
+    engine.stop()
+
+def test_watch_config_ignores_invalid_edits_and_keeps_throttle(emotion_config, detector, recognizer, tmp_path):
+    import yaml
+    from utils.config_loader import ConfigLoader
+    (tmp_path / "pipeline.yaml").write_text(yaml.safe_dump(pipeline_config("realtime")))
+    (tmp_path / "emotion.yaml").write_text(yaml.safe_dump(emotion_config))
+    loader = ConfigLoader(config_dir=str(tmp_path))
+    loader.get_config("pipeline")
+    loader.get_config("emotion")
+
+    detector.max_faces = 5
+    engine = PipelineEngine(pipeline_config("realtime"), emotion_config, detector=detector, recognizer=recognizer)
+    engine.start()
+    engine.watch_config(loader)
+    try:
+        for bad in (-1, "many"):
+            emotion_config["detection"]["max_faces"] = bad
+            (tmp_path / "emotion.yaml").write_text(yaml.safe_dump(emotion_config))
+            loader.reload_config("emotion")
+            assert detector.max_faces == 5
+
+        # A governor throttle and a config change both hold: pacing is their product
+        engine.set_fps_factor(0.5)
+        (tmp_path / "pipeline.yaml").write_text(yaml.safe_dump(pipeline_config("realtime", max_fps=40)))
+        loader.reload_config("pipeline")
+    finally:
+        engine.stop()
+        engine.unwatch_config()
+
+    assert engine.max_fps == 40 and engine.fps_factor == 0.5
+    assert engine._synchronizer.target_interval == pytest.approx(1 / 20)
@@ -0,0 +1,98 @@
+import pytest
+from unittest.mock import MagicMock
+from services.pipeline.governor import ResourceGovernor
+
+LIMITS = {"max_cpu_usage": 80, "max_gpu_usage": 70, "max_memory_usage": 75}
+
+def make_engine(fps=30):
+    engine = MagicMock()
+    engine.max_fps = fps
+    engine.paused = False
+    engine.frames_shed = 0
+    stages = []
+    for name, workers in (("detect", 1), ("crop", 1), ("recognize", 2), ("track", 1)):
+        stage = MagicMock()
+        stage.name = name
+        stage.workers = workers
+        stage.set_workers.side_effect = lambda n, s=stage: setattr(s, "workers", n)
+        stages.append(stage)
+    engine.stages = stages
+    engine.pause.side_effect = lambda e=engine: setattr(e, "paused", True)
+    engine.resume.side_effect = lambda e=engine: setattr(e, "paused", False)
+    return engine
+
+def sample(cpu=10, memory=10, gpu=0):
+    return {"cpu": cpu, "memory": memory, "gpu": gpu, "timestamp": 0.0}
+
+@pytest.fixture
+def engines():
+    return [make_engine(), make_engine()]
+
+@pytest.fixture
+def governor(engines):
+    return ResourceGovernor(engines, LIMITS, trigger_after=2, release_after=3)
+
+def test_limits_from_config(governor):
+    assert governor.limits == {"cpu": 80.0, "gpu": 70.0, "memory": 75.0}
+
+def test_throttle_steps(governor, engines):
+    governor.on_sample(sample(cpu=95))
+    assert governor.level == 0
+    governor.on_sample(sample(cpu=95))
+    assert governor.level == 1
+    engines[0].set_fps_factor.assert_called_with(0.75)
+    engines[0].set_max_fps.assert_not_called()
+
+    for _ in range(2):
+        governor.on_sample(sample(memory=90))
+    assert governor.level == 2
+    assert engines[0].stages[2].workers == 1
+    assert engines[0].stages[0].workers == 1
+
+    for _ in range(2):
+        governor.on_sample(sample(gpu=99))
+    assert governor.level == 3
+    assert not engines[0].paused and engines[1].paused
+
+    metrics = governor.get_metrics()
+    assert metrics["throttle_events"] == 3
+    assert metrics["shed_streams"] == 1
+    assert metrics["limit_breaches"] == {"cpu": 2, "gpu": 2, "memory": 2}
+
+def test_release_with_hysteresis(governor, engines):
+    for _ in range(6):
+        governor.on_sample(sample(cpu=95))
+    assert governor.level == 3
+
+    # Below the limit but inside the release margin: hold
+    for _ in range(10):
+        governor.on_sample(sample(cpu=75))
+    assert governor.level == 3
+
+    for _ in range(9):
+        governor.on_sample(sample(cpu=20))
+    assert governor.level == 0
+    assert not engines[1].paused
+    assert engines[0].stages[2].workers == 2
+    engines[0].set_fps_factor.assert_called_with(1.0)
+
+    metrics = governor.get_metrics()
+    assert metrics["release_events"] == 3
+    assert metrics["throttle_level"] == 0
+    assert metrics["throttled_seconds"] >= 0
+    assert len(governor.events) == 6
+
+def test_attach_to_monitor(governor):
+    monitor = MagicMock()
+    governor.attach(monitor)
+    monitor.subscribe.assert_called_once_with(governor.on_sample)
+    governor.detach()
+    monitor.unsubscribe.assert_called_once_with(governor.on_sample)
+
+def test_from_config(engines):
+    config = {"resource_management": dict(LIMITS, throttle_after_samples=1, release_margin=5)}
+    governor = ResourceGovernor.from_config(engines, config)
+    assert governor.trigger_after == 1
+    assert governor.release_margin == 5
+    governor.on_sample(sample(cpu=85))
+    assert governor.level == 1
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import MagicMock
+from services.pipeline.quality import QualityController, default_quality_levels
+from utils.time_utils import Timer
+
+@pytest.fixture
+def controller():
+    return QualityController(
+        target_latency_ms=100, window=5, degrade_after=2, upgrade_after=4, cooldown=3
+    )
+
+def feed(controller, latency, frames):
+    changes = []
+    for _ in range(frames):
+        settings = controller.observe(latency)
+        if settings is not None:
+            changes.append(controller.level)
+    return changes
+
+def test_default_levels():
+    levels = default_quality_levels(640, 5, 5)
+    assert levels[0]["input_size"] == [640, 640]
+    assert levels[-1]["input_size"] == [320, 320]
+    assert [l["detection_interval"] for l in levels] == sorted(l["detection_interval"] for l in levels)
+    assert levels[-1]["recognition_interval"] > 1
+    assert [l["input_size"] for l in default_quality_levels(320)] == [[320, 320]]
+
+def test_default_levels_keep_configured_aspect():
+    sizes = [l["input_size"] for l in default_quality_levels((640, 480))]
+    assert sizes == [[640, 480], [512, 384], [416, 312], [320, 240]]
+    # A size below the ladder is never upscaled
+    assert [l["input_size"] for l in default_quality_levels((256, 192))] == [[256, 192]]
+
+def test_degrades_under_load(controller):
+    assert feed(controller, 0.2, 6) == [1]
+    assert controller.settings["input_size"] == [512, 512]
+
+def test_cooldown_limits_step_rate(controller):
+    # 5 frames fill the window and the 2nd over-target evaluation steps down;
+    # then 3 cooldown frames, a fresh window and 2 more evaluations
+    assert feed(controller, 0.2, 6) == [1]
+    assert feed(controller, 0.2, 8) == []
+    assert feed(controller, 0.2, 1) == [2]
+
+def test_hysteresis_band_holds_level(controller):
+    feed(controller, 0.2, 6)
+    # Between upgrade (70 ms) and degrade (110 ms) thresholds nothing changes
+    assert feed(controller, 0.09, 100) == []
+    assert controller.level == 1
+
+def test_recovers_when_headroom_returns(controller):
+    feed(controller, 0.2, 6)
+    assert feed(controller, 0.03, 12) == [0]
+    assert controller.level == 0
+    assert controller.changes == 2
+
+def test_never_leaves_ladder(controller):
+    feed(controller, 1.0, 500)
+    assert controller.level == len(controller.levels) - 1
+    feed(controller, 0.001, 500)
+    assert controller.level == 0
+
+def test_on_change_callback_and_timer():
+    callback = MagicMock()
+    controller = QualityController(100, window=2, degrade_after=1, on_change=callback)
+    timer = Timer()
+    timer.start_time -= 0.5
+    controller.observe_timer(timer)
+    controller.observe_timer(timer)
+    callback.assert_called_once_with(1, controller.levels[1])
+    assert controller.status()["level"] == 1
@@ -1,7 +1,8 @@
 import time
 import pytest
 import threading
-from utils.async_processor import AsyncProcessor, AsyncBatchProcessor
+import concurrent.futures
+from utils.async_processor import AsyncProcessor, AsyncBatchProcessor, TaskDropped, TaskPriority
 
 def square(x):
     return x * x
@@ -80,4 +81,260 @@ def test_batch_large_queue(controllable_processor):
     
     assert "Batch queue full" in str(exc_info.value)
     
-    controllable_processor.shutdown()   
\ No newline at end of file
+    controllable_processor.shutdown()   
+def test_batch_groups_calls():
+    processor = AsyncBatchProcessor(batch_size=8, max_workers=2, max_batch_latency_ms=50)
+    calls = []
+
+    def record(items):
+        calls.append(len(items))
+        return [item[0] * 2 for item in items]
+
+    futures = processor.submit_batch(record, [[i] for i in range(8)])
+    assert [f.result(timeout=1.0) for f in futures] == [i * 2 for i in range(8)]
+    assert calls == [8]
+    processor.shutdown()
+
+def test_batch_groups_by_function():
+    processor = AsyncBatchProcessor(batch_size=8, max_workers=2, max_batch_latency_ms=50)
+    futures = processor.submit_batch(batch_process, [[1], [2]])
+    futures += processor.submit_batch(lambda items: [-item[0] for item in items], [[3], [4]])
+    assert [f.result(timeout=1.0) for f in futures] == [2, 4, -3, -4]
+    processor.shutdown()
+
+def test_batch_of_bound_method_dispatches_when_full():
+    class Model:
+        def predict(self, items):
+            return [item[0] * 2 for item in items]
+
+    model = Model()
+    processor = AsyncBatchProcessor(batch_size=4, max_workers=1, max_batch_latency_ms=500)
+    start = time.perf_counter()
+    futures = processor.submit_batch(model.predict, [[1], [2]])
+    futures += processor.submit_batch(model.predict, [[3], [4]])
+    assert [f.result(timeout=1.0) for f in futures] == [2, 4, 6, 8]
+    assert time.perf_counter() - start < 0.25  # Full well before the 500 ms deadline
+    processor.shutdown()
+
+def test_batch_latency_deadline():
+    processor = AsyncBatchProcessor(batch_size=64, max_workers=1, max_batch_latency_ms=20)
+    start = time.perf_counter()
+    future = processor.submit_batch(batch_process, [[5]])[0]
+    assert future.result(timeout=1.0) == 10
+    assert time.perf_counter() - start < 0.2
+    processor.shutdown()
+
+def test_batch_result_length_mismatch():
+    processor = AsyncBatchProcessor(batch_size=4, max_batch_latency_ms=20)
+    futures = processor.submit_batch(lambda items: [0], [[1], [2]])
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1.0)
+    processor.shutdown()
+
+def test_batch_size_adapts_to_cost():
+    processor = AsyncBatchProcessor(batch_size=16, max_workers=1, max_batch_latency_ms=20)
+
+    def costly(items):
+        time.sleep(0.01 * len(items))
+        return [item[0] for item in items]
+
+    futures = processor.submit_batch(costly, [[i] for i in range(4)])
+    [f.result(timeout=2.0) for f in futures]
+    assert processor.batch_size_for(costly) <= 2
+
+    # A cheap fn keeps its own, larger batches
+    futures = processor.submit_batch(batch_process, [[i] for i in range(4)])
+    [f.result(timeout=2.0) for f in futures]
+    assert processor.batch_size_for(batch_process) == 16
+    processor.shutdown()
+
+def test_batch_cancelled_future_does_not_strand_others():
+    processor = AsyncBatchProcessor(batch_size=8, max_workers=1, max_batch_latency_ms=50)
+    futures = processor.submit_batch(batch_process, [[i] for i in range(4)])
+    assert futures[0].cancel()
+    assert [f.result(timeout=1.0) for f in futures[1:]] == [2, 4, 6]
+    deadline = time.perf_counter() + 1.0
+    while processor._outstanding and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert processor._outstanding == 0
+    processor.shutdown()
+
+def test_async_concurrent_dispatch():
+    processor = AsyncProcessor(max_workers=4)
+    start = time.perf_counter()
+    futures = [processor.submit(slow_function, i) for i in range(4)]
+    assert [f.result(timeout=1.0) for f in futures] == [0, 2, 4, 6]
+    assert time.perf_counter() - start < 0.3
+    processor.shutdown()
+
+def test_async_reject_policy():
+    gate = threading.Event()
+    processor = AsyncProcessor(max_workers=1, queue_size=1, queue_policy="reject", submit_timeout=0.01)
+    running = processor.submit(gate.wait, 1.0)
+    time.sleep(0.05)
+    queued = processor.submit(square, 2)
+    rejected = processor.submit(square, 3)
+
+    with pytest.raises(RuntimeError, match="Task queue full"):
+        rejected.result(timeout=1.0)
+    gate.set()
+    assert running.result(timeout=1.0)
+    assert queued.result(timeout=1.0) == 4
+    assert processor.rejected == 1
+    processor.shutdown()
+
+def test_async_drop_oldest_policy():
+    gate = threading.Event()
+    processor = AsyncProcessor(max_workers=1, queue_size=2, queue_policy="drop_oldest")
+    processor.submit(gate.wait, 1.0)
+    time.sleep(0.05)
+    futures = [processor.submit(square, i) for i in range(4)]
+    gate.set()
+
+    assert futures[0].cancelled() and futures[1].cancelled()
+    assert [f.result(timeout=1.0) for f in futures[2:]] == [4, 9]
+    assert processor.dropped == 2
+    processor.shutdown()
+
+def test_drop_oldest_never_evicts_higher_priority():
+    gate = threading.Event()
+    processor = AsyncProcessor(max_workers=1, queue_size=2, queue_policy="drop_oldest")
+    processor.submit(gate.wait, 1.0)
+    time.sleep(0.05)
+    high = [processor.submit_with_priority(TaskPriority.HIGH, square, i) for i in range(2)]
+    low = processor.submit_with_priority(TaskPriority.LOW, square, 5)
+    normal = processor.submit(square, 6)
+    gate.set()
+
+    with pytest.raises(RuntimeError, match="Task queue full"):
+        low.result(timeout=1.0)
+    with pytest.raises(RuntimeError, match="Task queue full"):
+        normal.result(timeout=1.0)
+    assert [f.result(timeout=1.0) for f in high] == [0, 1]
+    assert processor.dropped == 0 and processor.rejected == 2
+    processor.shutdown()
+
+@pytest.mark.asyncio
+async def test_submit_async_reports_dropped_task():
+    import asyncio
+    gate = threading.Event()
+    processor = AsyncProcessor(max_workers=1, queue_size=1, queue_policy="drop_oldest")
+    processor.submit(gate.wait, 1.0)
+    time.sleep(0.05)
+
+    dropped = asyncio.ensure_future(processor.submit_async(square, 2))
+    await asyncio.sleep(0.01)
+    kept = asyncio.ensure_future(processor.submit_async(square, 3))  # Evicts the first from the full queue
+    await asyncio.sleep(0.01)
+    gate.set()
+    results = await asyncio.wait_for(asyncio.gather(dropped, kept, return_exceptions=True), 1.0)
+    assert isinstance(results[0], TaskDropped) and results[1] == 9
+
+    # Cancelling the caller is still a cancellation
+    gate.clear()
+    processor.submit(gate.wait, 1.0)
+    while processor.qsize():
+        time.sleep(0.01)
+    waiting = asyncio.ensure_future(processor.submit_async(square, 4))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    gate.set()
+    processor.shutdown()
+
+def test_async_block_policy():
+    processor = AsyncProcessor(max_workers=1, queue_size=1, queue_policy="block")
+    futures = [processor.submit(slow_function, i) for i in range(3)]
+    assert [f.result(timeout=1.0) for f in futures] == [0, 2, 4]
+    processor.shutdown()
+
+def test_async_priority_order():
+    gate = threading.Event()
+    order = []
+    processor = AsyncProcessor(max_workers=1)
+    processor.submit(gate.wait, 1.0)
+    time.sleep(0.05)
+
+    futures = [
+        processor.submit_with_priority(TaskPriority.LOW, order.append, "low"),
+        processor.submit(order.append, "normal"),
+        processor.submit_with_priority(TaskPriority.HIGH, order.append, "high"),
+    ]
+    gate.set()
+    concurrent.futures.wait(futures, timeout=1.0)
+    assert order == ["high", "normal", "low"]
+    processor.shutdown()
+
+def test_async_shutdown_cancels_queued():
+    gate = threading.Event()
+    processor = AsyncProcessor(max_workers=1)
+    processor.submit(gate.wait, 0.2)
+    time.sleep(0.05)
+    pending = processor.submit(square, 2)
+    processor.shutdown(wait=False)
+    assert pending.cancelled()
+    gate.set()
+
+@pytest.mark.asyncio
+async def test_submit_async_uses_no_extra_threads(processor):
+    import asyncio
+    before = threading.active_count()
+    results = await asyncio.gather(*[processor.submit_async(square, i) for i in range(100)])
+    assert results == [i * i for i in range(100)]
+    assert threading.active_count() <= before + 2
+
+@pytest.mark.asyncio
+async def test_map_async_completion_order():
+    processor = AsyncProcessor(max_workers=3)
+
+    def delayed(x):
+        time.sleep(x)
+        return x
+
+    results = [r async for r in processor.map_async(delayed, [0.2, 0.0, 0.1])]
+    assert results == [0.0, 0.1, 0.2]
+    processor.shutdown()
+
+@pytest.mark.asyncio
+async def test_iter_completed_exceptions(processor):
+    def fail(x):
+        raise ValueError(x)
+
+    futures = [processor.submit(square, 3), processor.submit(fail, "bad")]
+    results = [r async for r in processor.iter_completed(futures, return_exceptions=True)]
+    assert 9 in results
+    assert any(isinstance(r, ValueError) for r in results)
+
+    with pytest.raises(ValueError):
+        async for _ in processor.iter_completed([processor.submit(fail, "bad")]):
+            pass
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["block", "reject"])
+async def test_full_queue_does_not_block_event_loop(policy):
+    import asyncio
+    gate = threading.Event()
+    processor = AsyncProcessor(max_workers=1, queue_size=1, queue_policy=policy, submit_timeout=0.3)
+    processor.submit(gate.wait, 1.0)
+    time.sleep(0.05)
+    processor.submit(square, 1)  # Fills the queue
+    threading.Timer(0.2, gate.set).start()
+
+    ticks = []
+
+    async def ticker():
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.3:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    assert await processor.submit_async(square, 3) == 9
+    await ticking
+    # The loop kept running while submit_async waited ~0.2 s for room
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+    assert [r async for r in processor.map_async(square, [1, 2])] in ([1, 4], [4, 1])
+    processor.shutdown()
@@ -55,4 +55,77 @@ def test_complex_env_resolution(config_loader, tmp_path):
     assert config["path2"] == "/default/subdir"
     
     if data_dir_backup:
-        os.environ["DATA_DIR"] = data_dir_backup
\ No newline at end of file
+        os.environ["DATA_DIR"] = data_dir_backup
+
+def _rewrite(path, text):
+    # Bump the mtime explicitly so the change is seen even on coarse-mtime filesystems
+    st = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+def test_diff_configs():
+    from utils.config_loader import diff_configs
+    old = {"a": {"b": 1, "c": [1, 2]}, "d": 1}
+    new = {"a": {"b": 2, "c": [1, 2]}, "e": 3}
+    assert diff_configs(old, new, "cfg") == {
+        "cfg.a.b": (1, 2), "cfg.d": (1, None), "cfg.e": (None, 3)
+    }
+
+def test_get_key_path(config_loader):
+    assert config_loader.get("test_config.nested.num") == 42
+    assert config_loader.get("test_config.nested.missing", "dflt") == "dflt"
+
+def test_check_for_changes_notifies_subscribers(config_loader, tmp_path):
+    config_loader.get_config("test_config")
+    calls = []
+    config_loader.subscribe("test_config.nested.num", lambda *args: calls.append(args))
+    config_loader.subscribe("test_config.key", lambda *args: calls.append(args))
+
+    assert config_loader.check_for_changes() == {}
+    _rewrite(tmp_path / "test_config.yaml", """
+    key: "value"
+    nested:
+        num: 43
+        env: "${TEST_ENV_VAR}"
+    """)
+
+    changes = config_loader.check_for_changes()
+    assert changes == {"test_config.nested.num": (42, 43)}
+    assert calls == [("test_config.nested.num", 42, 43)]
+    assert config_loader.get("test_config.nested.num") == 43
+    assert config_loader.check_for_changes() == {}
+
+def test_subtree_subscription_and_unsubscribe(config_loader, tmp_path):
+    config_loader.get_config("test_config")
+    calls = []
+    unsubscribe = config_loader.subscribe("test_config.nested", lambda *args: calls.append(args))
+
+    _rewrite(tmp_path / "test_config.yaml", 'key: "value"\nnested: {num: 1, env: x}\n')
+    config_loader.check_for_changes()
+    assert calls[0][1]["num"] == 42 and calls[0][2] == {"num": 1, "env": "x"}
+
+    unsubscribe()
+    _rewrite(tmp_path / "test_config.yaml", 'key: "value"\nnested: {num: 2, env: x}\n')
+    config_loader.check_for_changes()
+    assert len(calls) == 1
+
+def test_broken_file_keeps_last_good_config(config_loader, tmp_path):
+    config_loader.get_config("test_config")
+    _rewrite(tmp_path / "test_config.yaml", "key: [unterminated\n")
+    assert config_loader.check_for_changes() == {}
+    assert config_loader.get("test_config.nested.num") == 42
+
+def test_watcher_reloads_in_background(config_loader, tmp_path):
+    import time
+    config_loader.get_config("test_config")
+    seen = []
+    config_loader.subscribe("test_config.key", lambda path, old, new: seen.append(new))
+    config_loader.start_watching(interval=0.02)
+    try:
+        _rewrite(tmp_path / "test_config.yaml", 'key: "hot"\n')
+        deadline = time.monotonic() + 2.0
+        while not seen and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        config_loader.stop_watching()
+    assert seen == ["hot"]
@@ -0,0 +1,97 @@
+import dataclasses
+import math
+import pytest
+import numpy as np
+from utils.config_loader import ConfigLoader
+from utils.config_snapshot import (ConfigError, DetectorConfig, EmotionConfig, PipelineConfig, TrackingConfig,
+                                   WarmupConfig)
+
+@pytest.fixture
+def loader():
+    return ConfigLoader()
+
+def test_repo_configs_build_snapshots(loader):
+    emotion = loader.get_snapshot("emotion")
+    assert emotion.detector.model_path == "/test/models/buffalo_l/det_10g.onnx"
+    assert emotion.detector.input_size == (640, 640)
+    assert emotion.recognizer.label_index["happy"] == 1
+    assert emotion.tracking.labels == emotion.labels
+    assert emotion.tracking.log_decay == pytest.approx(math.log(0.95))
+    assert emotion.detector.runtime["cache_dir"] == "/test/models/.ort_cache"
+
+    pipeline = loader.get_snapshot("pipeline")
+    assert pipeline.frame_interval == pytest.approx(1 / 30)
+    assert pipeline.stages["recognize"].workers == 2
+    assert pipeline.fusion.modalities == ("emotion", "speech")
+    np.testing.assert_allclose(pipeline.fusion.weights, [0.7, 0.3])
+    assert pipeline.resources.limits["max_cpu_usage"] == 80.0
+    assert pipeline.warmup == WarmupConfig(enabled=True, runs=2)
+
+def test_snapshots_are_immutable(loader):
+    emotion = loader.get_snapshot("emotion")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        emotion.detector.min_confidence = 0.1
+    with pytest.raises(TypeError):
+        emotion.detector.runtime["intra_op_threads"] = 8
+    with pytest.raises(TypeError):
+        loader.get_snapshot("pipeline").fusion.weights[0] = 1.0
+    assert PipelineConfig().fusion.weights == ()
+    assert not hasattr(emotion.detector, "__dict__")
+
+def test_snapshot_cached_until_reload(tmp_path):
+    (tmp_path / "pipeline.yaml").write_text("pipeline: {max_fps: 10}\n")
+    loader = ConfigLoader(config_dir=str(tmp_path))
+    first = loader.get_snapshot("pipeline")
+    assert loader.get_snapshot("pipeline") is first
+
+    (tmp_path / "pipeline.yaml").write_text("pipeline: {max_fps: 20}\n")
+    loader.reload_config("pipeline")
+    assert loader.get_snapshot("pipeline").max_fps == 20
+    with pytest.raises(KeyError):
+        loader.get_snapshot("missing_type")
+
+@pytest.mark.parametrize("change, message", [
+    ({"min_confidence": 1.5}, "detector.min_confidence must be in"),
+    ({"max_faces": "five"}, "detector.max_faces must be an integer"),
+    ({"input_size": [640]}, "detector.input_size must be [width, height]"),
+    ({"model_path": "${NOT_SET_ANYWHERE}/det.onnx"}, "unset environment variable"),
+])
+def test_detector_validation(change, message):
+    raw = {"model_path": "det.onnx", "min_confidence": 0.5, "max_faces": 5,
+           "input_size": [640, 640], "landmark_points": 5}
+    with pytest.raises(ConfigError, match=message.replace("[", r"\[")):
+        DetectorConfig.from_dict({**raw, **change})
+
+def test_missing_keys_name_the_path(loader):
+    raw = dict(loader.get_config("emotion"))
+    raw["tracking"] = {k: v for k, v in raw["tracking"].items() if k != "buffer_size"}
+    with pytest.raises(ConfigError, match="emotion.tracking.buffer_size is required"):
+        EmotionConfig.from_dict(raw)
+    with pytest.raises(ConfigError, match="pipeline.pipeline.mode must be one of"):
+        PipelineConfig.from_dict({"pipeline": {"mode": "turbo"}})
+
+def test_tracking_labels_from_flat_dict():
+    config = TrackingConfig.from_dict({"decay_rate": 0.9, "buffer_size": 4, "transition_threshold": 0.2,
+                                       "engagement_threshold": 0.4, "labels": ["neutral", "sad"]})
+    assert config.label_index == {"neutral": 0, "sad": 1}
+    with pytest.raises(ConfigError, match="duplicate"):
+        TrackingConfig.from_dict({"decay_rate": 0.9, "buffer_size": 4, "transition_threshold": 0.2,
+                                  "engagement_threshold": 0.4, "labels": ["sad", "sad"]})
+
+def test_store_references_and_warmup():
+    raw = {"model_path": "store:buffalo_l/det_10g", "min_confidence": 0.5, "max_faces": 5,
+           "input_size": [640, 640], "landmark_points": 5}
+    assert DetectorConfig.from_dict(raw).model_path == "store:buffalo_l/det_10g"
+
+    assert PipelineConfig.from_dict({"pipeline": {}}).warmup == WarmupConfig(enabled=False)
+    warmup = PipelineConfig.from_dict({"pipeline": {"warmup": {"runs": 3}}}).warmup
+    assert warmup.enabled and warmup.runs == 3
+    with pytest.raises(ConfigError, match="pipeline.pipeline.warmup.runs"):
+        PipelineConfig.from_dict({"pipeline": {"warmup": {"runs": 0}}})
+
+@pytest.mark.parametrize("section, key", [("warmup", "enabled"), ("performance", "dynamic_quality"),
+                                          ("frame_processing", "enabled")])
+def test_flags_must_be_booleans(section, key):
+    PipelineConfig.from_dict({"pipeline": {section: {key: False}}})  # A real boolean is accepted
+    with pytest.raises(ConfigError, match=f"pipeline.pipeline.{section}.{key} must be true or false"):
+        PipelineConfig.from_dict({"pipeline": {section: {key: "false"}}})
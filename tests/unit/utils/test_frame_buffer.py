@@ -0,0 +1,101 @@
+import multiprocessing
+import numpy as np
+import pytest
+from utils.frame_buffer import SharedFrameRing
+
+SHAPE = (48, 64, 3)
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing.create(num_slots=4, frame_shape=SHAPE)
+    yield ring
+    ring.close()
+
+def frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+def test_write_and_read_zero_copy(ring):
+    seq = ring.write(frame(7), timestamp=12.5)
+    assert seq == 0
+
+    with ring.read_latest() as ref:
+        assert ref.seq == 0
+        assert ref.timestamp == 12.5
+        assert ref.array.shape == SHAPE
+        assert np.shares_memory(ref.array, ring._frames)
+        assert (ref.array == 7).all()
+        assert ring.held_slots() == 1
+    assert ring.held_slots() == 0
+
+def test_read_next_in_order(ring):
+    for i in range(3):
+        ring.write(frame(i))
+
+    seen = []
+    last = -1
+    while (ref := ring.read_next(last)) is not None:
+        seen.append(int(ref.array[0, 0, 0]))
+        last = ref.seq
+        ref.release()
+    assert seen == [0, 1, 2]
+
+def test_overwrite_oldest_when_consumer_falls_behind(ring):
+    for i in range(6):
+        ring.write(frame(i))
+
+    with ring.read_next(-1) as ref:
+        # Frames 0 and 1 were overwritten; the oldest surviving frame is 2
+        assert ref.seq == 2
+        assert ref.array[0, 0, 0] == 2
+
+    with ring.read_latest() as ref:
+        assert ref.seq == 5 == ring.last_seq
+
+def test_held_slots_are_not_overwritten(ring):
+    ring.write(frame(1))
+    held = ring.read_latest()
+    for i in range(10):
+        ring.write(frame(100 + i))
+    assert held.seq == 0
+    assert (held.array == 1).all()
+    held.release()
+
+def test_all_slots_held_drops_frame(ring):
+    refs = []
+    for i in range(4):
+        ring.write(frame(i))
+        refs.append(ring.read_latest())
+    assert ring.write(frame(9)) == -1
+    for ref in refs:
+        ref.release()
+    assert ring.write(frame(9)) == 4
+
+def test_shape_mismatch(ring):
+    with pytest.raises(ValueError):
+        ring.write(np.zeros((10, 10, 3), dtype=np.uint8))
+
+def test_read_timeout(ring):
+    assert ring.read_latest(timeout=0.05) is None
+
+def _consume(ring, count, results):
+    last = -1
+    for _ in range(count):
+        ref = ring.read_next(last, timeout=10)
+        results.put((ref.seq, int(ref.array.sum())))
+        last = ref.seq
+        ref.release()
+    ring.close()
+
+def test_cross_process_consumer():
+    ring = SharedFrameRing.create(num_slots=8, frame_shape=SHAPE)
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    consumer = ctx.Process(target=_consume, args=(ring, 3, results))
+    consumer.start()
+    for i in range(3):
+        ring.write(frame(i + 1))
+
+    received = [results.get(timeout=20) for _ in range(3)]
+    consumer.join(timeout=20)
+    assert received == [(i, (i + 1) * int(np.prod(SHAPE))) for i in range(3)]
+    ring.close()
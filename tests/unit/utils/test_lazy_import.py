@@ -0,0 +1,57 @@
+import subprocess
+import sys
+import pytest
+from utils.lazy_import import lazy_import
+
+ROOT = __file__.rsplit("/tests/", 1)[0]
+
+def test_lazy_import_defers_until_first_attribute():
+    sys.modules.pop("colorsys", None)
+    module = lazy_import("colorsys")
+    assert "colorsys" not in sys.modules
+
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+
+def test_lazy_import_sees_later_changes_to_the_module():
+    from unittest.mock import patch
+    sys.modules.pop("colorsys", None)
+    module = lazy_import("colorsys")
+    module.rgb_to_hsv  # Trigger the import
+    with patch("colorsys.rgb_to_hsv", return_value="patched"):
+        assert module.rgb_to_hsv(1.0, 0.0, 0.0) == "patched"
+
+def test_lazy_import_returns_loaded_module():
+    assert lazy_import("json") is sys.modules["json"]
+
+def test_missing_attribute_still_raises():
+    with pytest.raises(AttributeError):
+        lazy_import("colorsys").no_such_function
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    code = (
+        "import sys\n"
+        "import utils.config_loader, utils.system_monitor, services.pipeline.engine\n"
+        "heavy = ['cv2', 'onnxruntime', 'GPUtil', 'psutil', 'yaml', 'dotenv', 'asyncio']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == ""
+
+def test_singletons_are_created_on_first_access():
+    import utils.config_loader as config_module
+    import utils.system_monitor as monitor_module
+    assert config_module.config_loader is config_module.get_config_loader()
+    assert monitor_module.system_monitor is monitor_module.get_system_monitor()
+    with pytest.raises(AttributeError):
+        config_module.no_such_singleton
+
+def test_gpu_collector_imports_gputil_before_the_monitor_thread():
+    code = (
+        "import sys\n"
+        "from utils.collectors import GpuCollector\n"
+        "GpuCollector(1.0)\n"
+        "print('GPUtil' in sys.modules)\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == "True"
@@ -0,0 +1,91 @@
+import threading
+import numpy as np
+import pytest
+from utils.metric_history import MetricHistory, RingBuffer, RollingWindow
+
+def test_ring_buffer_latest_is_contiguous_view():
+    ring = RingBuffer(capacity=4, width=1)
+    for i in range(10):
+        ring.append([i])
+
+    latest = ring.latest()
+    assert latest[:, 0].tolist() == [6, 7, 8, 9]
+    assert ring.latest(2)[:, 0].tolist() == [8, 9]
+    assert np.shares_memory(latest, ring._rows)
+    assert not latest.flags.writeable
+    assert len(ring) == 4
+
+def test_ring_buffer_view_survives_next_write():
+    ring = RingBuffer(capacity=3, width=1)
+    for i in range(3):
+        ring.append([i])
+    view = ring.latest()
+    ring.append([99])
+    assert view[:, 0].tolist() == [0, 1, 2]
+
+def test_rolling_window_matches_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.random(500) * 100
+    window = RollingWindow(60)
+    for v in values:
+        window.push(v)
+
+    tail = values[-60:]
+    stats = window.stats()
+    assert stats["count"] == 60
+    assert stats["mean"] == pytest.approx(tail.mean())
+    assert stats["max"] == tail.max()
+    assert stats["p95"] == np.sort(tail)[57]
+
+def test_metric_history_windows_and_tiers():
+    history = MetricHistory("cpu", interval=1.0, windows=(10.0, 60.0), tiers=((10.0, 100.0), (60.0, 600.0)))
+    for t in range(120):
+        history.add(float(t), [float(t)])
+
+    assert len(history) == 60
+    assert history.stats(10.0)["value"]["mean"] == pytest.approx(114.5)
+    assert history.stats(60.0)["value"]["max"] == 119.0
+
+    times, values = history.recent(5)
+    assert times.tolist() == [115.0, 116.0, 117.0, 118.0, 119.0]
+    assert history.current()[0] == 119.0
+
+    times, means, maxes = history.history(10.0)
+    assert len(times) == 10
+    assert means[0, 0] == pytest.approx(24.5) and maxes[0, 0] == 29.0  # Oldest two rows aged out
+
+    times, means, maxes = history.history(60.0)
+    assert means[:, 0].tolist() == pytest.approx([29.5, 89.5])
+    assert maxes[:, 0].tolist() == [59.0, 119.0]
+
+    with pytest.raises(ValueError):
+        history.stats(5.0)
+
+def test_metric_history_multiple_fields():
+    history = MetricHistory("process", interval=1.0, fields=("cpu", "memory"), windows=(10.0,))
+    history.add(0.0, [10.0, 200.0])
+    history.add(1.0, [30.0, 100.0])
+    stats = history.stats(10.0)
+    assert stats["cpu"]["mean"] == 20.0
+    assert stats["memory"]["max"] == 200.0
+    assert history.current().tolist() == [30.0, 100.0]
+
+def test_concurrent_reads_see_consistent_rows():
+    history = MetricHistory("cpu", interval=0.001, fields=("a", "b"), windows=(0.05,))
+    stop = threading.Event()
+
+    def writer():
+        t = 0
+        while not stop.is_set():
+            t += 1
+            history.add(float(t), [t, -t])
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            _, values = history.recent(0.02)
+            assert np.all(values[:, 0] == -values[:, 1])
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+import pytest
+from utils.metrics import Histogram, MetricsRegistry, log_buckets
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry(namespace="test")
+
+def test_log_buckets_are_log_spaced():
+    bounds = log_buckets(1e-3, 1.0, per_decade=2)
+    assert bounds[0] == 1e-3 and bounds[-1] == pytest.approx(1.0)
+    assert len(bounds) == 7
+
+def test_histogram_percentiles():
+    histogram = Histogram("stage")
+    for _ in range(90):
+        histogram.observe(0.001)
+    for _ in range(10):
+        histogram.observe(0.1)
+
+    stats = histogram.snapshot()
+    assert stats["count"] == 100
+    assert stats["sum"] == pytest.approx(1.09)
+    assert 0.0006 <= stats["p50"] <= 0.0011
+    assert 0.06 <= stats["p99"] <= 0.11
+
+def test_histogram_overflow_bucket():
+    histogram = Histogram("stage", bounds=[0.001, 0.01])
+    histogram.observe(5.0)
+    stats = histogram.snapshot()
+    assert stats["buckets"] == [0, 0, 1]
+    assert stats["p99"] == 0.01
+
+def test_histogram_window_uses_checkpoints():
+    histogram = Histogram("stage", window=1.0, checkpoint_interval=0.05)
+    now = time.perf_counter()
+    histogram.observe(0.5, now)
+    time.sleep(0.2)
+    histogram.observe(0.001, time.perf_counter())
+
+    assert histogram.snapshot()["count"] == 2
+    assert histogram.snapshot(window=0.1)["count"] == 1
+
+def test_histogram_threads_do_not_lose_counts():
+    histogram = Histogram("stage")
+
+    def worker():
+        for _ in range(10000):
+            histogram.observe(0.001)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert histogram.snapshot()["count"] == 40000
+
+def test_stage_timers(registry):
+    with registry.time("detect"):
+        time.sleep(0.01)
+
+    @registry.timed("recognize")
+    def recognize(x):
+        return x * 2
+
+    assert recognize(2) == 4
+    recognize(3)
+    registry.counter("faces").inc(3)
+
+    snapshot = registry.snapshot()
+    assert snapshot["stages"]["detect"]["count"] == 1
+    assert snapshot["stages"]["detect"]["mean"] >= 0.009
+    assert snapshot["stages"]["recognize"]["count"] == 2
+    assert snapshot["counters"]["faces"] == 3
+
+def test_snapshot_reset(registry):
+    registry.observe("detect", 0.002)
+    registry.counter("faces").inc()
+    assert registry.snapshot(reset=True)["stages"]["detect"]["count"] == 1
+
+    snapshot = registry.snapshot()
+    assert snapshot["stages"]["detect"]["count"] == 0
+    assert snapshot["counters"]["faces"] == 0
+    registry.observe("detect", 0.002)
+    assert registry.snapshot()["stages"]["detect"]["count"] == 1
+
+def test_prometheus_export(registry):
+    registry.observe("detect", 0.002)
+    registry.observe("detect", 20.0)
+    registry.counter("detector.faces").inc(2)
+
+    text = registry.to_prometheus()
+    assert "# TYPE test_stage_latency_seconds histogram" in text
+    assert 'test_stage_latency_seconds_bucket{stage="detect",le="+Inf"} 2' in text
+    assert 'test_stage_latency_seconds_bucket{stage="detect",le="10.0"} 1' in text
+    assert 'test_stage_latency_seconds_count{stage="detect"} 2' in text
+    assert "test_detector_faces_total 2" in text
+
+def test_json_export(registry):
+    registry.observe("detect", 0.002)
+    data = json.loads(registry.to_json())
+    assert data["stages"]["detect"]["count"] == 1
+    assert len(data["bounds"]) + 1 == len(data["stages"]["detect"]["buckets"])
+
+def test_observe_overhead():
+    histogram = Histogram("stage")
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        histogram.observe_since(start)
+    per_call = (time.perf_counter() - start) / n
+    assert per_call < 5e-6  # Generous bound for slow CI machines
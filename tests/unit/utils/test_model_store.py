@@ -0,0 +1,73 @@
+import json
+import pytest
+from benchmarks.stand_in_models import build_recognizer
+from utils.model_store import ModelStore, ModelStoreError, get_model_store, resolve_model_path
+from utils.session_registry import SessionRegistry
+
+PREPROCESSING = {"color": "gray", "layout": "nchw", "mean": 127.5, "std": 127.5}
+
+@pytest.fixture
+def model_path(tmp_path):
+    return build_recognizer(tmp_path / "src" / "emotion.onnx", input_size=(48, 48), num_classes=8)
+
+def test_add_records_hash_inputs_and_preprocessing(tmp_path, model_path):
+    store = ModelStore(tmp_path / "store")
+    record = store.add(model_path, "emotion", PREPROCESSING)
+
+    assert record.size == model_path.stat().st_size
+    assert record.inputs[0].shape[1:] == (1, 48, 48)
+    assert record.inputs[0].dtype == "tensor(float)"
+    path = store.resolve("emotion")
+    assert path.endswith(f"{record.sha256}.onnx")
+    assert store.resolve(f"sha256:{record.sha256}") == store.resolve(record.sha256) == path
+
+    # A fresh store reads everything back from the manifest
+    reopened = ModelStore(tmp_path / "store")
+    assert reopened.record("emotion") == record
+    assert reopened.record("emotion").preprocessing["std"] == 127.5
+    assert json.loads((tmp_path / "store" / "store.json").read_text())["models"]["emotion"]["sha256"] == record.sha256
+
+def test_identical_content_is_stored_once(tmp_path, model_path):
+    store = ModelStore(tmp_path / "store")
+    first = store.add(model_path, "emotion")
+    second = store.add(model_path, "emotion_v2")
+    assert first.sha256 == second.sha256
+    assert len(list((tmp_path / "store" / "objects").rglob("*.onnx"))) == 1
+    assert len(store) == 2 and "emotion_v2" in store and "unknown" not in store
+
+def test_invalid_model_is_not_stored(tmp_path):
+    bogus = tmp_path / "bogus.onnx"
+    bogus.write_bytes(b"not a model")
+    store = ModelStore(tmp_path / "store")
+    with pytest.raises(ModelStoreError, match="ONNX"):
+        store.add(bogus, "emotion")
+    assert "emotion" not in store
+    assert not list((tmp_path / "store").rglob("*.onnx*"))
+
+def test_missing_and_corrupt_models_are_reported(tmp_path, model_path):
+    store = ModelStore(tmp_path / "store")
+    record = store.add(model_path, "emotion")
+    with pytest.raises(ModelStoreError):
+        store.resolve("unknown")
+
+    stored = store.object_path(record.sha256)
+    data = bytearray(stored.read_bytes())
+    data[-1] ^= 0xFF
+    stored.write_bytes(bytes(data))
+    assert store.verify() == ["emotion"]
+
+    stored.write_bytes(bytes(data[:-1]))
+    with pytest.raises(ModelStoreError, match="bytes"):
+        store.resolve("emotion")
+
+def test_store_references_resolve_through_session_registry(tmp_path, model_path, monkeypatch):
+    monkeypatch.setenv("MODEL_STORE_DIR", str(tmp_path / "store"))
+    record = get_model_store().add(model_path, "emotion")
+
+    assert resolve_model_path(str(model_path)) == str(model_path)
+    assert resolve_model_path("store:emotion") == get_model_store().resolve(record.sha256)
+
+    registry = SessionRegistry()
+    by_name = registry.get_session("store:emotion", {"providers": ["CPUExecutionProvider"]})
+    by_hash = registry.get_session(f"store:sha256:{record.sha256}", {"providers": ["CPUExecutionProvider"]})
+    assert by_name is by_hash and len(registry) == 1
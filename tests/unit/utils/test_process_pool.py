@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pytest
+from utils.process_pool import ProcessPoolProcessor
+
+class FrameStats:
+    """Stand-in for a detector living in a worker process"""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.pid = os.getpid()
+
+    def summarize(self, frame):
+        return {
+            "sum": int(frame.sum()) + self.offset,
+            "shape": frame.shape,
+            "zero_copy": not frame.flags.owndata,
+            "pid": self.pid
+        }
+
+def scale(state, value, factor=1):
+    return (value + state.offset) * factor
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ProcessPoolProcessor(FrameStats, 1, max_workers=2, num_slots=2)
+    yield pool
+    pool.shutdown()
+
+def test_frames_use_shared_memory(pool):
+    frame = np.full((480, 640, 3), 2, dtype=np.uint8)
+    result = pool.submit("summarize", frame).result(timeout=30)
+    assert result["sum"] == frame.sum() + 1
+    assert result["shape"] == (480, 640, 3)
+    assert result["zero_copy"]
+    assert result["pid"] != os.getpid()
+    assert len(pool.slots._free) == 2
+
+def test_small_arrays_are_pickled(pool):
+    frame = np.ones((4, 4, 3), dtype=np.uint8)
+    result = pool.submit("summarize", frame).result(timeout=30)
+    assert result["sum"] == 49
+    assert not result["zero_copy"]
+
+def test_function_calls(pool):
+    assert pool.submit(scale, 2, factor=3).result(timeout=30) == 9
+
+def test_many_frames_reuse_slots(pool):
+    frames = [np.full((240, 320, 3), i, dtype=np.uint8) for i in range(10)]
+    futures = [pool.submit("summarize", f) for f in frames]
+    sums = [f.result(timeout=30)["sum"] for f in futures]
+    assert sums == [int(f.sum()) + 1 for f in frames]
+
+@pytest.mark.asyncio
+async def test_submit_async(pool):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    result = await pool.submit_async("summarize", frame)
+    assert result["sum"] == 1
+
+def test_worker_errors_release_slots(pool):
+    with pytest.raises(AttributeError):
+        pool.submit("missing", np.zeros((480, 640, 3), dtype=np.uint8)).result(timeout=30)
+    assert pool.submit("summarize", np.zeros((480, 640, 3), dtype=np.uint8)).result(timeout=30)["sum"] == 1
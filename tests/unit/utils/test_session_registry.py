@@ -0,0 +1,79 @@
+import pytest
+import onnxruntime as ort
+from unittest.mock import MagicMock, patch
+from utils.session_registry import SessionRegistry
+
+onnx = pytest.importorskip("onnx")
+from onnx import helper, TensorProto
+
+@pytest.fixture
+def registry():
+    return SessionRegistry()
+
+@pytest.fixture
+def model_path(tmp_path):
+    inp = helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 4])
+    out = helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 4])
+    graph = helper.make_graph(
+        [helper.make_node("Relu", ["x"], ["h"]), helper.make_node("Identity", ["h"], ["y"])],
+        "test", [inp], [out]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = tmp_path / "model.onnx"
+    onnx.save(model, str(path))
+    return str(path)
+
+def test_sessions_are_deduplicated(registry):
+    with patch("onnxruntime.InferenceSession") as mock_session:
+        first = registry.get_session("model.onnx")
+        second = registry.get_session("./model.onnx")
+        assert first is second
+        mock_session.assert_called_once()
+        assert len(registry) == 1
+
+def test_options_and_providers_split_sessions(registry):
+    with patch("onnxruntime.InferenceSession", side_effect=lambda *a, **k: MagicMock()) as mock_session:
+        a = registry.get_session("model.onnx", {"providers": ["CPUExecutionProvider"]})
+        b = registry.get_session("model.onnx", {"providers": ["CPUExecutionProvider"], "intra_op_threads": 2})
+        assert a is not b
+        assert mock_session.call_count == 2
+
+def test_session_options_from_config(registry):
+    with patch("onnxruntime.InferenceSession") as mock_session:
+        registry.get_session("model.onnx", {
+            "intra_op_threads": 3,
+            "inter_op_threads": 2,
+            "execution_mode": "parallel",
+            "graph_optimization": "basic"
+        })
+        sess_options = mock_session.call_args.kwargs["sess_options"]
+        assert sess_options.intra_op_num_threads == 3
+        assert sess_options.inter_op_num_threads == 2
+        assert sess_options.execution_mode == ort.ExecutionMode.ORT_PARALLEL
+        assert sess_options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+
+def test_release(registry):
+    with patch("onnxruntime.InferenceSession"):
+        registry.get_session("model.onnx")
+        registry.release("model.onnx")
+        assert len(registry) == 0
+
+def test_optimized_model_cache(registry, model_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    options = {"cache_dir": str(cache_dir), "providers": ["CPUExecutionProvider"]}
+
+    session = registry.get_session(model_path, options)
+    cached = list(cache_dir.glob("*.opt.onnx"))
+    assert len(cached) == 1
+    assert not list(cache_dir.glob("*.tmp"))
+
+    registry.clear()
+    with patch("onnxruntime.InferenceSession", wraps=ort.InferenceSession) as mock_session:
+        reloaded = registry.get_session(model_path, options)
+        assert mock_session.call_args.args[0] == str(cached[0])
+        assert (mock_session.call_args.kwargs["sess_options"].graph_optimization_level
+                == ort.GraphOptimizationLevel.ORT_DISABLE_ALL)
+
+    x = [[-1.0, 2.0, -3.0, 4.0]]
+    assert reloaded.run(None, {"x": x})[0].tolist() == session.run(None, {"x": x})[0].tolist()
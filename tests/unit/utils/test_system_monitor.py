@@ -1,11 +1,14 @@
 import time
+import numpy as np
 import pytest
 from unittest.mock import MagicMock, patch
+from utils.collectors import Collector, CollectorUnavailable, PROCFS_AVAILABLE
 from utils.system_monitor import SystemMonitor
 
 @pytest.fixture
 def monitor():
-    return SystemMonitor(interval=0.1)
+    # psutil-backed collectors so tests can patch psutil
+    return SystemMonitor(interval=0.1, procfs=False)
 
 def test_monitor_start_stop(monitor):
     monitor.start()
@@ -60,4 +63,117 @@ def test_process_monitoring(monitor):
     process_stats = monitor.get_process_stats()
     assert "cpu" in process_stats
     assert "memory" in process_stats
-    assert process_stats["memory"] > 0  
\ No newline at end of file
+    assert process_stats["memory"] > 0  
+
+def test_monitor_subscribers(monitor):
+    samples = []
+    monitor.subscribe(samples.append)
+    monitor.start()
+    time.sleep(0.25)
+    monitor.stop()
+    assert len(samples) >= 2
+    assert {"cpu", "memory", "gpu", "disk", "timestamp"} <= set(samples[0])
+
+    count = len(samples)
+    monitor.unsubscribe(samples.append)
+    monitor.start()
+    time.sleep(0.15)
+    monitor.stop()
+    assert len(samples) == count
+
+@patch("psutil.cpu_percent")
+def test_monitor_recent_and_stats(mock_cpu, monitor):
+    values = iter(range(1000))
+    mock_cpu.side_effect = lambda interval=None: float(next(values))
+    monitor.start()
+    time.sleep(0.45)
+    monitor.stop()
+
+    recent = monitor.get_recent("cpu", seconds=10)
+    assert isinstance(recent, np.ndarray)
+    assert not recent.flags.writeable
+    assert recent.tolist() == list(range(len(recent)))
+
+    stats = monitor.get_stats("cpu", window=10.0)
+    assert stats["count"] == len(recent)
+    assert stats["max"] == recent[-1]
+    assert monitor.get_stats("process", window=10.0)["memory"]["mean"] > 0
+    assert monitor.get_recent("network").shape[1] == 2
+    assert monitor.get_current("missing") is None
+
+
+class CountingCollector(Collector):
+    name = "counter"
+
+    def __init__(self, interval, fail_with=None):
+        super().__init__(interval)
+        self.calls = 0
+        self.fail_with = fail_with
+
+    def collect(self):
+        self.calls += 1
+        if self.fail_with is not None:
+            raise self.fail_with
+        return (float(self.calls),)
+
+def test_per_collector_intervals():
+    fast, slow = CountingCollector(0.02), CountingCollector(0.2)
+    slow.name = "slow"
+    monitor = SystemMonitor(collectors=[fast, slow])
+    monitor.start()
+    time.sleep(0.3)
+    monitor.stop()
+
+    assert fast.calls >= 8
+    assert slow.calls == 2
+    assert monitor.get_current("slow") == 2.0
+
+def test_unavailable_collector_disables_itself():
+    gpu = CountingCollector(0.02, fail_with=CollectorUnavailable("no GPU"))
+    monitor = SystemMonitor(collectors=[gpu])
+    monitor.start()
+    time.sleep(0.15)
+    monitor.stop()
+
+    assert gpu.calls == 1 and not gpu.enabled
+    assert monitor.get_current("counter") is None
+
+def test_failing_collector_disabled_after_repeated_errors():
+    broken = CountingCollector(0.01, fail_with=OSError("read failed"))
+    monitor = SystemMonitor(collectors=[broken])
+    monitor.start()
+    time.sleep(0.15)
+    monitor.stop()
+    assert broken.calls == broken.max_failures and not broken.enabled
+
+@patch("GPUtil.getGPUs", return_value=[])
+def test_missing_gpu_disables_gpu_collector(mock_gpus, monitor):
+    monitor.start()
+    time.sleep(0.25)
+    monitor.stop()
+    assert mock_gpus.call_count == 1
+    assert not monitor.collectors["gpu"].enabled
+    assert monitor.latest_sample()["gpu"] == 0.0
+
+@pytest.mark.skipif(not PROCFS_AVAILABLE, reason="needs /proc")
+def test_procfs_collectors_match_psutil():
+    import psutil
+    monitor = SystemMonitor(interval=0.05, procfs=True)
+    monitor.start()
+    time.sleep(0.2)
+    monitor.stop()
+
+    assert 0 <= monitor.get_current("cpu") <= 100
+    assert monitor.get_current("memory") == pytest.approx(psutil.virtual_memory().percent, abs=2)
+    assert monitor.get_current("disk") == pytest.approx(psutil.disk_usage("/").percent, abs=1)
+    rss = psutil.Process().memory_info().rss / (1024 * 1024)
+    assert monitor.get_process_stats()["memory"] == pytest.approx(rss, rel=0.2)
+    assert monitor.get_current("network")["recv"] > 0
+
+def test_monitor_overhead_is_tracked(monitor):
+    monitor.start()
+    time.sleep(0.3)
+    monitor.stop()
+    overhead = monitor.get_overhead()
+    assert overhead["run_seconds"] >= 0.2
+    assert 0 <= overhead["cpu_percent"] < 50
@@ -53,4 +53,90 @@ def test_synchronizer(synchronizer):
         frame_times.append(time.perf_counter())
     
     intervals = np.diff(frame_times)
-    assert all(0.09 < interval < 0.11 for interval in intervals)
\ No newline at end of file
+    assert all(0.09 < interval < 0.11 for interval in intervals)
+def test_timer_laps_feed_metrics():
+    from utils.metrics import MetricsRegistry
+    registry = MetricsRegistry()
+    timer = Timer(metrics_prefix="frame", registry=registry)
+    for _ in range(3):
+        timer.lap("detect")
+        timer.lap("recognize")
+
+    assert len(timer.get_lap_times()) == 6
+    assert timer.get_lap("missing") == 0.0
+    assert registry.snapshot()["stages"]["frame.detect"]["count"] == 3
+
+def test_fps_counter_streaming_stats_match_window():
+    counter = FPSCounter(window_size=4)
+    samples = [0.01, 0.03, 0.02, 0.05, 0.04, 0.01, 0.02]
+    for sample in samples:
+        counter._add(sample)
+
+    window = samples[-4:]
+    assert counter.current_fps == pytest.approx(1.0 / np.mean(window))
+    assert counter.jitter == pytest.approx(np.std(window))
+    assert counter.min_fps == pytest.approx(1.0 / max(window))
+    assert counter.max_fps == pytest.approx(1.0 / min(window))
+    assert counter.frame_time_percentile(50) == 0.02
+    assert counter.frame_time_percentile(100) == 0.05
+
+    counter.reset()
+    assert counter.current_fps == 0.0 and counter.frame_time_percentile(95) == 0.0
+
+def test_synchronizer_skips_missed_frames():
+    sync = Synchronizer(target_fps=100, late_policy="skip")
+    time.sleep(0.055)  # Miss about five 10ms slots
+    sync.wait_next()
+    assert sync.late_frames == 1
+    assert 4 <= sync.skipped_frames <= 6
+    assert sync.last_time <= time.perf_counter() < sync.next_time  # Ran at the last missed slot
+
+def test_synchronizer_catch_up_keeps_schedule():
+    sync = Synchronizer(target_fps=100, late_policy="catch_up")
+    time.sleep(0.055)
+    start = time.perf_counter()
+    for _ in range(3):
+        sync.wait_next()
+    assert time.perf_counter() - start < 0.005  # Late frames run back-to-back
+    assert sync.skipped_frames == 0
+
+def test_synchronizer_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        Synchronizer(target_fps=10, late_policy="drop")
+
+def test_synchronizer_async():
+    import asyncio
+    sync = Synchronizer(target_fps=10)
+
+    async def run():
+        stamps = []
+        for _ in range(3):
+            await sync.wait_next_async()
+            stamps.append(time.perf_counter())
+        return stamps
+
+    intervals = np.diff(asyncio.run(run()))
+    assert all(0.09 < interval < 0.11 for interval in intervals)
+
+def test_synchronizer_async_does_not_spin_on_the_loop():
+    import asyncio
+    # A spin threshold as long as the interval would hold the loop for the whole wait
+    sync = Synchronizer(target_fps=20, spin_threshold=0.05)
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            for _ in range(15):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        for _ in range(2):
+            await sync.wait_next_async()
+        await ticking
+        return ticks
+
+    ticks = asyncio.run(run())
+    assert max(np.diff(ticks)) < 0.03
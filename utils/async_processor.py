@@ -3,73 +3,296 @@ import queue
 import threading
 import time
 import concurrent.futures
+import functools
 import logging
-from typing import Callable, List, Any
+from collections import deque
+from enum import Enum, IntEnum
+from typing import AsyncIterator, Callable, Deque, Dict, Iterable, List, Any, Optional
+
+from utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+_queue_wait_time = metrics.histogram("async.queue_wait")
+_task_time = metrics.histogram("async.task")
+_tasks_rejected = metrics.counter("async.rejected")
+_tasks_dropped = metrics.counter("async.dropped")
+_batch_time = metrics.histogram("async_batch.run")
+_batches_run = metrics.counter("async_batch.batches")
+_batch_items = metrics.counter("async_batch.items")
+
+class TaskPriority(IntEnum):
+    """Dispatch order for AsyncProcessor tasks (lower runs first)"""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class TaskDropped(RuntimeError):
+    """A queued task was cancelled before it ran: evicted under drop_oldest, or left at shutdown"""
+
+
+class QueuePolicy(str, Enum):
+    """What AsyncProcessor.submit does when the task queue is full"""
+    BLOCK = "block"              # Wait for space
+    REJECT = "reject"            # Fail the new task after a short wait
+    DROP_OLDEST = "drop_oldest"  # Cancel the oldest queued task of the lowest priority, if not above the new one
+
+
 class AsyncProcessor:
-    """Asynchronous task processor with thread pool"""
-    
-    def __init__(self, max_workers: int = 4, queue_size: int = 100):
+    """Asynchronous task processor with thread pool.
+
+    A dispatcher thread hands queued tasks to the pool in priority order,
+    keeping at most max_in_flight tasks running so that a backlog of
+    low-priority work never sits in the executor ahead of urgent tasks.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        queue_size: int = 100,
+        max_in_flight: Optional[int] = None,
+        queue_policy: str = QueuePolicy.REJECT,
+        submit_timeout: float = 0.1,
+    ):
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
-        self.task_queue = queue.Queue(maxsize=queue_size)
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight or max_workers
+        self.queue_policy = QueuePolicy(queue_policy)
+        self.submit_timeout = submit_timeout
+
+        self._queues: Dict[TaskPriority, Deque[tuple]] = {p: deque() for p in TaskPriority}
+        self._queued = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.dropped = 0
+        self.rejected = 0
+
         self._running = True
         self.worker_thread = threading.Thread(target=self._process_tasks, daemon=True)
         self.worker_thread.start()
-    
+
+    def _next_task(self) -> Optional[tuple]:
+        """Block until a task is queued and a concurrency slot is free"""
+        with self._condition:
+            while self._running and (self._queued == 0 or self._in_flight >= self.max_in_flight):
+                self._condition.wait(timeout=0.1)
+            if not self._running:
+                return None
+
+            for priority in TaskPriority:
+                if self._queues[priority]:
+                    self._queued -= 1
+                    self._in_flight += 1
+                    self._condition.notify_all()
+                    return self._queues[priority].popleft()
+        return None
+
+    def _run_task(self, future: concurrent.futures.Future, fn: Callable, args: tuple, kwargs: dict,
+                  submitted: float):
+        try:
+            if future.set_running_or_notify_cancel():
+                start = _queue_wait_time.observe_since(submitted)
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+                _task_time.observe_since(start)
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
     def _process_tasks(self):
-        """Worker thread processing tasks from queue"""
+        """Dispatcher thread moving tasks from the priority queues onto the pool"""
         while self._running:
             try:
-                future, fn, args, kwargs = self.task_queue.get(timeout=0.1)
+                task = self._next_task()
+                if task is None:
+                    continue
                 try:
-                    result = fn(*args, **kwargs)
-                    future.set_result(result)
-                except Exception as e:
-                    future.set_exception(e)
-                self.task_queue.task_done()
-            except queue.Empty:
-                continue
+                    self.executor.submit(self._run_task, *task)
+                except RuntimeError as e:
+                    task[0].set_exception(e)
+                    with self._condition:
+                        self._in_flight -= 1
             except Exception as e:
                 logger.error(f"Task processing error: {e}")
-    
-    def submit(self, fn: Callable, *args, **kwargs) -> concurrent.futures.Future:
-        """Submit a task for asynchronous processing"""
+
+    def _drop_oldest(self, incoming: TaskPriority) -> bool:
+        """Cancel the oldest queued task at the lowest non-empty priority no higher than incoming"""
+        for priority in reversed(TaskPriority):
+            if priority < incoming:
+                break
+            if self._queues[priority]:
+                future = self._queues[priority].popleft()[0]
+                self._queued -= 1
+                self.dropped += 1
+                _tasks_dropped.inc()
+                future.cancel()
+                return True
+        return False
+
+    def submit_with_priority(self, priority: TaskPriority, fn: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """Submit a task at the given priority"""
+        return self._enqueue(priority, fn, args, kwargs, block=True)
+
+    def _enqueue(self, priority: TaskPriority, fn: Callable, args: tuple, kwargs: dict,
+                 block: bool) -> Optional[concurrent.futures.Future]:
+        """Queue a task, applying the queue policy when full.
+
+        With block=False a full queue under the block or reject policy
+        returns None instead of waiting for room.
+        """
         if not self._running:
             raise RuntimeError("Processor is shutting down")
-            
+
+        priority = TaskPriority(priority)
         future = concurrent.futures.Future()
-        try:
-            self.task_queue.put((future, fn, args, kwargs), timeout=0.1)
-        except queue.Full:
-            future.set_exception(RuntimeError("Task queue full"))
+        task = (future, fn, args, kwargs, time.perf_counter())
+        with self._condition:
+            if self._queued >= self.queue_size:
+                if self.queue_policy == QueuePolicy.DROP_OLDEST:
+                    if not self._drop_oldest(priority):
+                        # Everything queued outranks the new task
+                        self.rejected += 1
+                        _tasks_rejected.inc()
+                        future.set_exception(RuntimeError("Task queue full"))
+                        return future
+                else:
+                    if not block:
+                        return None
+                    timeout = None if self.queue_policy == QueuePolicy.BLOCK else self.submit_timeout
+                    self._condition.wait_for(
+                        lambda: self._queued < self.queue_size or not self._running, timeout=timeout
+                    )
+                    if not self._running:
+                        raise RuntimeError("Processor is shutting down")
+                    if self._queued >= self.queue_size:
+                        self.rejected += 1
+                        _tasks_rejected.inc()
+                        future.set_exception(RuntimeError("Task queue full"))
+                        return future
+
+            self._queues[priority].append(task)
+            self._queued += 1
+            self._condition.notify_all()
+        return future
+
+    def submit(self, fn: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """Submit a task for asynchronous processing"""
+        return self.submit_with_priority(TaskPriority.NORMAL, fn, *args, **kwargs)
+
+    def qsize(self) -> int:
+        """Number of queued tasks not yet dispatched"""
+        return self._queued
+
+    async def _submit_from_loop(self, priority: TaskPriority, fn: Callable, args: tuple,
+                                kwargs: dict) -> concurrent.futures.Future:
+        """Queue a task from a coroutine without ever blocking the event loop"""
+        future = self._enqueue(priority, fn, args, kwargs, block=False)
+        if future is None:
+            # Queue full: wait for room on an executor thread so the loop keeps running
+            loop = asyncio.get_running_loop()
+            future = await loop.run_in_executor(
+                None, functools.partial(self.submit_with_priority, priority, fn, *args, **kwargs)
+            )
         return future
-    
+
     async def submit_async(self, fn: Callable, *args, **kwargs) -> Any:
-        """Submit and await result asynchronously"""
+        """Submit and await result asynchronously without tying up a thread.
+
+        Only a full queue under the block or reject policy borrows a thread,
+        to wait for room without stalling the event loop. Raises TaskDropped
+        if the task is evicted under drop_oldest before it runs.
+        """
+        future = await self._submit_from_loop(TaskPriority.NORMAL, fn, args, kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Cancelling the caller also cancels the task; only a cancelled task is reported as dropped
+            task = asyncio.current_task()
+            if future.cancelled() and not (task is not None and task.cancelling()):
+                raise TaskDropped("Task dropped by queue policy" if self._running
+                                  else "Task dropped at shutdown") from None
+            raise
+
+    async def iter_completed(
+        self,
+        futures: Iterable[concurrent.futures.Future],
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[Any]:
+        """Yield results of futures in completion order.
+
+        Completion is signalled through loop.call_soon_threadsafe callbacks,
+        so no threads are used while waiting. Cancelled futures (for example
+        tasks dropped under the drop_oldest policy) are skipped. Exceptions
+        are raised, or yielded when return_exceptions is True.
+        """
         loop = asyncio.get_running_loop()
-        future = self.submit(fn, *args, **kwargs)
-        return await loop.run_in_executor(None, future.result)
-    
+        done: asyncio.Queue = asyncio.Queue()
+        futures = list(futures)
+
+        for future in futures:
+            future.add_done_callback(
+                lambda f: loop.call_soon_threadsafe(done.put_nowait, f)
+            )
+
+        for _ in range(len(futures)):
+            future = await done.get()
+            if future.cancelled():
+                continue
+            exc = future.exception()
+            if exc is not None:
+                if not return_exceptions:
+                    raise exc
+                yield exc
+            else:
+                yield future.result()
+
+    async def map_async(self, fn: Callable, items: Iterable[Any], return_exceptions: bool = False) -> AsyncIterator[Any]:
+        """Submit fn(item) for each item and stream results in completion order"""
+        futures = [await self._submit_from_loop(TaskPriority.NORMAL, fn, (item,), {}) for item in items]
+        async for result in self.iter_completed(futures, return_exceptions=return_exceptions):
+            yield result
+
     def shutdown(self, wait: bool = True):
-        """Shutdown the processor"""
-        self._running = False
+        """Shutdown the processor, cancelling tasks that were never dispatched"""
+        with self._condition:
+            self._running = False
+            for tasks in self._queues.values():
+                while tasks:
+                    tasks.popleft()[0].cancel()
+            self._queued = 0
+            self._condition.notify_all()
         self.worker_thread.join(timeout=5.0)
         self.executor.shutdown(wait=wait)
 
 
 class AsyncBatchProcessor:
-    """Efficient batch processor with parallel processing and strict queue limits"""
+    """Batch processor that groups queued tasks into single batched calls.
+
+    Tasks submitted with the same fn are collected until batch_size items are
+    queued or max_batch_latency_ms has passed since the first one arrived.
+    fn is then called once with the list of args and must return a list of
+    results in the same order, which are fanned back out to the futures.
+    With adaptive=True each fn's batch size is capped so that its measured
+    batch cost stays within the latency budget; a slow fn does not shrink
+    the batches of the others.
+    """
 
     def __init__(
         self,
         batch_size: int = 8,
         max_workers: int = 4,
         max_queue_size: int = 100,
+        max_batch_latency_ms: float = 10.0,
+        adaptive: bool = True,
     ):
         self.batch_size = batch_size
         self.max_queue_size = max_queue_size
+        self.max_batch_latency = max_batch_latency_ms / 1000.0
+        self.adaptive = adaptive
 
         self.batch_queue = queue.Queue()
         self.executor = concurrent.futures.ThreadPoolExecutor(
@@ -77,7 +300,9 @@ class AsyncBatchProcessor:
         )
 
         self._lock = threading.Lock()
-        self._outstanding = 0  
+        self._outstanding = 0
+        self._item_cost: Dict[Callable, float] = {}
+        self._batch_sizes: Dict[Callable, int] = {}
 
         self._running = True
         self.worker_thread = threading.Thread(
@@ -86,7 +311,7 @@ class AsyncBatchProcessor:
         self.worker_thread.start()
 
     def submit_batch(self, fn: Callable, args_list: List[Any]) -> List[concurrent.futures.Future]:
-        """Submit each args in args_list as its own batch‐of‐1 under fn."""
+        """Queue each args in args_list for a batched call to fn."""
         futures: List[concurrent.futures.Future] = []
 
         for args in args_list:
@@ -101,40 +326,111 @@ class AsyncBatchProcessor:
 
         return futures
 
+    def batch_size_for(self, fn: Callable) -> int:
+        """Current batch size for fn (batch_size until its cost has been measured)"""
+        return self._batch_sizes.get(fn, self.batch_size)
+
+    def _collect_batch(self) -> List[tuple]:
+        """Wait for a first task, then gather more until its fn's batch is full or the deadline passes"""
+        try:
+            batch = [self.batch_queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        fn = batch[0][1]
+        limit = self.batch_size_for(fn)
+        count = 1
+        deadline = time.perf_counter() + self.max_batch_latency
+        while count < limit:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    task = self.batch_queue.get(timeout=remaining)
+                else:
+                    task = self.batch_queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(task)
+            count += task[1] == fn  # Bound methods are equal, not identical, across calls
+        return batch
+
+    def _run_batch(self, fn: Callable, args_list: List[Any]) -> List[Any]:
+        start = time.perf_counter()
+        results = fn(args_list)
+        elapsed = _batch_time.observe_since(start) - start
+        _batches_run.inc()
+        _batch_items.inc(len(args_list))
+        self._record_cost(fn, elapsed / len(args_list))
+
+        if len(results) != len(args_list):
+            raise RuntimeError(
+                f"Batch function returned {len(results)} results for {len(args_list)} inputs"
+            )
+        return results
+
+    def _record_cost(self, fn: Callable, item_cost: float):
+        """Track per-item cost and resize batches to fit the latency budget"""
+        with self._lock:
+            previous = self._item_cost.get(fn)
+            cost = item_cost if previous is None else 0.8 * previous + 0.2 * item_cost
+            self._item_cost[fn] = cost
+
+            if self.adaptive:
+                fit = int(self.max_batch_latency / cost) if cost > 0 else self.batch_size
+                self._batch_sizes[fn] = max(1, min(self.batch_size, fit))
+
+    def _dispatch(self, tasks: List[tuple]):
+        """Run one batched call for tasks sharing a fn and fan results out"""
+        fn = tasks[0][1]
+        # Futures cancelled by their caller are left out; the rest can no longer be cancelled
+        live = [task for task in tasks if task[0].set_running_or_notify_cancel()]
+        if len(live) < len(tasks):
+            with self._lock:
+                self._outstanding -= len(tasks) - len(live)
+        if not live:
+            return
+        args_list = [args for _, _, args in live]
+
+        def _fan_out(proc: concurrent.futures.Future):
+            try:
+                results = proc.result()
+                for (orig_fut, _, _), result in zip(live, results):
+                    orig_fut.set_result(result)
+            except Exception as e:
+                for orig_fut, _, _ in live:
+                    if not orig_fut.done():
+                        orig_fut.set_exception(e)
+            finally:
+                with self._lock:
+                    self._outstanding -= len(live)
+
+        try:
+            proc = self.executor.submit(self._run_batch, fn, args_list)
+        except RuntimeError as e:
+            proc = concurrent.futures.Future()
+            proc.set_exception(e)
+        proc.add_done_callback(_fan_out)
+
     def _process_batches(self):
-        """Continuously pull up to batch_size items, dispatch them,
-           then decrement the outstanding counter."""
+        """Continuously collect batches, group them by fn and dispatch each group."""
         while self._running:
             try:
-                batch = []
-                while len(batch) < self.batch_size:
-                    try:
-                        task = self.batch_queue.get(timeout=0.1)
-                        batch.append(task)
-                    except queue.Empty:
-                        break
-
+                batch = self._collect_batch()
                 if not batch:
                     continue
 
-                proc_futs = []
-                for orig_fut, fn, args in batch:
-                    proc = self.executor.submit(fn, [args])
-                    proc_futs.append((orig_fut, proc))
+                groups: Dict[Callable, List[tuple]] = {}
+                for task in batch:
+                    groups.setdefault(task[1], []).append(task)
 
-                for orig_fut, proc in proc_futs:
-                    try:
-                        res_list = proc.result(timeout=1.0)
-                        orig_fut.set_result(res_list[0])
-                    except Exception as e:
-                        orig_fut.set_exception(e)
+                for fn, tasks in groups.items():
+                    size = self.batch_size_for(fn)
+                    for start in range(0, len(tasks), size):
+                        self._dispatch(tasks[start:start + size])
 
                 for _ in batch:
                     self.batch_queue.task_done()
 
-                with self._lock:
-                    self._outstanding -= len(batch)
-
             except Exception as e:
                 logger.error(f"Batch processing error: {e}")
 
@@ -142,4 +438,4 @@ class AsyncBatchProcessor:
         """Shutdown processing thread + executor."""
         self._running = False
         self.worker_thread.join(timeout=1.0)
-        self.executor.shutdown(wait=False)
\ No newline at end of file
+        self.executor.shutdown(wait=False)
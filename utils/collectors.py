@@ -0,0 +1,249 @@
+import os
+import sys
+import time
+import logging
+from typing import Optional, Sequence, Tuple
+
+from utils.lazy_import import lazy_import
+
+# Only needed off Linux (psutil) or when a GPU collector runs (GPUtil)
+psutil = lazy_import("psutil")
+GPUtil = lazy_import("GPUtil")
+
+logger = logging.getLogger(__name__)
+
+PROCFS_AVAILABLE = sys.platform.startswith("linux") and os.path.exists("/proc/self/stat")
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class CollectorUnavailable(Exception):
+    """Raised by a collector when the resource it reads does not exist on this machine"""
+
+
+class ProcFile:
+    """A /proc file kept open and re-read from offset 0, saving an open() per sample"""
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.size = size
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def read(self) -> bytes:
+        return os.pread(self._fd, self.size, 0)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class Collector:
+    """One source of samples for SystemMonitor.
+
+    Subclasses set name and fields and implement collect(), returning one
+    float per field. interval is how often the monitor calls it. Raising
+    CollectorUnavailable disables the collector for good; other errors are
+    logged and the collector is disabled after max_failures in a row.
+    """
+    name: str = ""
+    fields: Tuple[str, ...] = ("value",)
+    max_failures = 3
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.enabled = True
+        self.failures = 0
+
+    def collect(self) -> Sequence[float]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CpuCollector(Collector):
+    """System-wide CPU percent from /proc/stat deltas, or psutil elsewhere"""
+    name = "cpu"
+
+    def __init__(self, interval: float, procfs: bool = PROCFS_AVAILABLE):
+        super().__init__(interval)
+        self._stat = ProcFile("/proc/stat", 512) if procfs else None
+        self._last = self._read_times() if procfs else None
+        if not procfs:
+            psutil.cpu_percent(interval=None)  # Prime psutil's delta
+
+    def _read_times(self) -> Tuple[int, int]:
+        # cpu user nice system idle iowait irq softirq steal guest guest_nice
+        values = [int(v) for v in self._stat.read().split(b"\n", 1)[0].split()[1:]]
+        total = sum(values[:8])  # guest time is already counted in user/nice
+        idle = values[3] + values[4]
+        return total, idle
+
+    def collect(self) -> Sequence[float]:
+        if self._stat is None:
+            return (psutil.cpu_percent(interval=None),)
+        total, idle = self._read_times()
+        last_total, last_idle = self._last
+        self._last = (total, idle)
+        elapsed = total - last_total
+        if elapsed <= 0:
+            return (0.0,)
+        return (100.0 * (elapsed - (idle - last_idle)) / elapsed,)
+
+    def close(self):
+        if self._stat is not None:
+            self._stat.close()
+
+
+class MemoryCollector(Collector):
+    """Used memory percent, computed like psutil from MemTotal and MemAvailable"""
+    name = "memory"
+
+    def __init__(self, interval: float, procfs: bool = PROCFS_AVAILABLE):
+        super().__init__(interval)
+        self._meminfo = ProcFile("/proc/meminfo", 8192) if procfs else None
+
+    def collect(self) -> Sequence[float]:
+        if self._meminfo is None:
+            return (psutil.virtual_memory().percent,)
+        total = available = None
+        for line in self._meminfo.read().split(b"\n"):
+            if line.startswith(b"MemTotal:"):
+                total = int(line.split()[1])
+            elif line.startswith(b"MemAvailable:"):
+                available = int(line.split()[1])
+                break
+        if not total or available is None:
+            return (psutil.virtual_memory().percent,)
+        return (100.0 * (total - available) / total,)
+
+    def close(self):
+        if self._meminfo is not None:
+            self._meminfo.close()
+
+
+class GpuCollector(Collector):
+    """Load of the first GPU via GPUtil; disables itself when no GPU is found.
+
+    GPUtil runs nvidia-smi in a subprocess on every call, so this collector
+    defaults to a much longer interval than the /proc readers.
+    """
+    name = "gpu"
+
+    def __init__(self, interval: float):
+        super().__init__(interval)
+        # Resolve the lazy import here, on the constructing thread: importing
+        # GPUtil takes ~170 ms, which would otherwise land on the monitor
+        # thread's first tick and count against its CPU budget
+        self._import_error: Optional[ImportError] = None
+        try:
+            GPUtil.getGPUs
+        except ImportError as e:
+            self._import_error = e
+
+    def collect(self) -> Sequence[float]:
+        if self._import_error is not None:
+            raise CollectorUnavailable(f"GPUtil failed: {self._import_error}")
+        try:
+            gpus = GPUtil.getGPUs()
+        except Exception as e:
+            raise CollectorUnavailable(f"GPUtil failed: {e}") from e
+        if not gpus:
+            raise CollectorUnavailable("No NVIDIA GPU found")
+        return (gpus[0].load * 100,)
+
+
+class DiskCollector(Collector):
+    """Used space percent of one filesystem via statvfs"""
+    name = "disk"
+
+    def __init__(self, interval: float, path: str = "/"):
+        super().__init__(interval)
+        self.path = path
+
+    def collect(self) -> Sequence[float]:
+        st = os.statvfs(self.path)
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        # Same as psutil: free space reserved for root does not count as available
+        total = used + st.f_bavail * st.f_frsize
+        return (100.0 * used / total if total else 0.0,)
+
+
+class NetworkCollector(Collector):
+    """Cumulative bytes sent and received over all interfaces"""
+    name = "network"
+    fields = ("sent", "recv")
+
+    def __init__(self, interval: float, procfs: bool = PROCFS_AVAILABLE):
+        super().__init__(interval)
+        self._netdev = ProcFile("/proc/net/dev", 16384) if procfs else None
+
+    def collect(self) -> Sequence[float]:
+        if self._netdev is None:
+            net = psutil.net_io_counters()
+            return (net.bytes_sent, net.bytes_recv)
+        sent = recv = 0
+        for line in self._netdev.read().split(b"\n")[2:]:
+            if b":" not in line:
+                continue
+            values = line.split(b":", 1)[1].split()
+            recv += int(values[0])
+            sent += int(values[8])
+        return (sent, recv)
+
+    def close(self):
+        if self._netdev is not None:
+            self._netdev.close()
+
+
+class ProcessCollector(Collector):
+    """CPU percent (of one core, like psutil) and RSS in MB of one process"""
+    name = "process"
+    fields = ("cpu", "memory")
+
+    def __init__(self, interval: float, pid: Optional[int] = None, procfs: bool = PROCFS_AVAILABLE):
+        super().__init__(interval)
+        self.pid = pid or os.getpid()
+        if procfs:
+            self._stat = ProcFile(f"/proc/{self.pid}/stat", 1024)
+            self._statm = ProcFile(f"/proc/{self.pid}/statm", 256)
+            self._last = (self._cpu_seconds(), time.monotonic())
+        else:
+            self._stat = self._statm = None
+            self.process = psutil.Process(self.pid)
+            self.process.cpu_percent()  # Prime psutil's delta
+
+    def _cpu_seconds(self) -> float:
+        # Fields after the ")" closing the command name start at field 3 (state)
+        values = self._stat.read().rsplit(b")", 1)[1].split()
+        return (int(values[11]) + int(values[12])) / _CLOCK_TICKS  # utime + stime
+
+    def collect(self) -> Sequence[float]:
+        if self._stat is None:
+            return (self.process.cpu_percent(), self.process.memory_info().rss / (1024 * 1024))
+
+        cpu, now = self._cpu_seconds(), time.monotonic()
+        last_cpu, last_time = self._last
+        self._last = (cpu, now)
+        cpu_percent = 100.0 * (cpu - last_cpu) / (now - last_time) if now > last_time else 0.0
+        rss_pages = int(self._statm.read().split()[1])
+        return (cpu_percent, rss_pages * _PAGE_SIZE / (1024 * 1024))
+
+    def close(self):
+        if self._stat is not None:
+            self._stat.close()
+            self._statm.close()
+
+
+def default_collectors(interval: float, procfs: bool = PROCFS_AVAILABLE, pid: Optional[int] = None,
+                       disk_path: str = "/") -> list:
+    """The standard collector set, with slower intervals for the expensive or slow-moving ones"""
+    return [
+        CpuCollector(interval, procfs),
+        MemoryCollector(interval, procfs),
+        ProcessCollector(interval, pid, procfs),
+        NetworkCollector(5 * interval, procfs),
+        GpuCollector(5 * interval),
+        DiskCollector(30 * interval, disk_path),
+    ]
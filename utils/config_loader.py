@@ -1,66 +1,149 @@
 import os
-import yaml
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from pathlib import Path
-from dotenv import load_dotenv
 import logging
 import re
+import threading
+
+from utils.lazy_import import lazy_import
+
+yaml = lazy_import("yaml")
 
 logger = logging.getLogger(__name__)
 
+_ENV_PATTERN = re.compile(r'\$\{([^}]+)\}')
+_MISSING = object()
+
+# callback(key_path, old_value, new_value); a value is None where the key is absent
+ConfigCallback = Callable[[str, Any, Any], None]
+
+
+def _replace_env(match: "re.Match") -> str:
+    var_name = match.group(1)
+    if ':-' in var_name:
+        var_name, default = var_name.split(':-', 1)
+        return os.getenv(var_name, default)
+    return os.getenv(var_name, match.group(0))
+
+
+def lookup(config: Any, keys: List[str], default: Any = None) -> Any:
+    """Walk nested dicts along keys, returning default where a key is missing"""
+    for key in keys:
+        if not isinstance(config, dict) or key not in config:
+            return default
+        config = config[key]
+    return config
+
+
+def diff_configs(old: Any, new: Any, prefix: str = "") -> Dict[str, Tuple[Any, Any]]:
+    """Leaf-level changes between two config trees as {key_path: (old, new)}"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes: Dict[str, Tuple[Any, Any]] = {}
+        for key in old.keys() | new.keys():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            changes.update(diff_configs(old.get(key), new.get(key), path))
+        return changes
+    if old != new:
+        return {prefix: (old, new)}
+    return {}
+
+
 class ConfigLoader:
-    """Advanced YAML configuration loader with environment variable substitution"""
-    
+    """Advanced YAML configuration loader with environment variable substitution.
+
+    Key paths start with the config name: "emotion.detection.min_confidence"
+    is detection.min_confidence in emotion.yaml. subscribe() registers a
+    callback for a key path, called with the old and new value whenever a
+    reload changes anything at or below it. start_watching() polls the
+    loaded files' mtimes and reloads only the files that changed.
+    """
+
     def __init__(self, config_dir: str = "configs"):
         self.config_dir = Path(config_dir)
         self._cache: Dict[str, Dict[str, Any]] = {}
-        load_dotenv() 
-        
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._snapshots: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+        self._subscribers: Dict[str, List[ConfigCallback]] = {}
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        from dotenv import load_dotenv
+        load_dotenv()
+
     def _resolve_env_vars(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Recursively replace ${VAR} with environment variables in strings"""
-        pattern = re.compile(r'\$\{([^}]+)\}')
-        
         def _replace(value: Any) -> Any:
             if isinstance(value, str):
-                def replace_match(match):
-                    var_name = match.group(1)
-                    if ':-' in var_name:
-                        var_name, default = var_name.split(':-', 1)
-                        return os.getenv(var_name, default)
-                    return os.getenv(var_name, match.group(0))
-                return pattern.sub(replace_match, value)
+                return _ENV_PATTERN.sub(_replace_env, value)
             elif isinstance(value, dict):
                 return {k: _replace(v) for k, v in value.items()}
             elif isinstance(value, list):
                 return [_replace(item) for item in value]
             return value
-        
+
         return _replace(config)
-    
-    def _load_yaml(self, config_name: str) -> Dict[str, Any]:
-        """Load YAML file with caching"""
-        if config_name in self._cache:
-            return self._cache[config_name]
-            
+
+    def _file_stat(self, config_path: Path) -> Tuple[int, int]:
+        try:
+            st = config_path.stat()
+        except OSError:
+            return (0, -1)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_yaml(self, config_name: str) -> Dict[str, Any]:
         config_path = self.config_dir / f"{config_name}.yaml"
         if not config_path.exists():
             logger.error(f"Config file not found: {config_path}")
             raise FileNotFoundError(f"Config file {config_name}.yaml not found")
-            
+
+        stat = self._file_stat(config_path)
         try:
             with open(config_path, 'r') as f:
                 config = yaml.safe_load(f)
-                resolved_config = self._resolve_env_vars(config)
-                self._cache[config_name] = resolved_config
-                return resolved_config
         except Exception as e:
             logger.exception(f"Error loading config {config_name}: {e}")
             raise
-    
+        self._stats[config_name] = stat
+        return self._resolve_env_vars(config)
+
+    def _load_yaml(self, config_name: str) -> Dict[str, Any]:
+        """Load YAML file with caching"""
+        # Cached trees are replaced, never mutated, so the unlocked read is safe
+        config = self._cache.get(config_name)
+        if config is not None:
+            return config
+
+        with self._lock:
+            config = self._cache.get(config_name)
+            if config is None:
+                config = self._cache[config_name] = self._read_yaml(config_name)
+            return config
+
     def get_config(self, config_name: str) -> Dict[str, Any]:
         """Get configuration by name"""
         return self._load_yaml(config_name)
-    
+
+    def get_snapshot(self, config_name: str):
+        """Validated, immutable snapshot of a config (see utils.config_snapshot.SNAPSHOT_TYPES).
+
+        Built once per loaded version of the file; a reload yields a new snapshot.
+        """
+        from utils.config_snapshot import SNAPSHOT_TYPES
+        if config_name not in SNAPSHOT_TYPES:
+            raise KeyError(f"No snapshot type for config {config_name!r}; have {sorted(SNAPSHOT_TYPES)}")
+        config = self.get_config(config_name)
+        cached = self._snapshots.get(config_name)
+        if cached is not None and cached[0] is config:
+            return cached[1]
+        snapshot = SNAPSHOT_TYPES[config_name].from_dict(config)
+        self._snapshots[config_name] = (config, snapshot)
+        return snapshot
+
+    def get(self, key_path: str, default: Any = None) -> Any:
+        """Value at a key path such as "pipeline.pipeline.max_fps" """
+        config_name, *keys = key_path.split(".")
+        return lookup(self.get_config(config_name), keys, default)
+
     def get_full_config(self) -> Dict[str, Dict[str, Any]]:
         """Load all configurations"""
         return {
@@ -70,16 +153,126 @@ class ConfigLoader:
             "llm": self.get_config("llm"),
             "tts": self.get_config("tts")
         }
-    
+
+    def _reload(self, config_name: str) -> Dict[str, Tuple[Any, Any]]:
+        """Re-read one file, swap it into the cache and notify subscribers; returns the diff"""
+        with self._lock:
+            old = self._cache.get(config_name)
+            new = self._read_yaml(config_name)
+            self._cache[config_name] = new
+        if old is None:
+            return {}
+
+        changes = diff_configs(old, new, config_name)
+        if changes:
+            logger.info(f"Config {config_name} changed: {sorted(changes)}")
+            self._notify(config_name, old, new)
+        return changes
+
     def reload_config(self, config_name: Optional[str] = None):
         """Reload configuration(s) from disk"""
         if config_name:
-            if config_name in self._cache:
-                del self._cache[config_name]
+            self._reload(config_name)
             return self.get_config(config_name)
         else:
-            self._cache = {}
+            with self._lock:
+                cached = list(self._cache)
+            for name in cached:
+                self._reload(name)
             return self.get_full_config()
 
+    def subscribe(self, key_path: str, callback: ConfigCallback) -> Callable[[], None]:
+        """Call callback(key_path, old, new) when anything at or below key_path changes.
+
+        Returns a function that removes the subscription.
+        """
+        with self._lock:
+            self._subscribers.setdefault(key_path, []).append(callback)
+
+        def unsubscribe():
+            self.unsubscribe(key_path, callback)
+        return unsubscribe
+
+    def unsubscribe(self, key_path: str, callback: ConfigCallback):
+        with self._lock:
+            callbacks = self._subscribers.get(key_path, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(key_path, None)
+
+    def _notify(self, config_name: str, old: Dict[str, Any], new: Dict[str, Any]):
+        with self._lock:
+            subscribers = [
+                (path, list(callbacks)) for path, callbacks in self._subscribers.items()
+                if path == config_name or path.startswith(config_name + ".")
+            ]
+        for path, callbacks in subscribers:
+            keys = path.split(".")[1:]
+            old_value, new_value = lookup(old, keys, _MISSING), lookup(new, keys, _MISSING)
+            if old_value == new_value:
+                continue
+            old_value = None if old_value is _MISSING else old_value
+            new_value = None if new_value is _MISSING else new_value
+            for callback in callbacks:
+                try:
+                    callback(path, old_value, new_value)
+                except Exception:
+                    logger.exception(f"Config subscriber for {path} failed")
+
+    def check_for_changes(self) -> Dict[str, Tuple[Any, Any]]:
+        """Reload every cached file whose mtime or size changed; returns the combined diff"""
+        with self._lock:
+            stale = [
+                name for name in self._cache
+                if self._file_stat(self.config_dir / f"{name}.yaml") != self._stats.get(name)
+            ]
+        changes: Dict[str, Tuple[Any, Any]] = {}
+        for name in stale:
+            try:
+                changes.update(self._reload(name))
+            except Exception:
+                # Keep serving the last good config; a half-written file is retried next poll
+                logger.warning(f"Keeping previous {name} config after failed reload")
+        return changes
+
+    def start_watching(self, interval: float = 1.0):
+        """Poll loaded config files in a background thread"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="config-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=2.0)
+            self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            self.check_for_changes()
+
+
+_config_loader: Optional[ConfigLoader] = None
+_singleton_lock = threading.Lock()
+
+
+def get_config_loader() -> ConfigLoader:
+    """The shared ConfigLoader for ./configs, created (and .env loaded) on first use"""
+    global _config_loader
+    if _config_loader is None:
+        with _singleton_lock:
+            if _config_loader is None:
+                _config_loader = ConfigLoader()
+    return _config_loader
+
 
-config_loader = ConfigLoader()
\ No newline at end of file
+def __getattr__(name: str):
+    # Keeps `from utils.config_loader import config_loader` working without paying for it at import
+    if name == "config_loader":
+        return get_config_loader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
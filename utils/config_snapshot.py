@@ -0,0 +1,388 @@
+import math
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from utils.model_store import is_store_ref
+
+_REQUIRED = object()
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+PIPELINE_MODES = ("realtime", "debug", "benchmark")
+CROP_STRATEGIES = ("center", "none")
+FUSION_STRATEGIES = ("weighted_average", "attention", "transformer")
+RESOURCE_LIMIT_KEYS = ("max_cpu_usage", "max_gpu_usage", "max_memory_usage")
+
+
+class ConfigError(ValueError):
+    """A config value is missing, of the wrong type or out of range"""
+
+
+def _get(raw: Mapping[str, Any], path: str, key: str, default: Any = _REQUIRED) -> Any:
+    if not isinstance(raw, Mapping):
+        raise ConfigError(f"{path} must be a mapping, got {type(raw).__name__}")
+    if key in raw and raw[key] is not None:
+        return raw[key]
+    if default is _REQUIRED:
+        raise ConfigError(f"{path}.{key} is required")
+    return default
+
+
+def _section(raw: Mapping[str, Any], path: str, key: str, required: bool = True) -> Mapping[str, Any]:
+    value = _get(raw, path, key, _REQUIRED if required else _EMPTY)
+    if not isinstance(value, Mapping):
+        raise ConfigError(f"{path}.{key} must be a mapping, got {type(value).__name__}")
+    return value
+
+
+def _number(raw: Mapping[str, Any], path: str, key: str, default: Any = _REQUIRED,
+            low: Optional[float] = None, high: Optional[float] = None, integer: bool = False) -> Any:
+    value = _get(raw, path, key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or (integer and not isinstance(value, int)):
+        raise ConfigError(f"{path}.{key} must be {'an integer' if integer else 'a number'}, got {value!r}")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ConfigError(f"{path}.{key} must be in [{low}, {high}], got {value!r}")
+    return int(value) if integer else float(value)
+
+
+def _bool(raw: Mapping[str, Any], path: str, key: str, default: Any = _REQUIRED) -> bool:
+    value = _get(raw, path, key, default)
+    if not isinstance(value, bool):
+        raise ConfigError(f"{path}.{key} must be true or false, got {value!r}")
+    return value
+
+
+def _choice(raw: Mapping[str, Any], path: str, key: str, choices: Tuple[str, ...], default: Any = _REQUIRED) -> str:
+    value = _get(raw, path, key, default)
+    if value not in choices:
+        raise ConfigError(f"{path}.{key} must be one of {choices}, got {value!r}")
+    return value
+
+
+def _size(raw: Mapping[str, Any], path: str, key: str, default: Any = _REQUIRED) -> Tuple[int, int]:
+    value = _get(raw, path, key, default)
+    if (not isinstance(value, (list, tuple)) or len(value) != 2
+            or not all(isinstance(v, int) and not isinstance(v, bool) and v > 0 for v in value)):
+        raise ConfigError(f"{path}.{key} must be [width, height] of positive integers, got {value!r}")
+    return (value[0], value[1])
+
+
+def _labels(raw: Mapping[str, Any], path: str, key: str, default: Any = _REQUIRED) -> Tuple[str, ...]:
+    value = _get(raw, path, key, default)
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ConfigError(f"{path}.{key} must be a list of strings, got {value!r}")
+    if len(set(value)) != len(value):
+        raise ConfigError(f"{path}.{key} has duplicate labels: {value!r}")
+    return tuple(value)
+
+
+def _model_path(raw: Mapping[str, Any], path: str, key: str) -> str:
+    value = _get(raw, path, key)
+    if not isinstance(value, str) or not value:
+        raise ConfigError(f"{path}.{key} must be a path, got {value!r}")
+    if "${" in value:
+        raise ConfigError(f"{path}.{key} has an unset environment variable: {value}")
+    if is_store_ref(value):
+        return value  # Resolved against the model store when the session is created
+    return os.path.abspath(os.path.expanduser(value))
+
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of a YAML value: mappings become MappingProxyType, lists tuples"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _label_index(labels: Tuple[str, ...]) -> Mapping[str, int]:
+    return MappingProxyType({label: i for i, label in enumerate(labels)})
+
+
+@dataclass(frozen=True, slots=True)
+class DetectorConfig:
+    """FaceDetector settings (emotion.yaml model.* and detection.*)"""
+    model_path: str
+    min_confidence: float
+    max_faces: int
+    input_size: Tuple[int, int]
+    landmark_points: int
+    nms_threshold: float = 0.4
+    pre_nms_top_k: int = 200
+    runtime: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "detector") -> "DetectorConfig":
+        """Build from the flat component dict FaceDetector used to take"""
+        return cls(
+            model_path=_model_path(raw, path, "model_path"),
+            min_confidence=_number(raw, path, "min_confidence", low=0.0, high=1.0),
+            max_faces=_number(raw, path, "max_faces", low=1, integer=True),
+            input_size=_size(raw, path, "input_size"),
+            landmark_points=_number(raw, path, "landmark_points", low=0, integer=True),
+            nms_threshold=_number(raw, path, "nms_threshold", 0.4, low=0.0, high=1.0),
+            pre_nms_top_k=_number(raw, path, "pre_nms_top_k", 200, low=1, integer=True),
+            runtime=freeze(_section(raw, path, "runtime", required=False)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RecognizerConfig:
+    """EmotionRecognizer settings; label_index maps each label to its logit column"""
+    model_path: str
+    labels: Tuple[str, ...]
+    input_size: Tuple[int, int]
+    threshold: float
+    runtime: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)
+    label_index: Mapping[str, int] = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "label_index", _label_index(self.labels))
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "recognizer") -> "RecognizerConfig":
+        """Build from the flat component dict EmotionRecognizer used to take"""
+        labels = _labels(raw, path, "labels")
+        if not labels:
+            raise ConfigError(f"{path}.labels must not be empty")
+        return cls(
+            model_path=_model_path(raw, path, "model_path"),
+            labels=labels,
+            input_size=_size(raw, path, "input_size"),
+            threshold=_number(raw, path, "threshold", low=0.0, high=1.0),
+            runtime=freeze(_section(raw, path, "runtime", required=False)),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TrackingConfig:
+    """EmotionTracker settings (emotion.yaml tracking.*) plus the known labels"""
+    decay_rate: float
+    buffer_size: int
+    transition_threshold: float
+    engagement_threshold: float
+    labels: Tuple[str, ...] = ()
+    label_index: Mapping[str, int] = field(init=False, compare=False)
+    log_decay: float = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "label_index", _label_index(self.labels))
+        object.__setattr__(self, "log_decay", math.log(self.decay_rate))
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "tracking",
+                  labels: Tuple[str, ...] = ()) -> "TrackingConfig":
+        return cls(
+            decay_rate=_number(raw, path, "decay_rate", low=1e-9, high=1.0),
+            buffer_size=_number(raw, path, "buffer_size", low=1, integer=True),
+            transition_threshold=_number(raw, path, "transition_threshold", low=0.0),
+            engagement_threshold=_number(raw, path, "engagement_threshold", low=0.0, high=1.0),
+            labels=_labels(raw, path, "labels", labels),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FaceTrackingConfig:
+    """FaceTracker settings (emotion.yaml face_tracking.*)"""
+    detection_interval: int = 5
+    iou_threshold: float = 0.3
+    max_missed: int = 2
+    confidence_decay: float = 0.9
+    min_track_confidence: float = 0.4
+    velocity_smoothing: float = 0.5
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "face_tracking") -> "FaceTrackingConfig":
+        return cls(
+            detection_interval=_number(raw, path, "detection_interval", 5, low=1, integer=True),
+            iou_threshold=_number(raw, path, "iou_threshold", 0.3, low=0.0, high=1.0),
+            max_missed=_number(raw, path, "max_missed", 2, low=0, integer=True),
+            confidence_decay=_number(raw, path, "confidence_decay", 0.9, low=0.0, high=1.0),
+            min_track_confidence=_number(raw, path, "min_track_confidence", 0.4, low=0.0, high=1.0),
+            velocity_smoothing=_number(raw, path, "velocity_smoothing", 0.5, low=0.0, high=1.0),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EmotionConfig:
+    """Snapshot of emotion.yaml, split into per-component settings"""
+    detector: DetectorConfig
+    recognizer: RecognizerConfig
+    face_tracking: FaceTrackingConfig
+    tracking: TrackingConfig
+    runtime: Mapping[str, Any] = field(default_factory=lambda: _EMPTY)
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return self.recognizer.labels
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "EmotionConfig":
+        model = _section(raw, "emotion", "model")
+        detection = _section(raw, "emotion", "detection")
+        runtime = freeze(_section(raw, "emotion", "runtime", required=False))
+        labels = _labels(model, "emotion.model", "output_classes")
+        if not labels:
+            raise ConfigError("emotion.model.output_classes must not be empty")
+
+        return cls(
+            detector=DetectorConfig(
+                model_path=_model_path(model, "emotion.model", "detection_path"),
+                min_confidence=_number(detection, "emotion.detection", "min_confidence", low=0.0, high=1.0),
+                max_faces=_number(detection, "emotion.detection", "max_faces", low=1, integer=True),
+                input_size=_size(model, "emotion.model", "input_size"),
+                landmark_points=_number(detection, "emotion.detection", "landmark_points", low=0, integer=True),
+                nms_threshold=_number(detection, "emotion.detection", "nms_threshold", 0.4, low=0.0, high=1.0),
+                pre_nms_top_k=_number(detection, "emotion.detection", "pre_nms_top_k", 200, low=1, integer=True),
+                runtime=runtime,
+            ),
+            recognizer=RecognizerConfig(
+                model_path=_model_path(model, "emotion.model", "recognition_path"),
+                labels=labels,
+                input_size=_size(model, "emotion.model", "recog_input_size"),
+                threshold=_number(model, "emotion.model", "threshold", low=0.0, high=1.0),
+                runtime=runtime,
+            ),
+            face_tracking=FaceTrackingConfig.from_dict(
+                _section(raw, "emotion", "face_tracking", required=False), "emotion.face_tracking"
+            ),
+            tracking=TrackingConfig.from_dict(_section(raw, "emotion", "tracking"), "emotion.tracking", labels),
+            runtime=runtime,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class StageConfig:
+    workers: int = 1
+    queue_size: int = 4
+
+
+@dataclass(frozen=True, slots=True)
+class FusionConfig:
+    """Modality fusion; weights is aligned with modalities and sums to 1"""
+    strategy: str = "weighted_average"
+    modalities: Tuple[str, ...] = ()
+    weights: Tuple[float, ...] = ()
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "pipeline.fusion") -> "FusionConfig":
+        strategy = _choice(raw, path, "strategy", FUSION_STRATEGIES, "weighted_average")
+        weights = _section(raw, path, "weights", required=False)
+        modalities = tuple(weights)
+        vector = np.array([_number(weights, f"{path}.weights", m, low=0.0) for m in modalities])
+        if len(vector) and vector.sum() <= 0:
+            raise ConfigError(f"{path}.weights must not all be zero")
+        if len(vector):
+            vector /= vector.sum()
+        return cls(strategy, modalities, tuple(vector.tolist()))
+
+
+@dataclass(frozen=True, slots=True)
+class PerformanceConfig:
+    target_latency_ms: float = 100.0
+    dynamic_quality: bool = False
+    quality_levels: Tuple[Mapping[str, Any], ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class WarmupConfig:
+    """Blank inferences run at every input size the pipeline can use before it reports ready"""
+    enabled: bool = False
+    runs: int = 1
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "pipeline.warmup") -> "WarmupConfig":
+        return cls(
+            enabled=_bool(raw, path, "enabled", True) if raw else False,
+            runs=_number(raw, path, "runs", 1, low=1, integer=True),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ResourceConfig:
+    """resource_management: limits keyed like the YAML (max_cpu_usage, ...)"""
+    limits: Mapping[str, float] = field(default_factory=lambda: _EMPTY)
+    throttle_after_samples: int = 3
+    release_after_samples: int = 10
+    release_margin: float = 10.0
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any], path: str = "resource_management") -> "ResourceConfig":
+        return cls(
+            limits=MappingProxyType({
+                key: _number(raw, path, key, low=0.0, high=100.0) for key in RESOURCE_LIMIT_KEYS if key in raw
+            }),
+            throttle_after_samples=_number(raw, path, "throttle_after_samples", 3, low=1, integer=True),
+            release_after_samples=_number(raw, path, "release_after_samples", 10, low=1, integer=True),
+            release_margin=_number(raw, path, "release_margin", 10.0, low=0.0),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineConfig:
+    """Snapshot of pipeline.yaml. resize is None when frame processing is off"""
+    mode: str = "realtime"
+    max_fps: float = 30.0
+    resize: Optional[Tuple[int, int]] = None
+    crop_strategy: str = "none"
+    stages: Mapping[str, StageConfig] = field(default_factory=lambda: _EMPTY)
+    result_queue_size: int = 64
+    performance: PerformanceConfig = PerformanceConfig()
+    warmup: WarmupConfig = WarmupConfig()
+    fusion: FusionConfig = FusionConfig()
+    resources: ResourceConfig = ResourceConfig()
+    frame_interval: float = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "frame_interval", 1.0 / self.max_fps)
+
+    @classmethod
+    def from_dict(cls, raw: Mapping[str, Any]) -> "PipelineConfig":
+        settings = _section(raw, "pipeline", "pipeline")
+        path = "pipeline.pipeline"
+        frame_processing = _section(settings, path, "frame_processing", required=False)
+        resize = None
+        if _bool(frame_processing, f"{path}.frame_processing", "enabled", True) and frame_processing.get("resize"):
+            resize = _size(frame_processing, f"{path}.frame_processing", "resize")
+
+        stages = {}
+        for name, stage in _section(settings, path, "stages", required=False).items():
+            stage_path = f"{path}.stages.{name}"
+            stages[name] = StageConfig(
+                workers=_number(stage, stage_path, "workers", 1, low=1, integer=True),
+                queue_size=_number(stage, stage_path, "queue_size", 4, low=1, integer=True),
+            )
+
+        performance = _section(settings, path, "performance", required=False)
+        levels = _get(performance, f"{path}.performance", "quality_levels", ())
+        if not isinstance(levels, (list, tuple)) or not all(isinstance(level, Mapping) for level in levels):
+            raise ConfigError(f"{path}.performance.quality_levels must be a list of mappings")
+
+        return cls(
+            mode=_choice(settings, path, "mode", PIPELINE_MODES, "realtime"),
+            max_fps=_number(settings, path, "max_fps", 30, low=1e-3),
+            resize=resize,
+            crop_strategy=_choice(frame_processing, f"{path}.frame_processing", "crop_strategy",
+                                  CROP_STRATEGIES, "none"),
+            stages=MappingProxyType(stages),
+            result_queue_size=_number(settings, path, "result_queue_size", 64, low=1, integer=True),
+            performance=PerformanceConfig(
+                target_latency_ms=_number(performance, f"{path}.performance", "target_latency_ms", 100, low=1e-3),
+                dynamic_quality=_bool(performance, f"{path}.performance", "dynamic_quality", False),
+                quality_levels=freeze(levels),
+            ),
+            warmup=WarmupConfig.from_dict(_section(settings, path, "warmup", required=False), f"{path}.warmup"),
+            fusion=FusionConfig.from_dict(_section(settings, path, "fusion", required=False), f"{path}.fusion"),
+            resources=ResourceConfig.from_dict(_section(raw, "pipeline", "resource_management", required=False)),
+        )
+
+
+# Config name -> snapshot type built by ConfigLoader.get_snapshot
+SNAPSHOT_TYPES: Dict[str, Any] = {
+    "emotion": EmotionConfig,
+    "pipeline": PipelineConfig,
+}
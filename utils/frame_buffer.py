@@ -0,0 +1,198 @@
+import multiprocessing
+import time
+import logging
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.process_pool import attach_shared_memory
+
+logger = logging.getLogger(__name__)
+
+_SEQ, _REFS = 0, 1          # Columns of the per-slot metadata table
+_EMPTY = -1                 # Sequence number of a slot with no published frame
+_ALIGN = 64
+
+
+class FrameRef:
+    """Zero-copy view of a frame held in a SharedFrameRing slot.
+
+    The slot cannot be overwritten until release() is called (or the
+    context manager exits). The array must not be used after that.
+    """
+
+    def __init__(self, ring: "SharedFrameRing", slot: int, seq: int, timestamp: float):
+        self._ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.array = ring._frames[slot]
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.array = None
+            self._ring._release(self.slot)
+
+    def __enter__(self) -> "FrameRef":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SharedFrameRing:
+    """Fixed-slot frame ring buffer in shared memory for multi-process pipelines.
+
+    A producer write()s frames into slots in ring order and gets a sequence
+    number back. Consumers read_latest() or read_next(after_seq) and get a
+    FrameRef whose array is a view straight into shared memory. Each read
+    adds a reference to the slot; the producer skips slots that are still
+    referenced and otherwise overwrites the oldest frame, so slow consumers
+    lose frames instead of stalling capture.
+
+    The ring pickles as a handle, so it can be passed to processes started
+    with multiprocessing and attached there without copying frames.
+    """
+
+    def __init__(self, num_slots: int, frame_shape: Tuple[int, ...], dtype=np.uint8,
+                 name: Optional[str] = None, condition=None):
+        self.num_slots = num_slots
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self._owner = name is None
+
+        meta_bytes = num_slots * 2 * 8
+        times_offset = meta_bytes
+        counter_offset = times_offset + num_slots * 8
+        frames_offset = -(-(counter_offset + 16) // _ALIGN) * _ALIGN
+        frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        slot_bytes = -(-frame_bytes // _ALIGN) * _ALIGN
+
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=frames_offset + num_slots * slot_bytes)
+            self._condition = multiprocessing.get_context("spawn").Condition()
+        else:
+            self.shm = attach_shared_memory(name)
+            self._condition = condition
+
+        buf = self.shm.buf
+        self._meta = np.ndarray((num_slots, 2), dtype=np.int64, buffer=buf)
+        self._times = np.ndarray((num_slots,), dtype=np.float64, buffer=buf, offset=times_offset)
+        self._counter = np.ndarray((2,), dtype=np.int64, buffer=buf, offset=counter_offset)  # next seq, next slot
+        self._frames = np.ndarray(
+            (num_slots,) + self.frame_shape, dtype=self.dtype, buffer=buf, offset=frames_offset,
+            strides=(slot_bytes,) + tuple(np.empty(self.frame_shape, dtype=self.dtype).strides)
+        )
+
+        if self._owner:
+            self._meta[:, _SEQ] = _EMPTY
+            self._meta[:, _REFS] = 0
+            self._counter[:] = 0
+
+    @classmethod
+    def create(cls, num_slots: int, frame_shape: Tuple[int, ...], dtype=np.uint8) -> "SharedFrameRing":
+        return cls(num_slots, frame_shape, dtype)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __getstate__(self):
+        return (self.num_slots, self.frame_shape, self.dtype.str, self.shm.name, self._condition)
+
+    def __setstate__(self, state):
+        num_slots, frame_shape, dtype, name, condition = state
+        self.__init__(num_slots, frame_shape, dtype, name=name, condition=condition)
+
+    def _claim_slot(self) -> Optional[int]:
+        """Pick the next unreferenced slot in ring order (caller holds the lock)"""
+        start = int(self._counter[1])
+        for step in range(self.num_slots):
+            slot = (start + step) % self.num_slots
+            if self._meta[slot, _REFS] == 0:
+                self._counter[1] = (slot + 1) % self.num_slots
+                return slot
+        return None
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """Copy a frame into the ring and return its sequence number, or -1 if every slot is held"""
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.frame_shape}")
+
+        with self._condition:
+            slot = self._claim_slot()
+            if slot is None:
+                logger.warning("All frame slots are held by consumers; dropping frame")
+                return -1
+            self._meta[slot, _SEQ] = _EMPTY
+            # Hold a reference while copying so no reader or writer touches the slot
+            self._meta[slot, _REFS] = 1
+
+        np.copyto(self._frames[slot], frame, casting="unsafe")
+
+        with self._condition:
+            seq = int(self._counter[0])
+            self._counter[0] = seq + 1
+            self._meta[slot, _SEQ] = seq
+            self._meta[slot, _REFS] = 0
+            self._times[slot] = time.time() if timestamp is None else timestamp
+            self._condition.notify_all()
+        return seq
+
+    def _acquire(self, slot: int) -> FrameRef:
+        """Reference a published slot (caller holds the lock)"""
+        self._meta[slot, _REFS] += 1
+        return FrameRef(self, slot, int(self._meta[slot, _SEQ]), float(self._times[slot]))
+
+    def _release(self, slot: int):
+        with self._condition:
+            self._meta[slot, _REFS] -= 1
+
+    def _find(self, after_seq: int, latest: bool) -> Optional[int]:
+        seqs = self._meta[:, _SEQ]
+        candidates = np.flatnonzero(seqs > after_seq)
+        if not candidates.size:
+            return None
+        pick = np.argmax if latest else np.argmin
+        return int(candidates[pick(seqs[candidates])])
+
+    def _read(self, after_seq: int, latest: bool, timeout: Optional[float]) -> Optional[FrameRef]:
+        with self._condition:
+            slot = self._find(after_seq, latest)
+            if slot is None and timeout:
+                self._condition.wait_for(lambda: self._find(after_seq, latest) is not None, timeout=timeout)
+                slot = self._find(after_seq, latest)
+            if slot is None:
+                return None
+            return self._acquire(slot)
+
+    def read_latest(self, after_seq: int = -1, timeout: Optional[float] = None) -> Optional[FrameRef]:
+        """Newest frame with seq > after_seq, skipping anything older"""
+        return self._read(after_seq, True, timeout)
+
+    def read_next(self, after_seq: int = -1, timeout: Optional[float] = None) -> Optional[FrameRef]:
+        """Oldest frame still in the ring with seq > after_seq.
+
+        A gap between after_seq and the returned seq means frames were
+        overwritten before this consumer got to them.
+        """
+        return self._read(after_seq, False, timeout)
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the most recently published frame, or -1"""
+        return int(self._counter[0]) - 1
+
+    def held_slots(self) -> int:
+        """Number of slots currently referenced by consumers or a writer"""
+        return int(np.count_nonzero(self._meta[:, _REFS]))
+
+    def close(self):
+        """Detach from shared memory; unlink it too if this process created it"""
+        self._meta = self._times = self._counter = self._frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
@@ -0,0 +1,40 @@
+import importlib
+import sys
+import threading
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access.
+
+    Every attribute read is forwarded to the real module rather than
+    copied, so later changes to it (including mock.patch) stay visible.
+    The forwarding costs a Python-level call, well below the price of the
+    cv2 or onnxruntime calls it fronts.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+        self._lazy_module = None
+
+    def __getattr__(self, attr: str):
+        module = self._lazy_module
+        if module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    self._lazy_module = importlib.import_module(self.__name__)
+                module = self._lazy_module
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return module `name`, deferring the actual import until it is first used.
+
+    Meant for heavy dependencies (cv2, onnxruntime, GPUtil) that only some
+    code paths touch. A module that is already imported is returned as is.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
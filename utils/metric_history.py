@@ -0,0 +1,190 @@
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Downsampling tiers after the raw samples: (resolution seconds, retention seconds)
+DEFAULT_TIERS = ((10.0, 3600.0), (60.0, 86400.0))
+DEFAULT_WINDOWS = (10.0, 60.0, 300.0)
+
+
+class RingBuffer:
+    """Fixed-capacity ring of float rows whose newest rows are always contiguous.
+
+    Every row is written twice, at slot and slot + size, so the latest n
+    rows are a single slice of the backing array and can be returned as a
+    view. Column 0 holds the timestamp. One spare slot keeps the slot about
+    to be written out of any view, so a reader's view stays intact until
+    the writer has wrapped round to it.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self._size = capacity + 1
+        self._rows = np.zeros((2 * self._size, width), dtype=np.float64)
+        self._written = 0
+
+    def append(self, row: Sequence[float]):
+        slot = self._written % self._size
+        self._rows[slot] = row
+        self._rows[slot + self._size] = row
+        self._written += 1  # Publish only after both copies are in place
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    def latest(self, n: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the newest n rows, oldest first"""
+        written = self._written
+        available = min(written, self.capacity)
+        n = available if n is None else max(0, min(n, available))
+        end = written % self._size + self._size
+        view = self._rows[end - n:end]
+        view.flags.writeable = False
+        return view
+
+
+class RollingWindow:
+    """Mean, max and p95 over the last `size` samples of one field.
+
+    The running sum and a sorted copy of the window are updated on every
+    push, so reading the aggregates never scans the samples.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: Deque[float] = deque()
+        self._sorted: List[float] = []
+        self._sum = 0.0
+
+    def push(self, value: float):
+        self._values.append(value)
+        insort(self._sorted, value)
+        self._sum += value
+        if len(self._values) > self.size:
+            old = self._values.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+            self._sum -= old
+
+    def stats(self) -> Dict[str, float]:
+        count = len(self._sorted)
+        if not count:
+            return {"mean": 0.0, "max": 0.0, "p95": 0.0, "count": 0}
+        return {
+            "mean": self._sum / count,
+            "max": self._sorted[-1],
+            "p95": self._sorted[min(count - 1, int(0.95 * count))],
+            "count": count,
+        }
+
+
+class _Tier:
+    """Downsampled history: one (timestamp, means..., maxes...) row per `factor` input rows"""
+
+    def __init__(self, resolution: float, retention: float, factor: int, fields: int):
+        self.resolution = resolution
+        self.factor = factor
+        self.buffer = RingBuffer(max(1, int(retention / resolution)), 1 + 2 * fields)
+        self._sum = np.zeros(fields)
+        self._max = np.full(fields, -np.inf)
+        self._count = 0
+
+    def add(self, timestamp: float, means: np.ndarray, maxes: np.ndarray) -> Optional[Tuple[float, np.ndarray, np.ndarray]]:
+        """Accumulate one input row; return the finished output row every `factor` rows"""
+        self._sum += means
+        np.maximum(self._max, maxes, out=self._max)
+        self._count += 1
+        if self._count < self.factor:
+            return None
+
+        mean, peak = self._sum / self._count, self._max.copy()
+        self.buffer.append(np.concatenate(([timestamp], mean, peak)))
+        self._sum[:] = 0.0
+        self._max[:] = -np.inf
+        self._count = 0
+        return timestamp, mean, peak
+
+
+class MetricHistory:
+    """Sample history of one metric with rolling aggregates and tiered downsampling.
+
+    Raw samples are kept for the longest rolling window. Every
+    tiers[0] seconds of raw samples are folded into one mean/max row of the
+    first tier, each tier feeding the next (1s -> 10s -> 1min by default).
+    A metric can have several fields (e.g. process cpu and memory); each
+    field gets its own rolling windows.
+
+    One thread adds samples; any thread may read. Reads return views, not
+    copies, and need no lock except for the rolling aggregates.
+    """
+
+    def __init__(self, name: str, interval: float, fields: Sequence[str] = ("value",),
+                 windows: Sequence[float] = DEFAULT_WINDOWS, tiers: Sequence[Tuple[float, float]] = DEFAULT_TIERS):
+        self.name = name
+        self.interval = interval
+        self.fields = tuple(fields)
+        self.raw = RingBuffer(max(1, int(round(max(windows) / interval))), 1 + len(self.fields))
+        self._windows = {
+            seconds: [RollingWindow(max(1, int(round(seconds / interval)))) for _ in self.fields]
+            for seconds in windows
+        }
+        self._lock = threading.Lock()
+
+        self.tiers: List[_Tier] = []
+        previous = interval
+        for resolution, retention in tiers:
+            factor = max(1, int(round(resolution / previous)))
+            self.tiers.append(_Tier(resolution, retention, factor, len(self.fields)))
+            previous = resolution
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def add(self, timestamp: float, values: Sequence[float]):
+        values = np.asarray(values, dtype=np.float64).reshape(len(self.fields))
+        self.raw.append(np.concatenate(([timestamp], values)))
+
+        with self._lock:
+            for windows in self._windows.values():
+                for window, value in zip(windows, values.tolist()):
+                    window.push(value)
+
+        row: Optional[Tuple[float, np.ndarray, np.ndarray]] = (timestamp, values, values)
+        for tier in self.tiers:
+            row = tier.add(*row)
+            if row is None:
+                break
+
+    def current(self) -> Optional[np.ndarray]:
+        """View of the newest sample's fields, or None before the first sample"""
+        latest = self.raw.latest(1)
+        return latest[0, 1:] if len(latest) else None
+
+    def recent(self, seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Views of (timestamps, values) for samples from the last `seconds` seconds"""
+        rows = self.raw.latest()
+        if not len(rows):
+            return rows[:, 0], rows[:, 1:]
+        start = np.searchsorted(rows[:, 0], rows[-1, 0] - seconds, side="right")
+        return rows[start:, 0], rows[start:, 1:]
+
+    def history(self, resolution: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Views of (timestamps, means, maxes) at a tier resolution (None for raw samples)"""
+        if resolution is None:
+            rows = self.raw.latest()
+            return rows[:, 0], rows[:, 1:], rows[:, 1:]
+        for tier in self.tiers:
+            if tier.resolution == resolution:
+                rows = tier.buffer.latest()
+                n = len(self.fields)
+                return rows[:, 0], rows[:, 1:1 + n], rows[:, 1 + n:]
+        raise ValueError(f"No {resolution}s tier for {self.name}; have {[t.resolution for t in self.tiers]}")
+
+    def stats(self, window: float) -> Dict[str, Dict[str, float]]:
+        """Rolling mean/max/p95 per field over one of the configured windows"""
+        if window not in self._windows:
+            raise ValueError(f"No {window}s window for {self.name}; have {sorted(self._windows)}")
+        with self._lock:
+            return {field: w.stats() for field, w in zip(self.fields, self._windows[window])}
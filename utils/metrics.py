@@ -0,0 +1,301 @@
+import functools
+import json
+import threading
+import time
+import logging
+from bisect import bisect_left
+from collections import deque
+from threading import get_ident
+from time import perf_counter
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def log_buckets(low: float = 1e-5, high: float = 10.0, per_decade: int = 5) -> List[float]:
+    """Upper bounds of log-spaced latency buckets in seconds, from low to high"""
+    bounds = []
+    value, step = low, 10 ** (1.0 / per_decade)
+    while value < high * (1 + 1e-9):
+        bounds.append(float(f"{value:.6g}"))
+        value *= step
+    return bounds
+
+
+DEFAULT_BUCKETS = log_buckets()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with lifetime totals and sliding windows.
+
+    Each thread increments its own row of bucket counts, so observe() takes
+    no lock: a bisect and two list updates, a few hundred nanoseconds.
+    Rows are summed when read. Every `checkpoint_interval` seconds an
+    observation also records the cumulative counts, and a windowed
+    snapshot is the difference between now and the checkpoint closest to
+    the start of the window.
+    """
+    __slots__ = ("name", "bounds", "checkpoint_interval", "_size", "_rows", "_lock",
+                 "_baseline", "_checkpoints", "_next_checkpoint")
+
+    def __init__(self, name: str, bounds: Sequence[float] = DEFAULT_BUCKETS,
+                 window: float = 60.0, checkpoint_interval: float = 5.0):
+        self.name = name
+        self.bounds = list(bounds)
+        self.checkpoint_interval = checkpoint_interval
+        self._size = len(self.bounds) + 2  # Buckets, +Inf bucket, then the sum
+        self._rows: Dict[int, List[float]] = {}
+        self._lock = threading.Lock()
+        self._baseline = [0] * self._size
+        self._checkpoints: Deque[Tuple[float, List[float]]] = deque(
+            maxlen=int(window / checkpoint_interval) + 2
+        )
+        self._next_checkpoint = 0.0
+
+    def _new_row(self) -> List[float]:
+        row = [0] * self._size
+        row[-1] = 0.0
+        with self._lock:
+            self._rows[get_ident()] = row
+        return row
+
+    def observe(self, value: float, now: Optional[float] = None):
+        """Record one duration in seconds; `now` is a perf_counter() reading if the caller has one"""
+        row = self._rows.get(get_ident())
+        if row is None:
+            row = self._new_row()
+        row[bisect_left(self.bounds, value)] += 1
+        row[-1] += value
+        if now is not None and now >= self._next_checkpoint:
+            self._checkpoint(now)
+
+    def observe_since(self, start: float) -> float:
+        """Record the time elapsed since a perf_counter() reading and return the current reading"""
+        now = perf_counter()
+        self.observe(now - start, now)
+        return now
+
+    def time(self) -> "_Measurement":
+        return _Measurement(self)
+
+    def _cumulative(self) -> List[float]:
+        with self._lock:
+            rows = list(self._rows.values())
+        total = [0] * self._size
+        total[-1] = 0.0
+        for row in rows:
+            total = [a + b for a, b in zip(total, row)]
+        return total
+
+    def _checkpoint(self, now: float):
+        with self._lock:
+            if now < self._next_checkpoint:
+                return
+            self._next_checkpoint = now + self.checkpoint_interval
+        self._checkpoints.append((now, self._cumulative()))
+
+    def reset(self):
+        """Zero the histogram; rows are left alone so concurrent observers never race"""
+        current = self._cumulative()
+        with self._lock:
+            self._baseline = current
+            self._checkpoints.clear()
+            self._next_checkpoint = 0.0
+
+    def snapshot(self, window: Optional[float] = None) -> Dict[str, Any]:
+        """Counts and percentiles over roughly the last `window` seconds (None for all since reset)"""
+        current = self._cumulative()
+        since = self._baseline
+        if window is not None:
+            cutoff = time.perf_counter() - window
+            for stamp, counts in reversed(list(self._checkpoints)):
+                since = counts
+                if stamp <= cutoff:
+                    break
+        diff = [a - b for a, b in zip(current, since)]
+        counts, total = [int(c) for c in diff[:-1]], diff[-1]
+
+        count = sum(counts)
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "p50": self._quantile(counts, count, 0.50),
+            "p95": self._quantile(counts, count, 0.95),
+            "p99": self._quantile(counts, count, 0.99),
+            "buckets": counts,
+        }
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        """Estimate a quantile by geometric interpolation inside its bucket"""
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                if i >= len(self.bounds):
+                    return self.bounds[-1]
+                upper = self.bounds[i]
+                lower = self.bounds[i - 1] if i > 0 else upper / (self.bounds[1] / self.bounds[0])
+                return lower * (upper / lower) ** ((rank - seen) / c)
+            seen += c
+        return self.bounds[-1]
+
+
+class Counter:
+    """Monotonic counter; like Histogram, each thread adds to its own cell"""
+    __slots__ = ("name", "_cells", "_baseline", "_lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cells: Dict[int, List[int]] = {}
+        self._baseline = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        cell = self._cells.get(get_ident())
+        if cell is None:
+            cell = [0]
+            with self._lock:
+                self._cells[get_ident()] = cell
+        cell[0] += amount
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            cells = list(self._cells.values())
+        return sum(cell[0] for cell in cells) - self._baseline
+
+    def reset(self):
+        self._baseline += self.value
+
+
+class _Measurement:
+    """Context manager recording the duration of its block into a histogram"""
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Measurement":
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe_since(self._start)
+
+
+class MetricsRegistry:
+    """Named stage histograms and counters with snapshot, reset and export.
+
+    Usage:
+        with metrics.time("detector.inference"):
+            outputs = session.run(...)
+
+        @metrics.timed("tracker.update")
+        def update(...): ...
+
+        metrics.counter("recognizer.faces").inc(len(faces))
+        print(metrics.to_prometheus())
+
+    Hot paths should look up their Histogram once and call
+    observe_since(start) with a perf_counter() reading, which skips the
+    name lookup and the context manager object.
+    """
+
+    def __init__(self, namespace: str = "emotion", window: float = 60.0):
+        self.namespace = namespace
+        self.window = window
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.get(stage)
+                if histogram is None:
+                    histogram = self._histograms[stage] = Histogram(stage, window=self.window)
+        return histogram
+
+    def counter(self, name: str) -> Counter:
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.get(name)
+                if counter is None:
+                    counter = self._counters[name] = Counter(name)
+        return counter
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).observe(seconds)
+
+    def time(self, stage: str) -> _Measurement:
+        """Context manager timing a block as one observation of `stage`"""
+        return _Measurement(self.histogram(stage))
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of the wrapped function"""
+        def decorator(fn: Callable) -> Callable:
+            histogram = self.histogram(stage)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.observe_since(start)
+            return wrapper
+        return decorator
+
+    def snapshot(self, window: Optional[float] = None, reset: bool = False) -> Dict[str, Any]:
+        """Stage statistics over `window` seconds (None for totals since the last reset)"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        snapshot = {
+            "stages": {name: h.snapshot(window) for name, h in histograms.items()},
+            "counters": {name: c.value for name, c in counters.items()},
+            "bounds": list(DEFAULT_BUCKETS),
+        }
+        if reset:
+            self.reset()
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            for histogram in self._histograms.values():
+                histogram.reset()
+            for counter in self._counters.values():
+                counter.reset()
+
+    def to_json(self, window: Optional[float] = None) -> str:
+        return json.dumps(self.snapshot(window))
+
+    def to_prometheus(self) -> str:
+        """Lifetime totals in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        latency = f"{self.namespace}_stage_latency_seconds"
+        lines = [
+            f"# HELP {latency} Stage latency in seconds",
+            f"# TYPE {latency} histogram",
+        ]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, count in zip(snapshot["bounds"] + ["+Inf"], stats["buckets"]):
+                cumulative += count
+                lines.append(f'{latency}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{latency}_sum{{stage="{stage}"}} {stats["sum"]}')
+            lines.append(f'{latency}_count{{stage="{stage}"}} {stats["count"]}')
+
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{self.namespace}_{name.replace('.', '_')}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
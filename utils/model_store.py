@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from utils.lazy_import import lazy_import
+
+ort = lazy_import("onnxruntime")
+
+logger = logging.getLogger(__name__)
+
+STORE_SCHEME = "store:"
+MANIFEST_NAME = "store.json"
+CHUNK_SIZE = 1 << 20
+
+_SHA256 = re.compile(r"^(?:sha256:)?([0-9a-f]{64})$")
+
+
+class ModelStoreError(Exception):
+    """A model is not in the store, or its stored file no longer matches its hash"""
+
+
+@dataclass(frozen=True, slots=True)
+class InputSpec:
+    """One model input; dynamic dimensions are their symbolic name or None"""
+    name: str
+    shape: Tuple[Union[int, str, None], ...]
+    dtype: str
+
+
+@dataclass(frozen=True, slots=True)
+class ModelRecord:
+    """Manifest entry: what a stored model expects and the hash that identifies it"""
+    name: str
+    sha256: str
+    size: int
+    inputs: Tuple[InputSpec, ...]
+    preprocessing: Mapping[str, Any]
+    source: str = ""
+    added: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sha256": self.sha256,
+            "size": self.size,
+            "inputs": [{"name": i.name, "shape": list(i.shape), "dtype": i.dtype} for i in self.inputs],
+            "preprocessing": json.loads(json.dumps(dict(self.preprocessing))),
+            "source": self.source,
+            "added": self.added,
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, raw: Mapping[str, Any]) -> "ModelRecord":
+        return cls(
+            name=name,
+            sha256=raw["sha256"],
+            size=int(raw["size"]),
+            inputs=tuple(InputSpec(i["name"], tuple(i["shape"]), i["dtype"]) for i in raw.get("inputs", ())),
+            preprocessing=MappingProxyType(dict(raw.get("preprocessing") or {})),
+            source=raw.get("source", ""),
+            added=float(raw.get("added", 0.0)),
+        )
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def read_inputs(model_path: Union[str, Path]) -> Tuple[InputSpec, ...]:
+    """Input names, shapes and element types declared by an ONNX model"""
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+    session = ort.InferenceSession(str(model_path), sess_options=sess_options,
+                                   providers=["CPUExecutionProvider"])
+    return tuple(InputSpec(i.name, tuple(i.shape), i.type) for i in session.get_inputs())
+
+
+class ModelStore:
+    """Content-addressed store of ONNX models with a manifest.
+
+    Files live at objects/<first two hex digits>/<sha256>.onnx under root,
+    so a model is identified by what it contains rather than where it was
+    downloaded to, and identical files are stored once. store.json maps a
+    name to its hash, size, input shapes and the preprocessing constants
+    the model was trained with. A model is referenced by name or by hash
+    ("sha256:<hex>" or the bare hex digest); see resolve_model_path for
+    the "store:" form used in configs.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._records: Dict[str, ModelRecord] = {}
+        if self.manifest_path.exists():
+            try:
+                raw = json.loads(self.manifest_path.read_text()).get("models", {})
+                self._records = {name: ModelRecord.from_dict(name, entry) for name, entry in raw.items()}
+            except (ValueError, KeyError, OSError) as e:
+                raise ModelStoreError(f"Unreadable model store manifest {self.manifest_path}: {e}") from e
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}.onnx"
+
+    def add(self, model_path: Union[str, Path], name: str,
+            preprocessing: Optional[Mapping[str, Any]] = None) -> ModelRecord:
+        """Copy a model into the store under name, replacing any earlier model of that name"""
+        model_path = Path(model_path)
+        try:
+            inputs = read_inputs(model_path)
+        except Exception as e:
+            raise ModelStoreError(f"{model_path} is not a loadable ONNX model: {e}") from e
+        sha256 = file_sha256(model_path)
+        target = self.object_path(sha256)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+            shutil.copyfile(model_path, tmp)
+            os.replace(tmp, target)
+
+        record = ModelRecord(
+            name=name,
+            sha256=sha256,
+            size=target.stat().st_size,
+            inputs=inputs,
+            preprocessing=MappingProxyType(dict(preprocessing or {})),
+            source=str(model_path),
+            added=time.time(),
+        )
+        with self._lock:
+            self._records[name] = record
+            self._save()
+        logger.info(f"Stored {name} as {sha256[:12]}")
+        return record
+
+    def _save(self):
+        data = json.dumps(
+            {"models": {name: record.to_dict() for name, record in self._records.items()}},
+            indent=2, sort_keys=True
+        )
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+        tmp.write_text(data)
+        os.replace(tmp, self.manifest_path)
+
+    def record(self, ref: str) -> ModelRecord:
+        """Manifest entry for a model name or hash"""
+        with self._lock:
+            record = self._records.get(ref)
+            if record is None:
+                match = _SHA256.match(ref)
+                if match:
+                    record = next((r for r in self._records.values() if r.sha256 == match.group(1)), None)
+        if record is None:
+            raise ModelStoreError(f"No model {ref!r} in {self.root}")
+        return record
+
+    def resolve(self, ref: str) -> str:
+        """Path of the stored file for a model name or hash.
+
+        Checks the file is present with the recorded size; verify() re-hashes.
+        """
+        record = self.record(ref)
+        path = self.object_path(record.sha256)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            raise ModelStoreError(f"{record.name}: stored file {path} is missing") from None
+        if size != record.size:
+            raise ModelStoreError(f"{record.name}: stored file {path} is {size} bytes, expected {record.size}")
+        return str(path)
+
+    def verify(self, ref: Optional[str] = None) -> List[str]:
+        """Re-hash stored files; returns the names of models that are missing or corrupt"""
+        records = [self.record(ref)] if ref is not None else self.records()
+        bad = []
+        for record in records:
+            path = self.object_path(record.sha256)
+            if not path.exists() or file_sha256(path) != record.sha256:
+                logger.error(f"Stored model {record.name} ({path}) does not match {record.sha256}")
+                bad.append(record.name)
+        return bad
+
+    def records(self) -> List[ModelRecord]:
+        with self._lock:
+            return list(self._records.values())
+
+    def __contains__(self, ref: str) -> bool:
+        try:
+            self.record(ref)
+        except ModelStoreError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+def default_store_dir() -> str:
+    """MODEL_STORE_DIR, or store/ under MODELS_DIR (data/models when unset)"""
+    return os.getenv("MODEL_STORE_DIR") or os.path.join(os.getenv("MODELS_DIR", "data/models"), "store")
+
+
+_stores: Dict[str, ModelStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_model_store(root: Optional[Union[str, Path]] = None) -> ModelStore:
+    """Shared ModelStore for root (default_store_dir() when None)"""
+    root = os.path.abspath(root or default_store_dir())
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = ModelStore(root)
+        return store
+
+
+def is_store_ref(model_path: str) -> bool:
+    return model_path.startswith(STORE_SCHEME)
+
+
+def resolve_model_path(model_path: str, store: Optional[ModelStore] = None) -> str:
+    """Turn "store:<name or hash>" into the stored file's path; other paths pass through"""
+    if not is_store_ref(model_path):
+        return model_path
+    return (store or get_model_store()).resolve(model_path[len(STORE_SCHEME):])
@@ -0,0 +1,170 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import threading
+import logging
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SharedArrayRef(NamedTuple):
+    """Picklable handle to an array stored in a shared memory segment"""
+    name: str
+    offset: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment owned by another process.
+
+    The owner unlinks the segment. Before Python 3.13 attaching registers the
+    name with the resource tracker, which child processes share with their
+    parent, so the duplicate registration is harmless there.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+
+# Per-worker state, set once by _init_worker
+_worker_state: Any = None
+_worker_segments: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _init_worker(factory: Callable, factory_args: tuple, factory_kwargs: dict):
+    global _worker_state
+    _worker_state = factory(*factory_args, **factory_kwargs)
+
+
+def _resolve(value: Any) -> Any:
+    if isinstance(value, SharedArrayRef):
+        shm = _worker_segments.get(value.name)
+        if shm is None:
+            shm = attach_shared_memory(value.name)
+            _worker_segments[value.name] = shm
+        return np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf, offset=value.offset)
+    return value
+
+
+def _worker_call(fn: Union[str, Callable], args: tuple, kwargs: dict) -> Any:
+    args = tuple(_resolve(a) for a in args)
+    kwargs = {k: _resolve(v) for k, v in kwargs.items()}
+    if isinstance(fn, str):
+        return getattr(_worker_state, fn)(*args, **kwargs)
+    return fn(_worker_state, *args, **kwargs)
+
+
+class SharedFrameSlots:
+    """Fixed pool of equally sized slots in one shared memory segment"""
+
+    def __init__(self, num_slots: int, slot_bytes: int):
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=num_slots * slot_bytes)
+        self._free = list(range(num_slots - 1, -1, -1))
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._free, timeout=timeout):
+                return None
+            return self._free.pop()
+
+    def release(self, slot: int):
+        with self._condition:
+            self._free.append(slot)
+            self._condition.notify()
+
+    def write(self, slot: int, array: np.ndarray) -> SharedArrayRef:
+        offset = slot * self.slot_bytes
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, offset=offset)
+        np.copyto(view, array)
+        return SharedArrayRef(self.shm.name, offset, array.shape, array.dtype.str)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ProcessPoolProcessor:
+    """Runs inference objects in worker processes behind a submit/future API.
+
+    Each worker builds its own instance once with factory(*factory_args),
+    e.g. ProcessPoolProcessor(FaceDetector, config), so ONNX sessions are
+    loaded per process and Python post-processing escapes the GIL.
+
+    submit(fn, *args) runs getattr(instance, fn)(*args) when fn is a method
+    name, or fn(instance, *args) for a picklable function. NumPy array
+    arguments of at least shm_threshold bytes are copied once into a shared
+    memory slot instead of being pickled; the slot is freed when the task
+    completes. Frames larger than slot_bytes fall back to pickling.
+    """
+
+    def __init__(
+        self,
+        factory: Callable,
+        *factory_args,
+        max_workers: int = 2,
+        slot_bytes: int = 1920 * 1080 * 3,
+        num_slots: Optional[int] = None,
+        shm_threshold: int = 64 * 1024,
+        slot_timeout: float = 5.0,
+        mp_context: str = "spawn",
+        **factory_kwargs,
+    ):
+        self.shm_threshold = shm_threshold
+        self.slot_timeout = slot_timeout
+        self.slots = SharedFrameSlots(num_slots or 2 * max_workers, slot_bytes)
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(mp_context),
+            initializer=_init_worker,
+            initargs=(factory, factory_args, factory_kwargs),
+        )
+        self._running = True
+
+    def _share(self, value: Any, used: List[int]) -> Any:
+        if (not isinstance(value, np.ndarray) or value.nbytes < self.shm_threshold
+                or value.nbytes > self.slots.slot_bytes or value.dtype.hasobject):
+            return value
+
+        slot = self.slots.acquire(timeout=self.slot_timeout)
+        if slot is None:
+            raise RuntimeError("No free shared memory frame slots")
+        used.append(slot)
+        return self.slots.write(slot, value)
+
+    def submit(self, fn: Union[str, Callable], *args, **kwargs) -> concurrent.futures.Future:
+        """Submit a call to the worker-side instance"""
+        if not self._running:
+            raise RuntimeError("Processor is shutting down")
+
+        used: List[int] = []
+        try:
+            shared_args = tuple(self._share(a, used) for a in args)
+            shared_kwargs = {k: self._share(v, used) for k, v in kwargs.items()}
+            future = self.executor.submit(_worker_call, fn, shared_args, shared_kwargs)
+        except Exception:
+            for slot in used:
+                self.slots.release(slot)
+            raise
+
+        if used:
+            future.add_done_callback(lambda _: [self.slots.release(slot) for slot in used])
+        return future
+
+    async def submit_async(self, fn: Union[str, Callable], *args, **kwargs) -> Any:
+        """Submit and await result asynchronously"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers and free the shared memory segment"""
+        self._running = False
+        self.executor.shutdown(wait=True, cancel_futures=not wait)
+        self.slots.close()
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+from utils.lazy_import import lazy_import
+from utils.model_store import resolve_model_path
+
+ort = lazy_import("onnxruntime")
+
+logger = logging.getLogger(__name__)
+
+# Enum member names, resolved when options are built so onnxruntime loads on first use
+_EXECUTION_MODES = {
+    "sequential": "ORT_SEQUENTIAL",
+    "parallel": "ORT_PARALLEL",
+}
+
+_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+def default_providers() -> List[str]:
+    """Prefer CUDA when available, otherwise fall back to CPU"""
+    available_providers = ort.get_available_providers()
+    if 'CUDAExecutionProvider' in available_providers:
+        return ['CUDAExecutionProvider']
+    return ['CPUExecutionProvider']
+
+
+class SessionRegistry:
+    """Process-wide cache of ONNX Runtime sessions with tuned options.
+
+    Runtime options (all optional):
+        intra_op_threads: threads used inside an operator (0 = ORT default)
+        inter_op_threads: threads used across operators in parallel mode
+        execution_mode: "sequential" or "parallel"
+        graph_optimization: "disable", "basic", "extended" or "all"
+        cache_dir: directory for serialized optimized graphs
+        providers: explicit execution provider list
+
+    A model_path of the form "store:<name or sha256>" is looked up in the
+    model store (utils.model_store), so sessions are keyed by content.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[Tuple, "ort.InferenceSession"] = {}
+        self._lock = threading.Lock()
+
+    def _make_key(self, model_path: str, providers: List[str], options: Dict[str, Any]) -> Tuple:
+        tuned = tuple(sorted(
+            (k, v) for k, v in options.items() if k != "providers"
+        ))
+        return (os.path.abspath(model_path), tuple(providers), tuned)
+
+    def _build_options(self, options: Dict[str, Any]) -> "ort.SessionOptions":
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = int(options.get("intra_op_threads", 0))
+        sess_options.inter_op_num_threads = int(options.get("inter_op_threads", 0))
+        sess_options.execution_mode = getattr(
+            ort.ExecutionMode, _EXECUTION_MODES[options.get("execution_mode", "sequential")]
+        )
+        sess_options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, _OPTIMIZATION_LEVELS[options.get("graph_optimization", "all")]
+        )
+        return sess_options
+
+    def _cache_path(self, model_path: str, providers: List[str], options: Dict[str, Any]) -> Optional[Path]:
+        """Location of the optimized graph for this model, or None if caching is disabled"""
+        cache_dir = options.get("cache_dir")
+        if not cache_dir:
+            return None
+
+        digest = hashlib.sha256()
+        digest.update(os.path.abspath(model_path).encode())
+        try:
+            stat = os.stat(model_path)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        except OSError:
+            pass
+        digest.update(ort.__version__.encode())
+        digest.update(",".join(providers).encode())
+        digest.update(str(options.get("graph_optimization", "all")).encode())
+
+        return Path(cache_dir) / f"{Path(model_path).stem}.{digest.hexdigest()[:16]}.opt.onnx"
+
+    def _create_session(self, model_path: str, providers: List[str], options: Dict[str, Any]) -> "ort.InferenceSession":
+        sess_options = self._build_options(options)
+        cache_path = self._cache_path(model_path, providers, options)
+
+        if cache_path is not None and cache_path.exists():
+            # The cached graph is already optimized; skip re-running the optimizer
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                session = ort.InferenceSession(str(cache_path), sess_options=sess_options, providers=providers)
+                logger.info(f"Loaded optimized model from cache: {cache_path}")
+                return session
+            except Exception as e:
+                logger.warning(f"Discarding unreadable optimized model {cache_path}: {e}")
+                cache_path.unlink(missing_ok=True)
+                sess_options = self._build_options(options)
+
+        tmp_path = None
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            sess_options.optimized_model_filepath = str(tmp_path)
+
+        session = ort.InferenceSession(model_path, sess_options=sess_options, providers=providers)
+
+        if tmp_path is not None and tmp_path.exists():
+            os.replace(tmp_path, cache_path)
+            logger.info(f"Saved optimized model to cache: {cache_path}")
+        return session
+
+    def get_session(self, model_path: str, options: Optional[Dict[str, Any]] = None) -> "ort.InferenceSession":
+        """Get a shared session for model_path, creating it on first use"""
+        model_path = resolve_model_path(model_path)
+        options = dict(options or {})
+        providers = list(options.get("providers") or default_providers())
+        key = self._make_key(model_path, providers, options)
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._create_session(model_path, providers, options)
+                self._sessions[key] = session
+            return session
+
+    def release(self, model_path: str):
+        """Drop all cached sessions for a model"""
+        path = os.path.abspath(resolve_model_path(model_path))
+        with self._lock:
+            for key in [k for k in self._sessions if k[0] == path]:
+                del self._sessions[key]
+
+    def clear(self):
+        """Drop all cached sessions"""
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+session_registry = SessionRegistry()
@@ -1,28 +1,42 @@
-import psutil
 import time
 import threading
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Sequence
 import logging
 import os
-import GPUtil
+import numpy as np
+from utils.collectors import PROCFS_AVAILABLE, Collector, CollectorUnavailable, default_collectors
+from utils.metric_history import DEFAULT_TIERS, DEFAULT_WINDOWS, MetricHistory
 
 logger = logging.getLogger(__name__)
 
+# Metrics always present in subscriber samples and alert checks (0 until collected)
+SAMPLE_METRICS = ("cpu", "memory", "gpu", "disk")
+
 class SystemMonitor:
-    """Advanced system resource monitor with alerting"""
+    """Advanced system resource monitor with alerting.
+
+    Samples come from pluggable collectors, each with its own interval
+    (see utils.collectors). A collector that finds its hardware missing
+    disables itself. Each metric is a MetricHistory: a NumPy ring buffer
+    of the last max(windows) seconds of samples, rolling mean/max/p95 over
+    each window and downsampled mean/max tiers for longer history.
+    """
     
-    def __init__(self, interval: float = 1.0):
+    def __init__(self, interval: float = 1.0, windows=DEFAULT_WINDOWS, tiers=DEFAULT_TIERS,
+                 collectors: Optional[Sequence[Collector]] = None, procfs: bool = PROCFS_AVAILABLE):
         self.interval = interval
+        self.windows = windows
+        self.tiers = tiers
         self._running = False
         self._thread: Optional[threading.Thread] = None
-        self.data = {
-            "cpu": [],
-            "memory": [],
-            "gpu": [],
-            "disk": [],
-            "network": [],
-            "process": []
-        }
+        self._wake = threading.Event()
+        self.collectors: Dict[str, Collector] = {}
+        self.data: Dict[str, MetricHistory] = {}
+        self._next_due: Dict[str, float] = {}
+        self.pid = os.getpid()
+        for collector in (collectors if collectors is not None else default_collectors(interval, procfs, self.pid)):
+            self.add_collector(collector)
+
         self.alerts = []
         self.alert_thresholds = {
             "cpu": 90,
@@ -30,8 +44,26 @@ class SystemMonitor:
             "gpu": 80,
             "disk": 90
         }
-        self.pid = os.getpid()
-        self.process = psutil.Process(self.pid)
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self.thread_cpu_time = 0.0
+        self.run_time = 0.0
+
+    def add_collector(self, collector: Collector):
+        """Register a collector; its samples are stored under data[collector.name]"""
+        self.collectors[collector.name] = collector
+        self.data[collector.name] = MetricHistory(
+            collector.name, collector.interval, collector.fields, self.windows, self.tiers
+        )
+        self._next_due[collector.name] = 0.0
+
+    def remove_collector(self, name: str) -> bool:
+        collector = self.collectors.pop(name, None)
+        if collector is None:
+            return False
+        collector.close()
+        self.data.pop(name, None)
+        self._next_due.pop(name, None)
+        return True
     
     def start(self):
         """Start monitoring thread"""
@@ -39,6 +71,7 @@ class SystemMonitor:
             return
             
         self._running = True
+        self._wake.clear()
         self._thread = threading.Thread(target=self._monitor, daemon=True)
         self._thread.start()
         logger.info("System monitor started")
@@ -46,63 +79,98 @@ class SystemMonitor:
     def stop(self):
         """Stop monitoring thread"""
         self._running = False
+        self._wake.set()
         if self._thread:
             self._thread.join(timeout=2.0)
         logger.info("System monitor stopped")
+
+    def _collect(self, collector: Collector, timestamp: float):
+        try:
+            values = collector.collect()
+        except CollectorUnavailable as e:
+            collector.enabled = False
+            logger.info(f"Disabling {collector.name} collector: {e}")
+            return
+        except Exception as e:
+            collector.failures += 1
+            logger.error(f"Monitoring error in {collector.name} collector: {e}")
+            if collector.failures >= collector.max_failures:
+                collector.enabled = False
+                logger.warning(f"Disabling {collector.name} collector after {collector.failures} failures")
+            return
+        collector.failures = 0
+        self.data[collector.name].add(timestamp, values)
+
+    def _tick(self, now: float) -> bool:
+        """Run every collector that is due; return whether any ran"""
+        timestamp = time.time()
+        ran = False
+        for name, collector in list(self.collectors.items()):
+            if not collector.enabled or now < self._next_due.get(name, 0.0):
+                continue
+            self._next_due[name] = now + collector.interval
+            self._collect(collector, timestamp)
+            ran = True
+
+        if ran:
+            sample = self.latest_sample()
+            sample["timestamp"] = timestamp
+            self._check_alerts(sample["cpu"], sample["memory"], sample["gpu"], sample["disk"])
+            self._notify(sample)
+        return ran
     
     def _monitor(self):
-        """Monitoring loop"""
+        """Monitoring loop: sleep until the next collector is due"""
+        cpu_start, wall_start = time.thread_time(), time.monotonic()
+        cpu_base, wall_base = self.thread_cpu_time, self.run_time
         while self._running:
+            now = time.monotonic()
             try:
-                # CPU monitoring
-                cpu_percent = psutil.cpu_percent(interval=None)
-                self.data["cpu"].append(cpu_percent)
-                
-                # Memory monitoring
-                mem = psutil.virtual_memory()
-                self.data["memory"].append(mem.percent)
-                
-                # GPU monitoring
-                gpu_percent = 0
-                try:
-                    gpus = GPUtil.getGPUs()
-                    if gpus:
-                        gpu_percent = gpus[0].load * 100
-                    self.data["gpu"].append(gpu_percent)
-                except:
-                    self.data["gpu"].append(0)
-                
-                # Disk monitoring
-                disk = psutil.disk_usage('/')
-                self.data["disk"].append(disk.percent)
-                
-                # Network monitoring
-                net = psutil.net_io_counters()
-                self.data["network"].append({
-                    "sent": net.bytes_sent,
-                    "recv": net.bytes_recv
-                })
-                
-                # Process monitoring
-                process_mem = self.process.memory_info().rss / (1024 * 1024)  # MB
-                self.data["process"].append({
-                    "cpu": self.process.cpu_percent(),
-                    "memory": process_mem
-                })
-                
-                # Check thresholds
-                self._check_alerts(cpu_percent, mem.percent, gpu_percent, disk.percent)
-                
-                # Prune data
-                for key in self.data:
-                    if len(self.data[key]) > 300:  # Keep 5 minutes at 1s intervals
-                        self.data[key] = self.data[key][-300:]
-                
+                self._tick(now)
             except Exception as e:
                 logger.error(f"Monitoring error: {e}")
-            
-            time.sleep(self.interval)
+            self.thread_cpu_time = cpu_base + time.thread_time() - cpu_start
+            self.run_time = wall_base + time.monotonic() - wall_start
+
+            due = [self._next_due[n] for n, c in list(self.collectors.items()) if c.enabled]
+            wait = (min(due) if due else now + self.interval) - time.monotonic()
+            if wait > 0:
+                self._wake.wait(wait)
+        self.run_time = wall_base + time.monotonic() - wall_start
+
+    def latest_sample(self) -> Dict[str, float]:
+        """Newest value of every single-field metric, with 0 for core metrics not yet collected"""
+        sample = {name: 0.0 for name in SAMPLE_METRICS}
+        for name, history in list(self.data.items()):
+            current = history.current()
+            if current is not None and len(history.fields) == 1:
+                sample[name] = float(current[0])
+        return sample
+
+    def get_overhead(self) -> Dict[str, float]:
+        """CPU time used by the monitor thread relative to how long it has run"""
+        return {
+            "thread_cpu_seconds": self.thread_cpu_time,
+            "run_seconds": self.run_time,
+            "cpu_percent": 100.0 * self.thread_cpu_time / self.run_time if self.run_time else 0.0,
+        }
     
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback with every sample taken by the monitor thread"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Stop delivering samples to callback"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _notify(self, sample: Dict[str, Any]):
+        for callback in list(self._subscribers):
+            try:
+                callback(sample)
+            except Exception as e:
+                logger.error(f"Monitor subscriber error: {e}")
+
     def _check_alerts(self, cpu: float, mem: float, gpu: float, disk: float):
         """Check resource usage against thresholds"""
         thresholds = self.alert_thresholds
@@ -133,22 +201,46 @@ class SystemMonitor:
             self.alerts.append(alert)
             logger.warning(f"Resource alert: {resource} usage {value}% exceeds threshold")
     
-    def get_recent(self, metric: str, seconds: int = 10) -> list:
-        """Get recent metric values"""
-        count = min(len(self.data.get(metric, [])), seconds)
-        return self.data.get(metric, [])[-count:]
+    def _fields(self, history: MetricHistory, values: np.ndarray) -> Any:
+        if len(history.fields) == 1:
+            return float(values[0])
+        return {field: float(v) for field, v in zip(history.fields, values)}
+
+    def get_recent(self, metric: str, seconds: float = 10) -> np.ndarray:
+        """Read-only view of metric values from the last `seconds` seconds, oldest first.
+
+        Single-field metrics give a 1-D array, others one column per field.
+        The view is not copied; it stays valid until the monitor has taken
+        another full retention period of samples.
+        """
+        history = self.data.get(metric)
+        if history is None:
+            return np.empty(0)
+        _, values = history.recent(seconds)
+        return values[:, 0] if len(history.fields) == 1 else values
     
     def get_current(self, metric: str) -> Any:
         """Get current metric value"""
-        if not self.data.get(metric):
+        history = self.data.get(metric)
+        current = history.current() if history is not None else None
+        if current is None:
             return None
-        return self.data[metric][-1] if self.data[metric] else None
+        return self._fields(history, current)
+
+    def get_stats(self, metric: str, window: float = 60.0) -> Dict[str, Any]:
+        """Rolling mean/max/p95 over a configured window (10s, 60s or 300s by default)"""
+        history = self.data[metric]
+        stats = history.stats(window)
+        return stats["value"] if len(history.fields) == 1 else stats
+
+    def get_history(self, metric: str, resolution: Optional[float] = 10.0) -> Dict[str, np.ndarray]:
+        """Downsampled timestamps, means and maxes at a tier resolution (None for raw samples)"""
+        timestamps, means, maxes = self.data[metric].history(resolution)
+        return {"timestamps": timestamps, "mean": means, "max": maxes}
     
     def get_process_stats(self) -> Dict[str, float]:
         """Get current process statistics"""
-        if not self.data["process"]:
-            return {}
-        return self.data["process"][-1]
+        return self.get_current("process") or {}
     
     def set_threshold(self, resource: str, value: float):
         """Set alert threshold for a resource"""
@@ -159,4 +251,22 @@ class SystemMonitor:
         return False
 
 
-system_monitor = SystemMonitor()
\ No newline at end of file
+_system_monitor: Optional[SystemMonitor] = None
+_singleton_lock = threading.Lock()
+
+
+def get_system_monitor() -> SystemMonitor:
+    """The shared SystemMonitor, created (collectors opened) on first use"""
+    global _system_monitor
+    if _system_monitor is None:
+        with _singleton_lock:
+            if _system_monitor is None:
+                _system_monitor = SystemMonitor()
+    return _system_monitor
+
+
+def __getattr__(name: str):
+    # Keeps `from utils.system_monitor import system_monitor` working without paying for it at import
+    if name == "system_monitor":
+        return get_system_monitor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
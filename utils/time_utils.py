@@ -1,17 +1,31 @@
+import math
 import time
+from bisect import bisect_left, insort
 from collections import deque
-import numpy as np
 import logging
+from utils.lazy_import import lazy_import
+from utils.metrics import MetricsRegistry, metrics
+
+asyncio = lazy_import("asyncio")
 
 logger = logging.getLogger(__name__)
 
 class FPSCounter:
-    """Advanced FPS counter with smoothing and analytics"""
+    """Advanced FPS counter with smoothing and analytics.
+
+    Frame-time mean and variance over the window are maintained with a
+    sliding Welford update, and a sorted copy of the window gives min/max
+    and percentiles by index, so every read is O(1).
+    """
     
     def __init__(self, window_size: int = 30):
         self.times = deque(maxlen=window_size)
         self.last_time = time.perf_counter()
         self.frame_count = 0
+        self._sorted = []
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._since_resync = 0
         
     def update(self) -> float:
         """Update the counter and return current FPS"""
@@ -20,14 +34,41 @@ class FPSCounter:
         self.last_time = current_time
         
         if elapsed > 0:
-            self.times.append(elapsed)
+            self._add(elapsed)
             self.frame_count += 1
         
         return self.current_fps
+
+    def _add(self, elapsed: float):
+        if len(self.times) == self.times.maxlen:
+            old = self.times.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+            n = len(self.times)
+            if n:
+                delta = old - self._mean
+                self._mean -= delta / n
+                self._m2 -= delta * (old - self._mean)
+            else:
+                self._mean = self._m2 = 0.0
+
+        self.times.append(elapsed)
+        insort(self._sorted, elapsed)
+        delta = elapsed - self._mean
+        self._mean += delta / len(self.times)
+        self._m2 += delta * (elapsed - self._mean)
+
+        # Removing samples lets rounding error build up; resync once per window
+        self._since_resync += 1
+        if self._since_resync >= max(self.times.maxlen or 0, 1000):
+            self._since_resync = 0
+            self._mean = sum(self.times) / len(self.times)
+            self._m2 = sum((t - self._mean) ** 2 for t in self.times)
     
     def reset(self):
         """Reset the counter"""
         self.times.clear()
+        self._sorted.clear()
+        self._mean = self._m2 = 0.0
         self.frame_count = 0
         self.last_time = time.perf_counter()
     
@@ -36,34 +77,52 @@ class FPSCounter:
         """Get current FPS (smoothed)"""
         if not self.times:
             return 0.0
-        return 1.0 / (sum(self.times) / len(self.times))
+        return 1.0 / self._mean
     
     @property
     def min_fps(self) -> float:
         """Get minimum FPS in window"""
         if not self.times:
             return 0.0
-        return 1.0 / max(self.times)
+        return 1.0 / self._sorted[-1]
     
     @property
     def max_fps(self) -> float:
         """Get maximum FPS in window"""
         if not self.times:
             return 0.0
-        return 1.0 / min(self.times)
+        return 1.0 / self._sorted[0]
+
+    @property
+    def mean_frame_time(self) -> float:
+        return self._mean
     
     @property
     def jitter(self) -> float:
         """Get frame time jitter (std dev)"""
         if len(self.times) < 2:
             return 0.0
-        return np.std(list(self.times))
+        return math.sqrt(max(self._m2, 0.0) / len(self.times))
+
+    def frame_time_percentile(self, q: float) -> float:
+        """Frame time at percentile q (0-100) over the window, nearest rank"""
+        if not self._sorted:
+            return 0.0
+        index = min(len(self._sorted) - 1, max(0, math.ceil(q / 100 * len(self._sorted)) - 1))
+        return self._sorted[index]
 
 
 class Timer:
-    """Precision timer with multiple laps"""
+    """Precision timer with multiple laps.
+
+    With a metrics_prefix, every named lap is also recorded in the
+    "<prefix>.<name>" histogram of the metrics registry, so per-frame laps
+    aggregate into latency percentiles across frames.
+    """
     
-    def __init__(self):
+    def __init__(self, metrics_prefix: str = None, registry: MetricsRegistry = None):
+        self.metrics_prefix = metrics_prefix
+        self.registry = registry if registry is not None else metrics
         self.reset()
     
     def reset(self):
@@ -71,6 +130,7 @@ class Timer:
         self.start_time = time.perf_counter()
         self.last_lap = self.start_time
         self.laps = []
+        self._lap_index = {}
     
     def lap(self, name: str = None) -> float:
         """Record a lap time"""
@@ -80,6 +140,9 @@ class Timer:
         
         if name:
             self.laps.append((name, elapsed))
+            self._lap_index.setdefault(name, elapsed)
+            if self.metrics_prefix is not None:
+                self.registry.histogram(f"{self.metrics_prefix}.{name}").observe(elapsed, current_time)
         
         return elapsed
     
@@ -92,29 +155,80 @@ class Timer:
         return self.laps.copy()
     
     def get_lap(self, name: str) -> float:
-        """Get specific lap time by name"""
-        for lap_name, time in self.laps:
-            if lap_name == name:
-                return time
-        return 0.0
+        """Get specific lap time by name (the first lap if the name repeats)"""
+        return self._lap_index.get(name, 0.0)
 
 
 class Synchronizer:
-    """Frame synchronizer for consistent processing rates"""
+    """Frame synchronizer for consistent processing rates.
+
+    Waits sleep until spin_threshold before the deadline, then spin on
+    perf_counter, which hits the deadline within microseconds where
+    time.sleep alone can overshoot by a scheduler tick. wait_next_async
+    never spins, since that would stall the event loop; it accepts the
+    loop's scheduling jitter instead.
+
+    late_policy decides what happens when a wait starts after its deadline:
+        "skip":     move to the most recent missed slot, so the frame runs
+                    immediately on the original grid and the slots before it
+                    are dropped (counted in skipped_frames)
+        "catch_up": keep the schedule; late frames run back-to-back until
+                    the debt is paid
+        "reset":    restart the schedule one interval from now
+    """
+
+    LATE_POLICIES = ("skip", "catch_up", "reset")
     
-    def __init__(self, target_fps: float):
+    def __init__(self, target_fps: float, spin_threshold: float = 0.001, late_policy: str = "skip"):
+        if late_policy not in self.LATE_POLICIES:
+            raise ValueError(f"Unknown late_policy {late_policy!r}; expected one of {self.LATE_POLICIES}")
         self.target_interval = 1.0 / target_fps
+        self.spin_threshold = spin_threshold
+        self.late_policy = late_policy
         self.last_time = time.perf_counter()
         self.next_time = self.last_time + self.target_interval
+        self.late_frames = 0
+        self.skipped_frames = 0
+
+    def _schedule(self, current_time: float) -> float:
+        """Apply the late policy and return the deadline for this wait"""
+        lateness = current_time - self.next_time
+        if lateness > 0:
+            self.late_frames += 1
+            if self.late_policy == "skip" and lateness >= self.target_interval:
+                missed = int(lateness // self.target_interval)
+                self.skipped_frames += missed
+                self.next_time += missed * self.target_interval
+            elif self.late_policy == "reset":
+                self.next_time = current_time
+        return self.next_time
+
+    def _advance(self) -> float:
+        self.last_time = self.next_time
+        self.next_time += self.target_interval
+        return self.last_time
+
+    def _spin_until(self, deadline: float):
+        while time.perf_counter() < deadline:
+            pass
     
     def wait_next(self):
         """Wait until next frame time"""
-        current_time = time.perf_counter()
-        sleep_time = self.next_time - current_time
+        deadline = self._schedule(time.perf_counter())
+        sleep_time = deadline - time.perf_counter() - self.spin_threshold
         
         if sleep_time > 0:
             time.sleep(sleep_time)
+        self._spin_until(deadline)
         
-        self.last_time = self.next_time
-        self.next_time += self.target_interval
-        return self.last_time
\ No newline at end of file
+        return self._advance()
+
+    async def wait_next_async(self):
+        """Like wait_next, but only sleeps on the event loop and never spins"""
+        deadline = self._schedule(time.perf_counter())
+        sleep_time = deadline - time.perf_counter()
+        
+        if sleep_time > 0:
+            await asyncio.sleep(sleep_time)
+        
+        return self._advance()